@@ -0,0 +1,25 @@
+# alembic/versions/0002_jobrecord_listing_indexes.py
+from alembic import op
+
+revision = "0002_jobrecord_listing_indexes"
+down_revision = "0001_initial"
+branch_labels = None
+depends_on = None
+
+# Keyset pagination of GET /api/v1/jobs: newest first on (created_at, id),
+# optionally filtered by status or kind
+INDEXES = {
+    "ix_jobrecord_created_at_id": ["created_at", "id"],
+    "ix_jobrecord_status_created_at_id": ["status", "created_at", "id"],
+    "ix_jobrecord_kind_created_at_id": ["kind", "created_at", "id"],
+}
+
+
+def upgrade():
+    for name, columns in INDEXES.items():
+        op.create_index(name, "jobrecord", columns)
+
+
+def downgrade():
+    for name in INDEXES:
+        op.drop_index(name, table_name="jobrecord")
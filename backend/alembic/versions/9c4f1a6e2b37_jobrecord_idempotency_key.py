@@ -0,0 +1,21 @@
+# alembic/versions/0003_jobrecord_idempotency_key.py
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0003_jobrecord_idempotency_key"
+down_revision = "0002_jobrecord_listing_indexes"
+branch_labels = None
+depends_on = None
+
+
+# Idempotent submission: newest job for a key (request digest or client header)
+def upgrade():
+    with op.batch_alter_table("jobrecord") as batch:
+        batch.add_column(sa.Column("idempotency_key", sa.String(), nullable=True))
+    op.create_index("ix_jobrecord_idempotency_key_created_at", "jobrecord", ["idempotency_key", "created_at"])
+
+
+def downgrade():
+    op.drop_index("ix_jobrecord_idempotency_key_created_at", table_name="jobrecord")
+    with op.batch_alter_table("jobrecord") as batch:
+        batch.drop_column("idempotency_key")
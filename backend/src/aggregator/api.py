@@ -1,30 +1,52 @@
 from __future__ import annotations
 
 import os
+import posixpath
+import time
 from contextlib import asynccontextmanager
-from pathlib import Path
 from typing import Awaitable, Callable
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
 from starlette.responses import JSONResponse, Response
 
+from src.infra import metrics
+from src.infra.cas import PRIVATE_DIRS
 from src.infra.db import ensure_engine
+from src.infra.files import results_dir
 
 
 def _api_key() -> str | None:
     return os.environ.get("API_KEY")
 
 
+def _is_private_file(path: str) -> bool:
+    if not path.startswith("/files/"):
+        return False
+    top = posixpath.normpath(path[len("/files/") :]).lstrip("/").split("/", 1)[0]
+    return top in PRIVATE_DIRS
+
+
+def _route_label(request: Request) -> str:
+    # The route template ("/api/v1/jobs/{job_id}") keeps label cardinality
+    # bounded; requests answered before routing (403, 404) share one label
+    return getattr(request.scope.get("route"), "path", None) or "unmatched"
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Ensure DB exists
     ensure_engine()
     # Ensure static root exists
-    static_root = Path(os.environ.get("RESULTS_DIR") or (Path.cwd() / "results"))
+    static_root = results_dir()
     static_root.mkdir(parents=True, exist_ok=True)
     yield
+    # Let running jobs finish on their own; stop accepting new ones
+    from src.aggregator.jobs_runtime import shutdown_executor
+
+    shutdown_executor(wait=False)
 
 
 def create_app() -> FastAPI:
@@ -39,7 +61,7 @@ def create_app() -> FastAPI:
     )
 
     # Public static files at /files/**
-    static_root = Path(os.environ.get("RESULTS_DIR") or (Path.cwd() / "results"))
+    static_root = results_dir()
     app.mount("/files", StaticFiles(directory=static_root, html=False), name="files")
 
     @app.middleware("http")
@@ -47,8 +69,12 @@ def create_app() -> FastAPI:
         request: Request,
         call_next: Callable[[Request], Awaitable[Response]],
     ) -> Response:
-        # Allow health and static files without auth
-        if request.url.path == "/healthz" or request.url.path.startswith("/files/"):
+        # Uploads, derived caches and HE keys share RESULTS_DIR but are never public
+        if _is_private_file(request.url.path):
+            return JSONResponse({"detail": "Not Found"}, status_code=404)
+
+        # Allow health, metrics and static files without auth
+        if request.url.path in ("/healthz", "/metrics") or request.url.path.startswith("/files/"):
             return await call_next(request)
 
         api_key = _api_key()
@@ -59,14 +85,35 @@ def create_app() -> FastAPI:
 
         return await call_next(request)
 
+    @app.middleware("http")
+    async def observe_latency(
+        request: Request,
+        call_next: Callable[[Request], Awaitable[Response]],
+    ) -> Response:
+        t0 = time.perf_counter()
+        response = await call_next(request)
+        metrics.REQUEST_SECONDS.labels(request.method, _route_label(request), str(response.status_code)).observe(
+            time.perf_counter() - t0
+        )
+        return response
+
     @app.get("/healthz")
     async def healthz() -> dict[str, bool]:
         return {"ok": True}
 
+    @app.get("/metrics", include_in_schema=False)
+    async def prometheus_metrics() -> Response:
+        from src.aggregator.jobs_runtime import queue_depths
+
+        body, content_type = await run_in_threadpool(metrics.render, queue_depths)
+        return Response(body, media_type=content_type)
+
     # Mount routers
     from src.aggregator.routes.jobs import router as jobs_router
+    from src.aggregator.routes.upload import router as upload_router
 
     app.include_router(jobs_router)
+    app.include_router(upload_router)
 
     return app
 
@@ -1,18 +1,40 @@
 from __future__ import annotations
 
+import datetime as dt
+import hashlib
+import inspect
+import json
 import os
 import secrets
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, Callable, Optional
 
-from src.infra.db import create_job_record
-from src.aggregator.tasks import run_make_all_ga
+from src.infra.db import (
+    JobRecord,
+    append_job_log,
+    count_jobs,
+    create_job_record,
+    find_job_by_idempotency_key,
+    get_job_record,
+    unit_of_work,
+    update_job_status,
+)
+from src.aggregator.tasks import PIPELINES, resolve_input, run_make_all_ga, run_ridge
+from src.he_core.backends import available_backends
+from src.he_core.backends.calibration import AUTO, NO_NATIVE_BACKEND
 
 
 @dataclass
 class Job:
     id: str
     kind: str
+    # an existing job answered an idempotent resubmission
+    reused: bool = False
 
 
 def _use_rq() -> bool:
@@ -21,19 +43,308 @@ def _use_rq() -> bool:
     return val in {"1", "true", "yes"}
 
 
-async def start_make_all_ga(ga_csv: str, d: int, catalog_csv: Optional[str]) -> Job:
+def queue_depths() -> dict[str, int]:
+    """Jobs waiting for a worker: per RQ queue, or queued rows for the in-process pool."""
+    if _use_rq():
+        from src.aggregator.queue import queue_depths as rq_depths
+
+        return rq_depths()
+    return {"inprocess": count_jobs(status="queued", cached=False)}
+
+
+# -------------------------
+# In-process dispatch
+# -------------------------
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _max_workers() -> int:
+    raw = os.environ.get("JOB_WORKERS", "").strip()
+    if raw:
+        return max(1, int(raw))
+    return min(4, os.cpu_count() or 1)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=_max_workers(),
+                thread_name_prefix="he-job",
+            )
+        return _executor
+
+
+def shutdown_executor(wait: bool = False) -> None:
+    """Stop the in-process pool (called from the app lifespan on shutdown)."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
+
+
+def _retries_left() -> int:
+    """Attempts RQ will still make after the running one; 0 outside an RQ worker."""
+    if "rq" not in sys.modules:
+        return 0
+    from rq import get_current_job
+
+    job = get_current_job()
+    return (job.retries_left or 0) if job is not None else 0
+
+
+def run_guarded(job_id: str, func: Callable[..., None], *args: Any) -> None:
+    """
+    Run a job callable and mark the job failed if it raises. A failed RQ
+    attempt that RQ will retry puts the job back to queued instead, so it
+    only turns failed after the last attempt.
+    Used both by the in-process pool and as the RQ entrypoint, so the
+    callable must stay importable at module level.
+    """
+    try:
+        func(job_id, *args)
+    except Exception as exc:
+        left = _retries_left()
+        with unit_of_work() as s:
+            append_job_log(job_id, f"error: {exc!r}", session=s)
+            if left:
+                append_job_log(job_id, f"retrying; attempts left: {left}", session=s)
+                update_job_status(job_id, "queued", session=s)
+            else:
+                update_job_status(job_id, "failed", session=s)
+        raise
+
+
+def dispatch(job_id: str, func: Callable[..., None], *args: Any) -> Optional[Future[None]]:
+    """
+    Hand a job to RQ when USE_RQ is set, otherwise to the bounded in-process
+    pool. Returns the local Future (None for RQ) so callers may wait on it.
+    """
+    if _use_rq():
+        # Imported lazily: redis/rq are an optional extra
+        from src.aggregator.queue import enqueue
+
+        # checkpointed pipelines resume where the failed attempt stopped
+        retries = int(os.environ.get("JOB_RETRIES", "2"))
+        enqueue(run_guarded, job_id, func, *args, job_id=job_id, retries=retries)
+        return None
+    return _get_executor().submit(run_guarded, job_id, func, *args)
+
+
+# -------------------------
+# Idempotent submission
+# -------------------------
+# A job in one of these states answers a repeated submission; failed jobs don't
+REUSABLE_STATUSES = frozenset({"queued", "running", "succeeded"})
+
+
+class IdempotencyConflict(ValueError):
+    """An Idempotency-Key was reused with a different request body."""
+
+
+class BackendUnavailable(ValueError):
+    """backend "auto" was requested but no native HE backend is installed."""
+
+
+def _require_native(backend: str) -> None:
+    if backend == AUTO and not available_backends(native_only=True):
+        raise BackendUnavailable(NO_NATIVE_BACKEND)
+
+
+def request_key(kind: str, meta: dict[str, Any]) -> str:
+    """Digest of a submission, used as its idempotency key when the client sends none."""
+    blob = json.dumps([kind, meta], sort_keys=True, default=str).encode()
+    return hashlib.sha256(blob).hexdigest()
+
+
+def _job_cache_ttl() -> float:
+    return float(os.environ.get("JOB_CACHE_TTL_S", "3600"))
+
+
+class JobCache:
+    """
+    Idempotency key -> job id for recent submissions: a bounded LRU whose
+    entries expire `ttl` seconds after the job was created. It only saves
+    the indexed database lookup; the database stays authoritative, so
+    other API processes and restarts see the same jobs.
+    """
+
+    def __init__(self, max_entries: int = 1024) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is None:
+                return None
+            if hit[1] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return hit[0]
+
+    def put(self, key: str, job_id: str, expires_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (job_id, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+job_cache = JobCache(int(os.environ.get("JOB_CACHE_MAX", "1024")))
+# serialises lookup + create so concurrent duplicates in this process share one job
+_submit_lock = threading.Lock()
+
+
+def _reusable(key: str, ttl: float) -> Optional[JobRecord]:
+    job_id = job_cache.get(key)
+    if job_id is not None:
+        rec = get_job_record(job_id)
+        if rec is not None and rec.status in REUSABLE_STATUSES:
+            return rec
+        job_cache.discard(key)
+    since = dt.datetime.now(dt.UTC) - dt.timedelta(seconds=ttl)
+    rec = find_job_by_idempotency_key(key, since=since, statuses=REUSABLE_STATUSES)
+    if rec is not None:
+        created = rec.created_at.replace(tzinfo=dt.UTC).timestamp()
+        job_cache.put(key, rec.id, created + ttl)
+    return rec
+
+
+def _submit(
+    kind: str,
+    meta: dict[str, Any],
+    func: Callable[..., None],
+    *args: Any,
+    idempotency_key: Optional[str] = None,
+) -> Job:
+    """
+    Create and dispatch a job. With an idempotency key, a queued, running or
+    succeeded job submitted under the same key within JOB_CACHE_TTL_S is
+    returned instead (Job.reused); JOB_CACHE_TTL_S=0 turns reuse off.
+    """
+    ttl = _job_cache_ttl()
+    if idempotency_key is None or ttl <= 0:
+        return _create_and_dispatch(kind, meta, func, *args)
+    with _submit_lock:
+        rec = _reusable(idempotency_key, ttl)
+        if rec is not None:
+            if rec.kind != kind or (rec.meta or {}) != json.loads(json.dumps(meta)):
+                raise IdempotencyConflict(f"idempotency key already used for a different {rec.kind} request")
+            return Job(id=rec.id, kind=kind, reused=True)
+        job = _create_and_dispatch(kind, meta, func, *args, idempotency_key=idempotency_key)
+        job_cache.put(idempotency_key, job.id, time.time() + ttl)
+        return job
+
+
+def _create_and_dispatch(
+    kind: str,
+    meta: dict[str, Any],
+    func: Callable[..., None],
+    *args: Any,
+    idempotency_key: Optional[str] = None,
+) -> Job:
     job_id = secrets.token_hex(16)
-    kind = "make-all-ga"
+    create_job_record(job_id=job_id, kind=kind, status="queued", meta=meta, idempotency_key=idempotency_key)
+    # Return immediately; the job runs on a worker (RQ) or the local pool
+    dispatch(job_id, func, *args)
+    return Job(id=job_id, kind=kind)
+
+
+def retry_job(job_id: str) -> Job:
+    """
+    Re-dispatch a failed job with its stored arguments. The job keeps its
+    id, so its pipeline resumes after the last checkpointed stage.
+    """
+    with unit_of_work() as s:
+        rec = s.get(JobRecord, job_id)
+        if rec is None:
+            raise KeyError(job_id)
+        if rec.status != "failed":
+            raise ValueError(f"only failed jobs can be retried (status is {rec.status})")
+        runner = PIPELINES.get(rec.kind)
+        if runner is None:
+            raise ValueError(f"jobs of kind {rec.kind!r} cannot be retried")
+        meta = dict(rec.meta or {})
+        append_job_log(job_id, "retry requested", session=s)
+        update_job_status(job_id, "queued", session=s)
+    # arguments added after the job was stored take their defaults
+    params = list(inspect.signature(runner).parameters.values())[1:]
+    dispatch(job_id, runner, *(meta.get(p.name, p.default) for p in params))
+    return Job(id=job_id, kind=rec.kind)
+
 
-    create_job_record(
-        job_id=job_id,
-        kind=kind,
-        status="queued",
-        meta={"ga_csv": ga_csv, "d": d, "catalog_csv": catalog_csv},
+async def start_make_all_ga(
+    ga_csv: str,
+    d: int,
+    catalog_csv: Optional[str],
+    backend: str = "auto",
+    batch_size: int = 256,
+    idempotency_key: Optional[str] = None,
+    profile: bool = False,
+    precision_bits: Optional[int] = None,
+) -> Job:
+    """
+    Submit make-all-ga. Identical requests share one job: the key is the
+    client's Idempotency-Key if given, else a digest of the request.
+    Raises BackendUnavailable for "auto" without a native backend, unless
+    ga_csv is missing: that job only writes the demo artifact.
+    """
+    if resolve_input(ga_csv, "ga_csv") is not None:
+        _require_native(backend)
+    meta: dict[str, Any] = {
+        "ga_csv": ga_csv,
+        "d": d,
+        "catalog_csv": catalog_csv,
+        "backend": backend,
+        "batch_size": batch_size,
+    }
+    if profile:
+        # only when set, so unprofiled requests keep their existing keys
+        meta["profile"] = True
+    if precision_bits is not None:
+        meta["precision_bits"] = precision_bits
+    key = f"make-all-ga:{idempotency_key}" if idempotency_key else request_key("make-all-ga", meta)
+    return _submit(
+        "make-all-ga",
+        meta,
+        run_make_all_ga,
+        ga_csv,
+        d,
+        catalog_csv,
+        backend,
+        batch_size,
+        profile,
+        precision_bits,
+        idempotency_key=key,
     )
 
-    # For test env, run inline so status becomes "succeeded" quickly.
-    # If you later wire RQ workers, branch on _use_rq().
-    run_make_all_ga(job_id, ga_csv, d, catalog_csv)
 
-    return Job(id=job_id, kind=kind)
\ No newline at end of file
+async def start_ridge(
+    data_csv: str,
+    target: str,
+    lam: float,
+    batch_sizes: list[int],
+    backend: str = "auto",
+) -> Job:
+    _require_native(backend)
+    meta = {
+        "data_csv": data_csv,
+        "target": target,
+        "lam": lam,
+        "batch_sizes": batch_sizes,
+        "backend": backend,
+    }
+    return _submit("ridge", meta, run_ridge, data_csv, target, lam, batch_sizes, backend)
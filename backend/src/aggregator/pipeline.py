@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Optional, Sequence
+
+from src.he_core.backends import HEBackend, get_backend
+from src.he_core.utils import CKKSParams
+from src.infra.db import (
+    JobLogWriter,
+    list_artifacts,
+    record_artifact,
+    unit_of_work,
+    update_job_status,
+)
+from src.infra.files import results_dir, sha256_file
+from src.infra.metrics import JOB_SECONDS, STAGE_SECONDS
+
+# Artifact.kind of the per-stage checkpoint rows
+CHECKPOINT = "checkpoint"
+
+
+@dataclass
+class StageContext:
+    """
+    What a stage sees: the job arguments, the merged state returned by the
+    stages before it (restored from checkpoints on a retry) and the job
+    directory its output files go to.
+    """
+
+    job_id: str
+    job_dir: Path
+    args: dict[str, Any]
+    state: dict[str, Any]
+    log: JobLogWriter
+    _outputs: list[Path] = field(default_factory=list)
+    _artifacts: list[dict[str, Any]] = field(default_factory=list)
+    _he: Optional[HEBackend] = None
+
+    @property
+    def he(self) -> HEBackend:
+        """The backend (and parameters, if any) pinned by earlier stages."""
+        if self._he is None:
+            params = self.state.get("params")
+            self._he = get_backend(self.state["backend"], CKKSParams.from_dict(params) if params else None)
+        return self._he
+
+    def output(self, path: Path) -> Path:
+        """Declare a file this stage produced; resuming past the stage requires it."""
+        self._outputs.append(path)
+        return path
+
+    def artifact(self, **kwargs: Any) -> None:
+        """Record an artifact together with this stage's checkpoint."""
+        self._artifacts.append(kwargs)
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    run: Callable[[StageContext], Optional[dict[str, Any]]]
+    # skipped (checkpointed as such) when this returns False for the state so far
+    when: Callable[[dict[str, Any]], bool] = lambda state: True
+
+
+def _outputs_intact(meta: dict[str, Any]) -> bool:
+    for path, size in meta.get("outputs", {}).items():
+        p = Path(path)
+        if not p.is_file() or p.stat().st_size != size:
+            return False
+    return True
+
+
+def _with_sha256(art: dict[str, Any]) -> dict[str, Any]:
+    meta = dict(art.get("meta") or {})
+    path = art.get("path")
+    if path and "sha256" not in meta and Path(path).exists():
+        meta["sha256"] = sha256_file(Path(path))
+    return {**art, "meta": meta}
+
+
+def _checkpoints(job_id: str, stages: Sequence[Stage]) -> dict[str, dict[str, Any]]:
+    """
+    Usable checkpoints by stage name: every stage before the first one whose
+    checkpoint is missing or whose output files are gone or truncated.
+    """
+    found = {a.name: a.meta or {} for a in list_artifacts(job_id) if a.kind == CHECKPOINT}
+    usable: dict[str, dict[str, Any]] = {}
+    for stage in stages:
+        meta = found.get(stage.name)
+        if meta is None or not _outputs_intact(meta):
+            break
+        usable[stage.name] = meta
+    return usable
+
+
+class Pipeline:
+    """
+    A job kind as an ordered list of stages. After each stage its state,
+    output files (with sizes) and artifacts are committed together with a
+    checkpoint Artifact row (kind "checkpoint", name = stage), so running
+    the same job id again (RQ retry, POST /jobs/{id}/retry) restores the
+    finished stages and resumes at the first unfinished one.
+
+    Stages after a resume must see the same secret key as before, which
+    holds as long as contexts come from the key cache (HE_KEY_CACHE_DISK,
+    on by default) and the backend is pinned in the state.
+    """
+
+    def __init__(self, kind: str, stages: Sequence[Stage]) -> None:
+        names = [s.name for s in stages]
+        if len(set(names)) != len(names):
+            raise ValueError(f"duplicate stage names in {kind}: {names}")
+        self.kind = kind
+        self.stages = list(stages)
+
+    @property
+    def stage_names(self) -> list[str]:
+        return [s.name for s in self.stages]
+
+    def run(self, job_id: str, *, profile: bool = False, **args: Any) -> None:
+        """
+        Run (or resume) the job. With `profile` the run is captured by
+        src.aggregator.profiling and its outputs recorded as artifacts;
+        otherwise nothing profiling-related is imported or started.
+        """
+        t0 = time.perf_counter()
+        try:
+            self._run(job_id, profile, **args)
+        except BaseException:
+            JOB_SECONDS.labels(self.kind, "failed").observe(time.perf_counter() - t0)
+            raise
+        JOB_SECONDS.labels(self.kind, "succeeded").observe(time.perf_counter() - t0)
+
+    def _run(self, job_id: str, profile: bool, **args: Any) -> None:
+        job_dir = results_dir() / job_id
+        job_dir.mkdir(parents=True, exist_ok=True)
+        with JobLogWriter(job_id) as log:
+            done = _checkpoints(job_id, self.stages)
+            state: dict[str, Any] = {}
+            for meta in done.values():
+                state.update(meta.get("state", {}))
+            args_s = ", ".join(f"{k}={v}" for k, v in args.items())
+            log(f"start: {args_s}" if not done else f"resume after {', '.join(done)}: {args_s}")
+            with unit_of_work() as s:
+                update_job_status(job_id, "running", session=s)
+                log.flush(session=s)
+
+            ctx = StageContext(job_id=job_id, job_dir=job_dir, args=args, state=state, log=log)
+            # profile outputs are recorded before the job turns succeeded, so
+            # watchers that stop at the final status still see them
+            if profile:
+                from src.aggregator.profiling import profiled
+
+                with profiled(job_id, job_dir):
+                    self._run_stages(ctx, done)
+            else:
+                self._run_stages(ctx, done)
+
+            log("done")
+            with unit_of_work() as s:
+                log.flush(session=s)
+                update_job_status(job_id, "succeeded", session=s)
+
+    def _run_stages(self, ctx: StageContext, done: dict[str, dict[str, Any]]) -> None:
+        job_id, state, log = ctx.job_id, ctx.state, ctx.log
+        for stage in self.stages:
+            if stage.name in done:
+                continue
+            ctx._outputs, ctx._artifacts = [], []
+            t0 = time.perf_counter()
+            skipped = not stage.when(state)
+            out = {} if skipped else (stage.run(ctx) or {})
+            state.update(out)
+            seconds = time.perf_counter() - t0
+            if not skipped:
+                STAGE_SECONDS.labels(self.kind, stage.name).observe(seconds)
+                log(f"stage {stage.name} done in {seconds:.2f}s")
+            # hash outputs before the transaction opens, not while it is held
+            artifacts = [_with_sha256(art) for art in ctx._artifacts]
+            with unit_of_work() as s:
+                for art in artifacts:
+                    record_artifact(job_id=job_id, session=s, **art)
+                record_artifact(
+                    job_id=job_id,
+                    kind=CHECKPOINT,
+                    name=stage.name,
+                    path=None,
+                    url=None,
+                    meta={
+                        "stage": stage.name,
+                        "index": self.stage_names.index(stage.name),
+                        "skipped": skipped,
+                        "seconds": round(seconds, 4),
+                        "state": out,
+                        "outputs": {str(p): p.stat().st_size for p in ctx._outputs},
+                    },
+                    session=s,
+                )
+                log.flush(session=s)
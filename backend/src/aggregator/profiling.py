@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from src.infra.db import record_artifact
+
+# Artifact.kind of everything a profiled job run records
+PROFILE = "profile"
+
+# Frames kept per allocation traceback
+_TRACE_DEPTH = 25
+_TOP_ALLOCATIONS = 50
+
+
+def _interval_s() -> float:
+    return float(os.environ.get("JOB_PROFILE_INTERVAL_MS", "5")) / 1000
+
+
+# -------------------------
+# Sampling: folded stacks
+# -------------------------
+def _frame_label(code: Any) -> str:
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Samples one thread's Python stack every `interval_s` from a background
+    thread and counts folded stacks ("outer;...;inner" -> samples), the
+    input format of flamegraph.pl, inferno and speedscope.
+    """
+
+    def __init__(self, thread_id: int, interval_s: float) -> None:
+        self.thread_id = thread_id
+        self.interval_s = interval_s
+        self.stacks: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="he-profile-sampler", daemon=True)
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            frame = sys._current_frames().get(self.thread_id)
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if labels:
+                self.stacks[";".join(reversed(labels))] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread.ident is not None:
+            self._thread.join()
+
+    def write_collapsed(self, path: Path) -> None:
+        with path.open("w", encoding="utf-8") as f:
+            for stack, n in self.stacks.most_common():
+                f.write(f"{stack} {n}\n")
+
+
+# -------------------------
+# Allocations
+# -------------------------
+# tracemalloc is process-wide; concurrent profiled jobs share one session
+_tracing_users = 0
+_tracing_lock = threading.Lock()
+
+
+def _start_tracing() -> None:
+    global _tracing_users
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(_TRACE_DEPTH)
+        _tracing_users += 1
+
+
+def _stop_tracing() -> None:
+    global _tracing_users
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0:
+            tracemalloc.stop()
+
+
+def _allocations(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot) -> list[dict[str, Any]]:
+    """Largest net allocations made during the run, by allocating traceback."""
+    diffs = after.compare_to(before, "traceback")
+    out = []
+    for d in sorted(diffs, key=lambda d: d.size_diff, reverse=True)[:_TOP_ALLOCATIONS]:
+        if d.size_diff <= 0:
+            break
+        out.append(
+            {
+                "size_bytes": d.size_diff,
+                "count": d.count_diff,
+                # innermost frame first
+                "traceback": [f"{f.filename}:{f.lineno}" for f in reversed(d.traceback)],
+            }
+        )
+    return out
+
+
+def _top_functions(prof: cProfile.Profile, n: int = 15) -> list[dict[str, Any]]:
+    stats = pstats.Stats(prof, stream=io.StringIO())
+    rows = []
+    for (filename, line, func), (_, calls, tottime, cumtime, _) in stats.stats.items():  # type: ignore[attr-defined]
+        rows.append(
+            {
+                "function": f"{func} ({Path(filename).name}:{line})",
+                "calls": calls,
+                "tottime_s": round(tottime, 6),
+                "cumtime_s": round(cumtime, 6),
+            }
+        )
+    rows.sort(key=lambda r: r["cumtime_s"], reverse=True)
+    return rows[:n]
+
+
+# cProfile is interpreter-wide from Python 3.12 (a second enable() raises
+# ValueError): one profiled job at a time gets it, the others run sampled only
+_cprofile_lock = threading.Lock()
+
+
+def _start_cprofile() -> Optional[cProfile.Profile]:
+    if not _cprofile_lock.acquire(blocking=False):
+        return None
+    prof = cProfile.Profile()
+    try:
+        prof.enable()
+    except ValueError:  # another profiling tool (debugger, coverage) is active
+        _cprofile_lock.release()
+        return None
+    return prof
+
+
+def _stop_cprofile(prof: cProfile.Profile) -> None:
+    prof.disable()
+    _cprofile_lock.release()
+
+
+@contextmanager
+def profiled(job_id: str, job_dir: Path, interval_s: Optional[float] = None) -> Iterator[None]:
+    """
+    Run the body under cProfile (exact call counts and times), a stack
+    sampler (flame graph) and tracemalloc (allocations), then record:
+
+    - profile.pstats: pstats.Stats / snakeviz input
+    - profile.collapsed: folded stacks for flamegraph.pl or speedscope
+    - allocations.json: peak traced memory and the largest net allocations
+
+    The sampler follows the calling thread only. cProfile is held by one
+    profiled run at a time; a run that starts while it is busy records no
+    profile.pstats. On Python 3.12+ cProfile sees every thread, and
+    allocations are process-wide, so both include other jobs running in
+    the same process. Outputs are recorded even when the body raises, and
+    everything started is stopped again however setup or the body fails.
+    """
+    job_dir.mkdir(parents=True, exist_ok=True)
+    interval = _interval_s() if interval_s is None else interval_s
+    sampler = StackSampler(threading.get_ident(), interval)
+    prof: Optional[cProfile.Profile] = None
+    before: Optional[tracemalloc.Snapshot] = None
+    tracing = False
+    t0 = time.perf_counter()
+    try:
+        _start_tracing()
+        tracing = True
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+        sampler.start()
+        prof = _start_cprofile()
+        t0 = time.perf_counter()
+        yield
+    finally:
+        if prof is not None:
+            _stop_cprofile(prof)
+        sampler.stop()
+        seconds = time.perf_counter() - t0
+        if tracing:
+            after = tracemalloc.take_snapshot() if before is not None else None
+            _, peak = tracemalloc.get_traced_memory()
+            _stop_tracing()
+            if before is not None and after is not None:
+                _record(job_id, job_dir, prof, sampler, _allocations(before, after), peak, seconds)
+
+
+def _record(
+    job_id: str,
+    job_dir: Path,
+    prof: Optional[cProfile.Profile],
+    sampler: StackSampler,
+    allocations: list[dict[str, Any]],
+    peak: int,
+    seconds: float,
+) -> None:
+    if prof is not None:
+        pstats_path = job_dir / "profile.pstats"
+        prof.dump_stats(pstats_path)
+        record_artifact(
+            job_id=job_id,
+            kind=PROFILE,
+            name=pstats_path.name,
+            path=str(pstats_path),
+            url=None,
+            meta={"format": "pstats", "seconds": round(seconds, 4), "top": _top_functions(prof)},
+        )
+    collapsed_path = job_dir / "profile.collapsed"
+    sampler.write_collapsed(collapsed_path)
+    alloc_path = job_dir / "allocations.json"
+    alloc_path.write_text(
+        json.dumps({"peak_traced_bytes": peak, "top": allocations}, indent=1),
+        encoding="utf-8",
+    )
+
+    record_artifact(
+        job_id=job_id,
+        kind=PROFILE,
+        name=collapsed_path.name,
+        path=str(collapsed_path),
+        url=None,
+        meta={
+            "format": "collapsed",
+            "samples": sum(sampler.stacks.values()),
+            "interval_ms": sampler.interval_s * 1000,
+        },
+    )
+    record_artifact(
+        job_id=job_id,
+        kind=PROFILE,
+        name=alloc_path.name,
+        path=str(alloc_path),
+        url=None,
+        meta={"format": "tracemalloc", "peak_traced_bytes": peak},
+    )
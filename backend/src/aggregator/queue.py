@@ -1,10 +1,10 @@
 from __future__ import annotations
 
 import os
-from typing import Any, Callable
+from typing import Any, Callable, Optional
 
 from redis import Redis
-from rq import Queue
+from rq import Queue, Retry
 
 
 def _redis() -> Redis:
@@ -12,15 +12,51 @@ def _redis() -> Redis:
     return Redis.from_url(url)
 
 
-def _queue() -> Queue:
-    names = os.getenv("RQ_QUEUES", "default")
-    name = [s.strip() for s in names.split(",") if s.strip()][0]
+def parse_queues(spec: str) -> list[tuple[str, int]]:
+    """
+    RQ_QUEUES as [(name, weight)]: "high:4,default:2,low" gives high four
+    times low's share of dequeue priority; a missing weight means 1.
+    """
+    out: list[tuple[str, int]] = []
+    for item in spec.split(","):
+        name, _, weight = item.strip().partition(":")
+        if not name:
+            continue
+        w = int(weight) if weight.strip() else 1
+        if w < 1:
+            raise ValueError(f"queue weight must be >= 1: {item.strip()!r}")
+        out.append((name.strip(), w))
+    return out or [("default", 1)]
+
+
+def _queue(name: Optional[str] = None) -> Queue:
+    if name is None:
+        name = parse_queues(os.getenv("RQ_QUEUES", "default"))[0][0]
     return Queue(name, connection=_redis())
 
 
-def enqueue(func: Callable[..., Any], *args: Any, **kwargs: Any):
+def queue_depths() -> dict[str, int]:
+    """Jobs waiting in each queue of RQ_QUEUES."""
+    redis = _redis()
+    return {
+        name: Queue(name, connection=redis).count
+        for name, _ in parse_queues(os.getenv("RQ_QUEUES", "default"))
+    }
+
+
+def enqueue(
+    func: Callable[..., Any],
+    *args: Any,
+    retries: int = 0,
+    queue: Optional[str] = None,
+    **kwargs: Any,
+):
     """
-    Enqueue a callable onto the first queue in RQ_QUEUES (default 'default').
+    Enqueue a callable onto `queue`, by default the first queue in RQ_QUEUES
+    (default 'default'). With retries, RQ re-runs the job after a failure
+    or a lost worker.
     """
-    q = _queue()
+    q = _queue(queue)
+    if retries > 0:
+        kwargs["retry"] = Retry(max=retries)
     return q.enqueue(func, *args, **kwargs)
@@ -1,28 +1,118 @@
 from __future__ import annotations
 
-from typing import Optional
+import asyncio
+import datetime as dt
+import json
+import os
+from typing import Any, AsyncIterator, Literal, Optional
 
-from fastapi import APIRouter
-from pydantic import BaseModel
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, PositiveInt, field_validator
 
-from src.aggregator.jobs_runtime import start_make_all_ga, Job
-from src.infra.db import get_job_record, list_jobs, list_artifacts
+from src.aggregator.jobs_runtime import (
+    BackendUnavailable,
+    IdempotencyConflict,
+    Job,
+    retry_job,
+    start_make_all_ga,
+    start_ridge,
+)
+from src.he_core.backends import registered_backends
+from src.he_core.backends.calibration import AUTO
+from src.infra import events
+from src.infra.db import artifact_dict, get_job_record, list_artifacts, list_job_logs, list_jobs_page
 
 router = APIRouter(prefix="/api/v1/jobs", tags=["jobs"])
 
 
+def _check_backend(v: str) -> str:
+    if v != AUTO and v not in registered_backends():
+        raise ValueError(f"unknown backend {v!r}")
+    return v
+
+
 class MakeAllGAReq(BaseModel):
     ga_csv: str
     d: int
     catalog_csv: Optional[str] = None
+    # Registry name, or "auto" to pick the fastest backend for (d, batch_size)
+    backend: str = AUTO
+    batch_size: int = Field(default=256, ge=1)
+    # Profile the run (cProfile, stack samples, allocations) into "profile" artifacts
+    profile: bool = False
+    # Bits of absolute precision the totals need: use the tuned (usually
+    # smaller) CKKS parameters for it instead of the defaults
+    precision_bits: Optional[int] = Field(default=None, ge=1, le=40)
+
+    _known_backend = field_validator("backend")(_check_backend)
+
+
+class RidgeReq(BaseModel):
+    data_csv: str
+    target: str = "y"
+    lam: float = Field(default=1.0, ge=0)
+    # Rows per encrypted Gram contribution; one timing run per entry
+    batch_sizes: list[PositiveInt] = Field(default_factory=lambda: [1, 8, 32], min_length=1)
+    backend: str = AUTO
+
+    _known_backend = field_validator("backend")(_check_backend)
 
 
 @router.post("/make-all-ga", summary="Create a new make-all-ga job")
-async def post_make_all_ga(req: MakeAllGAReq) -> dict[str, str]:
-    job: Job = await start_make_all_ga(ga_csv=req.ga_csv, d=req.d, catalog_csv=req.catalog_csv)
+async def post_make_all_ga(
+    req: MakeAllGAReq,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+) -> dict[str, object]:
+    """
+    Resubmitting the same request (or the same Idempotency-Key header)
+    returns the queued, running or succeeded job instead of a new one;
+    reused tells which happened.
+    """
+    try:
+        job: Job = await start_make_all_ga(
+            ga_csv=req.ga_csv,
+            d=req.d,
+            catalog_csv=req.catalog_csv,
+            backend=req.backend,
+            batch_size=req.batch_size,
+            idempotency_key=idempotency_key,
+            profile=req.profile,
+            precision_bits=req.precision_bits,
+        )
+    except BackendUnavailable as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from None
+    except IdempotencyConflict as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from None
+    return {"id": job.id, "reused": job.reused}
+
+
+@router.post("/ridge", summary="Create an encrypted ridge regression job")
+async def post_ridge(req: RidgeReq) -> dict[str, str]:
+    try:
+        job: Job = await start_ridge(
+            data_csv=req.data_csv,
+            target=req.target,
+            lam=req.lam,
+            batch_sizes=req.batch_sizes,
+            backend=req.backend,
+        )
+    except BackendUnavailable as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from None
     return {"id": job.id}
 
 
+@router.post("/{job_id}/retry", summary="Resume a failed job from its last checkpoint")
+async def post_retry(job_id: str) -> dict[str, str]:
+    try:
+        job = retry_job(job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Not Found") from None
+    except ValueError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from None
+    return {"id": job.id, "status": "queued"}
+
+
 @router.get("/{job_id}")
 async def get_job(job_id: str) -> dict[str, object]:
     rec = get_job_record(job_id)
@@ -38,8 +128,23 @@ async def get_job(job_id: str) -> dict[str, object]:
 
 
 @router.get("")
-async def list_jobs_route(limit: int = 50, offset: int = 0) -> dict[str, object]:
-    items, total = list_jobs(limit=limit, offset=offset)
+async def list_jobs_route(
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    kind: Optional[str] = None,
+    count: Literal["exact", "cached", "none"] = "cached",
+) -> dict[str, object]:
+    """
+    Newest first. Pass the returned next_cursor to get the following page
+    (keyset pagination, constant cost at any depth); offset is kept for
+    shallow pages. total is cached for a few seconds unless count=exact.
+    """
+    try:
+        page = list_jobs_page(limit, cursor, offset=offset, status=status, kind=kind, count=count)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from None
     return {
         "items": [
             {
@@ -49,11 +154,12 @@ async def list_jobs_route(limit: int = 50, offset: int = 0) -> dict[str, object]
                 "created_at": r.created_at.isoformat(),
                 "updated_at": r.updated_at.isoformat(),
             }
-            for r in items
+            for r in page.items
         ],
-        "total": total,
+        "total": page.total,
         "limit": limit,
         "offset": offset,
+        "next_cursor": page.next_cursor,
     }
 
 
@@ -72,4 +178,77 @@ async def list_artifacts_route(job_id: str) -> list[dict[str, object]]:
             "meta": a.meta or {},
         }
         for a in arts
-    ]
\ No newline at end of file
+    ]
+
+# -------------------------
+# Server-sent events
+# -------------------------
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _utc_naive(ts: str | dt.datetime) -> dt.datetime:
+    # SQLite hands back naive UTC, events carry aware UTC: compare as naive UTC
+    t = dt.datetime.fromisoformat(ts) if isinstance(ts, str) else ts
+    return t.astimezone(dt.UTC).replace(tzinfo=None) if t.tzinfo else t
+
+
+def _keepalive_s() -> float:
+    return float(os.environ.get("SSE_KEEPALIVE_S", "15"))
+
+
+@router.get("/{job_id}/events")
+async def job_events(job_id: str, request: Request) -> StreamingResponse:
+    """
+    text/event-stream of `status`, `log` and `artifact` events for one job.
+    Starts with a snapshot (current status, log lines, artifacts so far),
+    then pushes changes as they commit; the stream ends after the job
+    reaches a terminal status. One DB read per watcher, no polling.
+    """
+    if get_job_record(job_id) is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+    async def stream() -> AsyncIterator[str]:
+        # subscribe before the snapshot so no change falls between the two
+        async with events.subscribe(job_id) as queue:
+            rec = get_job_record(job_id)
+            assert rec is not None
+            logs = list_job_logs(job_id)
+            yield _sse(events.STATUS, {"status": rec.status, "updated_at": rec.updated_at.isoformat()})
+            if logs:
+                lines = [{"created_at": r.created_at.isoformat(), "line": r.line} for r in logs]
+                yield _sse(events.LOG, {"lines": lines})
+            seen_artifacts = set()
+            for art in list_artifacts(job_id):
+                data = artifact_dict(art)
+                seen_artifacts.add((data["name"], _utc_naive(data["created_at"])))
+                yield _sse(events.ARTIFACT, data)
+            if rec.status in events.TERMINAL_STATUSES:
+                return
+
+            seen_until = _utc_naive(logs[-1].created_at) if logs else None
+            while True:
+                try:
+                    ev = await asyncio.wait_for(queue.get(), timeout=_keepalive_s())
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    yield ": keepalive\n\n"
+                    continue
+                data = ev["data"]
+                if ev["event"] == events.LOG and seen_until is not None:
+                    # drop lines the snapshot already contained
+                    data = {"lines": [ln for ln in data["lines"] if _utc_naive(ln["created_at"]) > seen_until]}
+                    if not data["lines"]:
+                        continue
+                if ev["event"] == events.ARTIFACT and (data["name"], _utc_naive(data["created_at"])) in seen_artifacts:
+                    continue
+                yield _sse(ev["event"], data)
+                if ev["event"] == events.STATUS and data["status"] in events.TERMINAL_STATUSES:
+                    return
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
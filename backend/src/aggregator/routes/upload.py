@@ -1,30 +1,141 @@
 from __future__ import annotations
 
+import hashlib
 import os
-import shutil
-import uuid
-from typing import Final
+from typing import AsyncIterator, BinaryIO
 
-from fastapi import APIRouter, File, UploadFile
+from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import UploadFile
+
+from src.infra import cas
 
 router = APIRouter(prefix="/api/v1", tags=["upload"])
 
-RESULTS_DIR: Final[str] = os.environ.get("RESULTS_DIR", "results")
-UPLOAD_DIR: Final[str] = os.path.join(RESULTS_DIR, "uploads", "catalogs")
+# Accepted upload kinds; all of them land in the content-addressed store
+UPLOAD_KINDS = ("catalog", "ga_csv", "dataset")
+
+CHUNK_BYTES = 1024 * 1024
+
+
+def _check_kind(kind: str) -> None:
+    if kind not in UPLOAD_KINDS:
+        raise HTTPException(status_code=404, detail=f"unknown upload kind {kind!r}")
+
+
+def _max_upload_bytes() -> int:
+    return int(float(os.environ.get("MAX_UPLOAD_MB", "2048")) * 1024 * 1024)
+
+
+def _too_large(limit: int) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"upload exceeds {limit} bytes; PUT /api/v1/upload/{{kind}}/{{filename}} streams large files",
+    )
+
+
+def _write_hashed(out: BinaryIO, h: hashlib._Hash, chunk: bytes) -> None:
+    # one threadpool hop per chunk; hashlib drops the GIL on large buffers
+    h.update(chunk)
+    out.write(chunk)
+
+
+async def _ingest(chunks: AsyncIterator[bytes], name: str, limit: int) -> JSONResponse:
+    """
+    Write chunks to a staging file and SHA-256 them in the same pass, then
+    move the file into the content-addressed store (or drop it if those
+    bytes are stored already). File writes run in the threadpool so the
+    event loop never blocks on disk; the partial file is removed if the
+    limit is exceeded or the client aborts.
+    """
+    h = hashlib.sha256()
+    size = 0
+    part = cas.staging_path()
+    out: BinaryIO = await run_in_threadpool(open, part, "wb")
+    try:
+        async for chunk in chunks:
+            size += len(chunk)
+            if size > limit:
+                raise _too_large(limit)
+            await run_in_threadpool(_write_hashed, out, h, chunk)
+        await run_in_threadpool(out.close)
+    except BaseException:
+        out.close()
+        part.unlink(missing_ok=True)
+        raise
+    digest = h.hexdigest()
+    blob, created = await run_in_threadpool(cas.put_file, part, digest)
+    return JSONResponse(
+        {
+            "name": name,
+            "server_path": str(blob),
+            "ref": f"sha256:{digest}",
+            "sha256": digest,
+            "size": size,
+            "deduplicated": not created,
+        }
+    )
+
+
+async def _file_chunks(file: UploadFile) -> AsyncIterator[bytes]:
+    while chunk := await file.read(CHUNK_BYTES):
+        yield chunk
+
+
+def _check_declared_length(request: Request, limit: int) -> None:
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > limit:
+        raise _too_large(limit)
+
+
+_MULTIPART_BODY = {
+    "required": True,
+    "content": {
+        "multipart/form-data": {
+            "schema": {
+                "type": "object",
+                "properties": {"file": {"type": "string", "format": "binary"}},
+                "required": ["file"],
+            }
+        }
+    },
+}
 
 
-@router.post("/upload/catalog")
-async def upload_catalog(file: UploadFile = File(...)) -> JSONResponse:
-    # Resolve a safe filename even if client didn't send one (mypy-safe)
-    original_name: str = file.filename or "catalog.csv"
-    safe_name: str = os.path.basename(original_name)
+@router.post("/upload/{kind}", openapi_extra={"requestBody": _MULTIPART_BODY})
+async def upload_file(kind: str, request: Request) -> JSONResponse:
+    """
+    Multipart upload of a catalog, GA export or dataset CSV. Jobs accept
+    the returned `ref` ("sha256:<hex>") or `server_path` as their input.
 
-    os.makedirs(UPLOAD_DIR, exist_ok=True)
-    dest = os.path.join(UPLOAD_DIR, f"{uuid.uuid4().hex}_{safe_name}")
+    The form is parsed here rather than by a File() parameter, which would
+    spool the whole body before any check ran: a Content-Length over
+    MAX_UPLOAD_MB is refused up front, and chunked bodies (no length) are
+    refused outright; stream those with the raw PUT route.
+    """
+    _check_kind(kind)
+    limit = _max_upload_bytes()
+    if "content-length" not in request.headers:
+        raise HTTPException(status_code=411, detail="multipart uploads need a Content-Length; use PUT for streams")
+    _check_declared_length(request, limit)
+    async with request.form(max_files=1, max_fields=0) as form:
+        file = form.get("file")
+        if not isinstance(file, UploadFile):
+            raise HTTPException(status_code=422, detail="multipart field 'file' is required")
+        # Resolve a safe filename even if client didn't send one (mypy-safe)
+        name = os.path.basename(file.filename or f"{kind}.csv")
+        return await _ingest(_file_chunks(file), name, limit)
 
-    # Copy the stream to disk (separate lines for ruff E70x)
-    with open(dest, "wb") as out:
-        shutil.copyfileobj(file.file, out)
 
-    return JSONResponse({"server_path": dest})
\ No newline at end of file
+@router.put("/upload/{kind}/{filename}")
+async def upload_raw(kind: str, filename: str, request: Request) -> JSONResponse:
+    """
+    Raw-body upload: the request body is streamed straight to disk chunk by
+    chunk, without multipart parsing or a temporary copy. Preferred for
+    multi-GB GA exports.
+    """
+    _check_kind(kind)
+    limit = _max_upload_bytes()
+    _check_declared_length(request, limit)
+    return await _ingest(request.stream(), os.path.basename(filename), limit)
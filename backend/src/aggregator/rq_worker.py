@@ -1,22 +1,266 @@
 from __future__ import annotations
 
+import argparse
+import functools
+import logging
+import multiprocessing as mp
 import os
+import random
+import signal
+import threading
+import time
+from dataclasses import dataclass
+from multiprocessing.process import BaseProcess
+from pathlib import Path
+from typing import Any, Callable, Optional
 
 from redis import Redis
 from rq import Queue, Worker
 
+from src.aggregator.queue import parse_queues
 
-def main() -> None:
-    redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
-    redis = Redis.from_url(redis_url)
+log = logging.getLogger(__name__)
+
+
+def _preload_keys() -> None:
+    # Work horses are forked per job: load contexts/keys once in the parent
+    # (from RESULTS_DIR/cache/keys when another process already built them)
+    if os.getenv("HE_PRELOAD", "1").lower() in {"0", "false", "no"}:
+        return
+    from src.he_core.backends import preload
+
+    try:
+        log.info("preloaded HE keys for %s", ", ".join(preload()) or "no native backend")
+    except Exception as exc:  # a broken HE install must not keep the worker down
+        log.warning("HE key preload failed: %r", exc)
+
+
+# -------------------------
+# Weighted queue priority
+# -------------------------
+class WeightedWorker(Worker):
+    """
+    Worker that re-draws its queue order after every job: a weighted random
+    permutation (Efraimidis-Spirakis keys u ** (1 / w)), so a queue with
+    weight 4 is tried first four times as often as one with weight 1, while
+    every queue keeps being served.
+    """
+
+    def __init__(self, queues: list[Queue], *args: Any, weights: Optional[dict[str, int]] = None, **kwargs: Any):
+        super().__init__(queues, *args, **kwargs)
+        self.weights = weights or {}
+        self._rng = random.Random()
+        self.reorder_queues(self._ordered_queues[0])
+
+    def reorder_queues(self, reference_queue: Queue) -> None:
+        def key(q: Queue) -> float:
+            return float(self._rng.random() ** (1.0 / self.weights.get(q.name, 1)))
+
+        self._ordered_queues = sorted(self._ordered_queues, key=key, reverse=True)
 
-    names = os.getenv("RQ_QUEUES", "default")
-    queue_names = [s.strip() for s in names.split(",") if s.strip()] or ["default"]
-    queues = [Queue(n, connection=redis) for n in queue_names]
 
-    worker = Worker(queues, connection=redis)
+def _run_worker(
+    connect: Callable[[], Redis],
+    queues: list[tuple[str, int]],
+    burst: bool,
+    scheduler: bool,
+    worker_class: type[Worker] = WeightedWorker,
+) -> None:
+    redis = connect()
+    rq_queues = [Queue(name, connection=redis) for name, _ in queues]
+    if issubclass(worker_class, WeightedWorker):
+        worker: Worker = worker_class(rq_queues, connection=redis, weights=dict(queues))
+    else:
+        worker = worker_class(rq_queues, connection=redis)
     # with_scheduler=True keeps periodic cleanup and scheduled jobs working
-    worker.work(with_scheduler=True)
+    worker.work(burst=burst, with_scheduler=scheduler)
+
+
+# -------------------------
+# Memory accounting
+# -------------------------
+_PAGE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _children(pid: int) -> list[int]:
+    out = []
+    for stat in Path("/proc").glob("[0-9]*/stat"):
+        try:
+            # "pid (comm) state ppid ...": comm may contain spaces
+            fields = stat.read_text().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        if int(fields[1]) == pid:
+            out.append(int(stat.parent.name))
+    return out
+
+
+def tree_rss(pid: int) -> int:
+    """Resident bytes of a worker plus its work horse (Linux /proc)."""
+    total = 0
+    for p in [pid, *_children(pid)]:
+        try:
+            total += int(Path(f"/proc/{p}/statm").read_text().split()[1]) * _PAGE
+        except (OSError, IndexError, ValueError):
+            pass
+    return total
+
+
+# -------------------------
+# Supervisor
+# -------------------------
+@dataclass
+class _Slot:
+    index: int
+    process: BaseProcess
+    stop_sent: float = 0.0
+
+
+class Supervisor:
+    """
+    Runs `workers` WeightedWorker processes (forked after the HE keys are
+    preloaded, so they share them copy-on-write) and keeps them running:
+
+    - a worker that exits is replaced, unless in burst mode it exited cleanly
+    - a worker whose process tree (worker + horse) exceeds max_memory_mb is
+      asked to stop after its current job (SIGTERM, warm shutdown) and
+      replaced; if it is still over the ceiling after `kill_grace_s` it is
+      stopped cold, and RQ's retry resumes the job from its last checkpoint
+    - SIGTERM/SIGINT to the supervisor stops every worker warm
+
+    Only the first worker runs RQ's scheduler (none with scheduler=False).
+
+    `connect` replaces the Redis.from_url(redis_url) each worker opens, and
+    `worker_class` the WeightedWorker it runs (e.g. SimpleWorker, which runs
+    jobs in the worker process itself). A `connect` closure only reaches
+    the workers when they are forked; with a fakeredis.FakeRedis each
+    worker then starts from a copy of the supervisor's data, which is
+    enough to test supervision without a server.
+    """
+
+    def __init__(
+        self,
+        redis_url: str,
+        queues: list[tuple[str, int]],
+        workers: int,
+        max_memory_mb: float = 0,
+        burst: bool = False,
+        poll_s: float = 1.0,
+        kill_grace_s: float = 60.0,
+        scheduler: bool = True,
+        connect: Optional[Callable[[], Redis]] = None,
+        worker_class: type[Worker] = WeightedWorker,
+    ) -> None:
+        self.redis_url = redis_url
+        self.connect = connect or functools.partial(Redis.from_url, redis_url)
+        self.worker_class = worker_class
+        self.queues = queues
+        self.workers = workers
+        self.max_memory = int(max_memory_mb * 1024 * 1024)
+        self.burst = burst
+        self.poll_s = poll_s
+        self.kill_grace_s = kill_grace_s
+        self.scheduler = scheduler
+        self.restarts = 0
+        self.memory_restarts = 0
+        self._slots: list[_Slot] = []
+        self._stopping = threading.Event()
+        methods = mp.get_all_start_methods()
+        if connect is not None and "fork" not in methods:
+            raise ValueError("a custom connect needs the fork start method")
+        self._ctx: Any = mp.get_context("fork" if "fork" in methods else "spawn")
+
+    def _spawn(self, index: int) -> _Slot:
+        proc = self._ctx.Process(
+            target=_run_worker,
+            args=(self.connect, self.queues, self.burst, self.scheduler and index == 0, self.worker_class),
+            name=f"rq-worker-{index}",
+        )
+        proc.start()
+        return _Slot(index=index, process=proc)
+
+    def _check_memory(self, slot: _Slot) -> None:
+        pid = slot.process.pid
+        if not self.max_memory or pid is None or tree_rss(pid) <= self.max_memory:
+            return
+        now = time.monotonic()
+        if not slot.stop_sent:
+            log.warning("worker %d over %d MB: stopping after its current job", slot.index, self.max_memory >> 20)
+            os.kill(pid, signal.SIGTERM)
+            slot.stop_sent = now
+        elif now - slot.stop_sent > self.kill_grace_s:
+            log.warning("worker %d still over the memory ceiling: cold stop", slot.index)
+            os.kill(pid, signal.SIGTERM)  # a second SIGTERM takes the horse down
+            slot.stop_sent = now
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    def run(self) -> None:
+        self._slots = [self._spawn(i) for i in range(self.workers)]
+        try:
+            while not self._stopping.is_set():
+                for i, slot in enumerate(self._slots):
+                    proc = slot.process
+                    if proc.is_alive():
+                        self._check_memory(slot)
+                        continue
+                    proc.join()
+                    if self.burst and proc.exitcode == 0 and not slot.stop_sent:
+                        continue
+                    if slot.stop_sent:
+                        self.memory_restarts += 1
+                    self.restarts += 1
+                    self._slots[i] = self._spawn(slot.index)
+                if self.burst and not any(s.process.is_alive() for s in self._slots):
+                    return
+                self._stopping.wait(self.poll_s)
+        finally:
+            for slot in self._slots:
+                if slot.process.is_alive() and slot.process.pid is not None:
+                    os.kill(slot.process.pid, signal.SIGTERM)
+            for slot in self._slots:
+                slot.process.join()
+
+
+def _default_workers() -> int:
+    raw = os.getenv("RQ_WORKERS", "").strip()
+    return max(1, int(raw)) if raw else (os.cpu_count() or 1)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="RQ worker supervisor for HE jobs")
+    ap.add_argument("--workers", type=int, default=_default_workers(), help="worker processes (RQ_WORKERS, default: CPUs)")
+    ap.add_argument(
+        "--max-memory-mb",
+        type=float,
+        default=float(os.getenv("RQ_WORKER_MAX_MEMORY_MB", "0")),
+        help="restart a worker whose RSS (with its horse) exceeds this; 0 = no ceiling",
+    )
+    ap.add_argument("--burst", action="store_true", help="exit once the queues are empty")
+    ap.add_argument("--single", action="store_true", help="run one worker in this process, no supervisor")
+    args = ap.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    queues = parse_queues(os.getenv("RQ_QUEUES", "default"))
+
+    _preload_keys()
+    if args.single:
+        _run_worker(functools.partial(Redis.from_url, redis_url), queues, args.burst, scheduler=True)
+        return
+
+    sup = Supervisor(
+        redis_url,
+        queues,
+        args.workers,
+        max_memory_mb=args.max_memory_mb,
+        burst=args.burst,
+    )
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: sup.stop())
+    log.info("supervising %d workers on %s", args.workers, ", ".join(f"{n}:{w}" for n, w in queues))
+    sup.run()
 
 
 if __name__ == "__main__":
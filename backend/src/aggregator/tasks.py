@@ -1,55 +1,399 @@
 from __future__ import annotations
 
-import os
+import json
+from dataclasses import asdict
 from pathlib import Path
-from typing import Optional
-
-from src.infra.db import (
-    append_job_log,
-    record_artifact,
-    update_job_status,
-)
+from typing import Any, Callable, Optional
 
+import numpy as np
+import pandas as pd
 
-def _results_dir() -> Path:
-    base = os.environ.get("RESULTS_DIR")
-    return Path(base) if base else (Path.cwd() / "results")
+from src.aggregator.pipeline import Pipeline, Stage, StageContext
+from src.he_core.aggregation import Aggregate, TreeAccumulator, aggregate, decrypt_aggregate
+from src.he_core.backends.calibration import resolve_backend_name
+from src.he_core.backends.tuning import tuned
+from src.he_core.container import CIPHERTEXTS, ContainerWriter, default_compression, open_container
+from src.he_core.ops_ml import encrypted_ridge, ridge_solve
+from src.he_core.utils import EncryptedBatch, params_hash
+from src.vectorizers import ga
+from src.vectorizers.common import iter_xy_batches
+from src.infra import cas
+from src.infra.files import results_dir
 
 
-def run_make_all_ga(job_id: str, ga_csv: str, d: int, catalog_csv: Optional[str]) -> None:
+def resolve_input(name: str, upload_subdir: str) -> Optional[Path]:
     """
-    Minimal work used by tests:
-    - mark job running
-    - write results/<job_id>/hello.txt (artifact)
-    - write results/figures/hello.txt (served via /files/figures/hello.txt)
-    - record artifact
-    - mark job succeeded
+    An uploaded blob ("sha256:<hex>"), a path as given, else the same file
+    name under results/uploads/<subdir>.
     """
-    update_job_status(job_id, "running")
-    append_job_log(job_id, f"start: ga_csv={ga_csv}, d={d}, catalog_csv={catalog_csv}")
+    if name.startswith("sha256:"):
+        return cas.resolve(name)
+    p = Path(name)
+    if p.is_file():
+        return p
+    uploaded = results_dir() / "uploads" / upload_subdir / p.name
+    return uploaded if uploaded.is_file() else None
 
-    root = _results_dir()
 
-    # Artifact file (per job)
-    job_dir = root / job_id
-    job_dir.mkdir(parents=True, exist_ok=True)
-    hello_art = job_dir / "hello.txt"
+def _write_demo_artifacts(ctx: StageContext) -> None:
+    hello_art = ctx.job_dir / "hello.txt"
     hello_art.write_text("demo artifact\n", encoding="utf-8")
 
     # Publicly served file expected by test
-    fig_dir = root / "figures"
+    fig_dir = results_dir() / "figures"
     fig_dir.mkdir(parents=True, exist_ok=True)
     hello_pub = fig_dir / "hello.txt"
     hello_pub.write_text("demo artifact\n", encoding="utf-8")
 
-    record_artifact(
-        job_id=job_id,
-        kind="text",
-        name="hello.txt",
-        path=str(hello_art),
+    ctx.artifact(kind="text", name="hello.txt", path=str(hello_art), url=None, meta={"note": "demo artifact"})
+
+
+# -------------------------
+# make-all-ga
+# -------------------------
+def _ga_load(ctx: StageContext) -> dict[str, Any]:
+    """Resolve inputs and pin the backend, so a resumed job keeps using it."""
+    a = ctx.args
+    ga_path = resolve_input(a["ga_csv"], "ga_csv")
+    if ga_path is None:
+        ctx.log(f"warning: {a['ga_csv']} not found; writing demo artifact only")
+        _write_demo_artifacts(ctx)
+        return {"demo": True}
+    backend = resolve_backend_name(a["backend"], a["d"], a["batch_size"])
+    ctx.log(f"backend: {backend} (requested {a['backend']})")
+
+    catalog_path = resolve_input(a["catalog_csv"], "catalogs") if a["catalog_csv"] else None
+    if a["catalog_csv"] and catalog_path is None:
+        raise FileNotFoundError(f"catalog_csv not found: {a['catalog_csv']}")
+    return {
+        "backend": backend,
+        "ga_path": str(ga_path),
+        "catalog_path": str(catalog_path) if catalog_path else None,
+        # inputs by content, so repeat jobs reuse memoized outputs
+        "inputs": [cas.digest_of(ga_path), a["d"], cas.digest_of(catalog_path) if catalog_path else None],
+    }
+
+
+def _ga_vectorize(ctx: StageContext) -> dict[str, Any]:
+    d = ctx.args["d"]
+    vectors_key = cas.memo_key("ga-vectors", *ctx.state["inputs"])
+    memo = cas.memo_fetch(vectors_key, ctx.job_dir)
+    if memo is not None:
+        res = ga.GAVectorizeResult(
+            path=ctx.job_dir / memo["files"][0],
+            keys_path=ctx.job_dir / memo["files"][1],
+            **memo["result"],
+        )
+        ctx.log(f"reused vectors {vectors_key}: {res.n_rows} x {d} ({res.mode}, {_describe_rows(res)})")
+    else:
+        catalog = ctx.state["catalog_path"]
+        res = ga.vectorize(
+            ctx.state["ga_path"],
+            ctx.job_dir / "ga_vectors.npy",
+            d=d,
+            catalog_csv=Path(catalog) if catalog else None,
+            cache_dir=results_dir() / "cache",
+        )
+        ctx.log(f"vectorized {res.n_rows} x {d} ({res.mode}, {_describe_rows(res)})")
+        memo = {
+            "result": {k: getattr(res, k) for k in ("n_rows", "d", "lines", "mode", "unmapped", "mapped", "incomplete")},
+            "sha256": cas.digest_of(res.path),
+        }
+        cas.memo_store(vectors_key, [res.path, res.keys_path], memo)
+    ctx.output(res.path)
+    ctx.artifact(
+        kind="vectors",
+        name=res.path.name,
+        path=str(res.path),
+        url=None,
+        meta={"rows": res.n_rows, "d": d, "mode": res.mode, "sha256": memo["sha256"], **_row_counts(res)},
+    )
+    return {
+        "vectors_path": str(res.path),
+        "vectors_key": vectors_key,
+        "n_rows": res.n_rows,
+        **_row_counts(res),
+        **_ga_params(ctx, res.path),
+    }
+
+
+def _row_counts(res: ga.GAVectorizeResult) -> dict[str, int]:
+    """Export rows read, vectorized, and dropped (by reason)."""
+    return {
+        "lines_read": res.lines,
+        "lines_mapped": res.mapped,
+        "lines_incomplete": res.incomplete,
+        "lines_unmapped": res.unmapped,
+    }
+
+
+def _describe_rows(res: ga.GAVectorizeResult) -> str:
+    return (
+        f"{res.lines} lines read, {res.mapped} mapped, dropped {res.incomplete} "
+        f"without user/item id and {res.unmapped} not in the catalog"
+    )
+
+
+def _ga_params(ctx: StageContext, vectors_path: Path) -> dict[str, Any]:
+    """
+    With precision_bits, pin the tuned parameters for summing these vectors:
+    depth 0, values up to the largest column total. The bound is only known
+    here, after vectorizing, so a precision no secure setting reaches for
+    it keeps the default parameters (and says so in the job log).
+    """
+    bits = ctx.args.get("precision_bits")
+    if bits is None:
+        return {}
+    vectors = np.load(vectors_path, mmap_mode="r")
+    max_abs = float(np.abs(vectors).sum(axis=0).max()) if vectors.size else 1.0
+    try:
+        t = tuned(0, bits, ctx.args["d"], max_abs=max(max_abs, 1.0), backend=ctx.state["backend"])
+    except ValueError as exc:
+        ctx.log(f"keeping default params: {exc}")
+        return {}
+    ctx.log(f"params for {bits} bits, |total| <= {max_abs:g}: N={t.params.poly_modulus_degree} {t.params.coeff_mod_bit_sizes}")
+    return {"params": asdict(t.params)}
+
+
+def _totals_key(ctx: StageContext) -> str:
+    he = ctx.he
+    return cas.memo_key("ga-decrypted", ctx.state["vectors_key"], he.name, params_hash(he.params), ctx.args["batch_size"])
+
+
+def _ga_encrypt(ctx: StageContext) -> dict[str, Any]:
+    """
+    Encrypt batch_size rows at a time; each batch's ciphertexts are summed
+    into one partial, written to the encrypted.bin container (one partial
+    per batch keeps the file a small fraction of the full ciphertext set).
+    """
+    totals_key = _totals_key(ctx)
+    if cas.memo_fetch(totals_key, ctx.job_dir) is not None:
+        ctx.log(f"reused encrypted totals {totals_key}")
+        ctx.output(ctx.job_dir / "totals.npy")
+        return {"totals_path": str(ctx.job_dir / "totals.npy"), "totals_reused": True}
+
+    he, bs = ctx.he, ctx.args["batch_size"]
+    vectors = np.load(ctx.state["vectors_path"], mmap_mode="r")
+    n = vectors.shape[0]
+    out = ctx.output(ctx.job_dir / "encrypted.bin")
+    with ContainerWriter(
+        out, he, n_rows=n, d=vectors.shape[1], compression=default_compression(), meta={"content": "partials", "batch_size": bs}
+    ) as w:
+        for start in range(0, n, bs):
+            acc = TreeAccumulator(he)
+            acc.extend(he.encrypt(np.asarray(vectors[start : start + bs])).ciphertexts)
+            w.append(acc.result())
+            ctx.log(f"encrypted rows {start}-{min(start + bs, n)} of {n}")
+    ctx.artifact(kind=CIPHERTEXTS, name=out.name, path=str(out), url=None, meta=w.meta)
+    return {"encrypted_path": str(out), "partials": len(w), "totals_key": totals_key}
+
+
+def _ga_aggregate(ctx: StageContext) -> dict[str, Any]:
+    """Tree-sum the partials, then fold the row blocks inside the result."""
+    he, d = ctx.he, ctx.args["d"]
+    out = ctx.output(ctx.job_dir / "aggregate.bin")
+    if ctx.state["n_rows"] == 0:
+        out.write_bytes(b"")
+        return {"aggregate_path": str(out), "blocks": 0}
+    acc = TreeAccumulator(he)
+    with open_container(Path(ctx.state["encrypted_path"])) as c:
+        for blob in c:
+            acc.add(he.deserialize(blob))
+    agg = aggregate(he, EncryptedBatch([acc.result()], n_rows=ctx.state["n_rows"], d=d, params=he.params))
+    ctx.log(f"aggregated {acc.count} partials")
+    with ContainerWriter(out, he, n_rows=1, d=d, compression=default_compression(), meta={"content": "aggregate", "blocks": agg.blocks}) as w:
+        w.append(agg.ciphertext)
+    ctx.artifact(kind=CIPHERTEXTS, name=out.name, path=str(out), url=None, meta=w.meta)
+    return {"aggregate_path": str(out), "blocks": agg.blocks}
+
+
+def _ga_decrypt(ctx: StageContext) -> dict[str, Any]:
+    he, d = ctx.he, ctx.args["d"]
+    if ctx.state["blocks"] == 0:
+        totals = np.zeros(d)
+    else:
+        with open_container(Path(ctx.state["aggregate_path"])) as c:
+            ct = c.ciphertext(0, he)
+        totals = decrypt_aggregate(he, Aggregate(ciphertext=ct, d=d, blocks=ctx.state["blocks"]))
+    out = ctx.output(ctx.job_dir / "totals.npy")
+    np.save(out, totals)
+    cas.memo_store(ctx.state["totals_key"], [out], {"backend": he.name})
+    return {"totals_path": str(out)}
+
+
+def _ga_render(ctx: StageContext) -> dict[str, Any]:
+    d = ctx.args["d"]
+    totals = np.load(ctx.state["totals_path"])
+    totals_path = ctx.output(ctx.job_dir / "totals.csv")
+    np.savetxt(
+        totals_path,
+        np.column_stack([np.arange(d), totals]),
+        delimiter=",",
+        header="bucket,total",
+        comments="",
+        fmt=["%d", "%.6f"],
+    )
+    ctx.artifact(kind="table", name=totals_path.name, path=str(totals_path), url=None, meta={"backend": ctx.state["backend"]})
+    return {}
+
+
+def _has_input(state: dict[str, Any]) -> bool:
+    return not state.get("demo")
+
+
+def _needs_he(state: dict[str, Any]) -> bool:
+    return not state.get("demo") and not state.get("totals_reused")
+
+
+MAKE_ALL_GA = Pipeline(
+    "make-all-ga",
+    [
+        Stage("load", _ga_load),
+        Stage("vectorize", _ga_vectorize, when=_has_input),
+        Stage("encrypt", _ga_encrypt, when=_has_input),
+        Stage("aggregate", _ga_aggregate, when=_needs_he),
+        Stage("decrypt", _ga_decrypt, when=_needs_he),
+        Stage("render", _ga_render, when=_has_input),
+    ],
+)
+
+
+def run_make_all_ga(
+    job_id: str,
+    ga_csv: str,
+    d: int,
+    catalog_csv: Optional[str],
+    backend: str = "auto",
+    batch_size: int = 256,
+    profile: bool = False,
+    precision_bits: Optional[int] = None,
+) -> None:
+    """
+    make-all-ga as the MAKE_ALL_GA pipeline:
+    - load: resolve inputs, pin the HE backend ("auto" calibrates on d and batch_size)
+    - vectorize: GA export -> per-user vectors of width d (feature hashing,
+      or the cached catalog lookup when catalog_csv is set); with
+      precision_bits, pin the CKKS parameters tuned for the totals
+      (tuning.tuned) instead of the defaults
+    - encrypt: batch_size rows at a time, one summed partial per batch
+    - aggregate: tree-sum the partials and fold row blocks
+    - decrypt: totals vector
+    - render: totals.csv table artifact
+    Each stage is checkpointed, so re-running a failed job resumes it.
+    Vectors and totals are memoized under results/cache/derived by input
+    content (cas.memo_key), so repeat jobs reuse them.
+    If ga_csv cannot be found the job writes the demo hello.txt artifact
+    (served via /files/figures/hello.txt) instead.
+    With profile the run also records "profile" artifacts (see profiling.profiled).
+    """
+    MAKE_ALL_GA.run(
+        job_id,
+        profile=profile,
+        ga_csv=ga_csv,
+        d=d,
+        catalog_csv=catalog_csv,
+        backend=backend,
+        batch_size=batch_size,
+        precision_bits=precision_bits,
+    )
+
+
+# -------------------------
+# ridge
+# -------------------------
+def _ridge_load(ctx: StageContext) -> dict[str, Any]:
+    a = ctx.args
+    data_path = resolve_input(a["data_csv"], "datasets")
+    if data_path is None:
+        raise FileNotFoundError(f"data_csv not found: {a['data_csv']}")
+    header = list(pd.read_csv(data_path, nrows=0).columns)
+    d = len(header) - 1
+    backend = resolve_backend_name(a["backend"], d, max(a["batch_sizes"]))
+    ctx.log(f"backend: {backend} (requested {a['backend']}), d={d}")
+    return {"backend": backend, "data_path": str(data_path), "header": header, "d": d}
+
+
+def _ridge_fit(ctx: StageContext) -> dict[str, Any]:
+    """Encrypted X^T X / X^T y per batch size, decrypted and solved."""
+    runs = []
+    for bs in ctx.args["batch_sizes"]:
+        batches = iter_xy_batches(ctx.state["data_path"], ctx.args["target"], bs)
+        res = encrypted_ridge(ctx.he, batches, ctx.state["d"], lam=ctx.args["lam"], batch_size=bs)
+        ctx.log(f"batch_size={bs}: {res.ciphertexts} ciphertexts, timings={res.timings}")
+        runs.append(
+            {
+                "batch_size": res.batch_size,
+                "rows": res.rows,
+                "ciphertexts": res.ciphertexts,
+                "timings": res.timings,
+                "coef": res.coef.tolist(),
+            }
+        )
+    return {"runs": runs}
+
+
+def _ridge_reference(ctx: StageContext) -> dict[str, Any]:
+    """Plaintext solution from the same streamed statistics."""
+    d = ctx.state["d"]
+    xtx, xty = np.zeros((d, d)), np.zeros(d)
+    for X, y in iter_xy_batches(ctx.state["data_path"], ctx.args["target"], 4096):
+        xtx += X.T @ X
+        xty += X.T @ y
+    return {"reference": ridge_solve(xtx, xty, ctx.args["lam"]).tolist()}
+
+
+def _ridge_render(ctx: StageContext) -> dict[str, Any]:
+    runs, target = ctx.state["runs"], ctx.args["target"]
+    reference = np.asarray(ctx.state["reference"])
+    out = ctx.output(ctx.job_dir / "ridge.json")
+    payload = {
+        "backend": ctx.state["backend"],
+        "d": ctx.state["d"],
+        "lam": ctx.args["lam"],
+        "features": [c for c in ctx.state["header"] if c != target],
+        "coef": runs[-1]["coef"],
+        "max_abs_error": float(max(np.abs(np.asarray(r["coef"]) - reference).max() for r in runs)),
+        "runs": [{k: r[k] for k in ("batch_size", "rows", "ciphertexts", "timings")} for r in runs],
+    }
+    out.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    ctx.artifact(
+        kind="table",
+        name=out.name,
+        path=str(out),
         url=None,
-        meta={"note": "demo artifact"},
+        meta={"backend": ctx.state["backend"], "batch_sizes": ctx.args["batch_sizes"]},
     )
+    return {}
+
+
+RIDGE = Pipeline(
+    "ridge",
+    [
+        Stage("load", _ridge_load),
+        Stage("fit", _ridge_fit),
+        Stage("reference", _ridge_reference),
+        Stage("render", _ridge_render),
+    ],
+)
+
+
+def run_ridge(
+    job_id: str,
+    data_csv: str,
+    target: str,
+    lam: float,
+    batch_sizes: list[int],
+    backend: str = "auto",
+) -> None:
+    """
+    Encrypted ridge regression over a numeric CSV, once per batch size:
+    stream (X, y) batches, accumulate encrypted X^T X / X^T y, decrypt, solve.
+    Writes ridge.json with coefficients, per-stage timings per batch size and
+    the max deviation from the plaintext solution. Stages: load, fit,
+    reference, render (checkpointed like make-all-ga).
+    """
+    RIDGE.run(job_id, data_csv=data_csv, target=target, lam=lam, batch_sizes=batch_sizes, backend=backend)
+
 
-    append_job_log(job_id, "done")
-    update_job_status(job_id, "succeeded")
+# Job kind -> runner, for retries from the stored JobRecord.meta
+PIPELINES: dict[str, Callable[..., None]] = {"make-all-ga": run_make_all_ga, "ridge": run_ridge}
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Sequence, cast
+
+import numpy as np
+
+from src.he_core.backends import HEBackend, RotatingBackend
+from src.he_core.utils import EncryptedBatch, block_width
+
+
+@dataclass
+class Aggregate:
+    """
+    An encrypted column-total vector. `blocks` row blocks remain unfolded
+    when the backend cannot rotate; they are folded after decryption.
+    """
+
+    ciphertext: Any
+    d: int
+    blocks: int = 1
+
+
+# -------------------------
+# Rotation schedules
+# -------------------------
+def rotation_steps(span: int, start: int = 1) -> list[int]:
+    """
+    Power-of-two steps start, 2*start, ... < span. Rotating and adding along
+    this schedule sums `span // start` strided slots in log2 steps.
+    """
+    if span & (span - 1) or start & (start - 1):
+        raise ValueError("span and start must be powers of two")
+    steps = []
+    step = start
+    while step < span:
+        steps.append(step)
+        step <<= 1
+    return steps
+
+
+def required_rotation_keys(d: int, slots: int) -> list[int]:
+    """The only Galois keys aggregate()/row_totals() need for width d."""
+    width = block_width(d)
+    return sorted(set(rotation_steps(width)) | set(rotation_steps(slots, width)))
+
+
+def _ensure_keys(be: HEBackend, steps: list[int]) -> None:
+    ensure = getattr(be, "ensure_rotation_keys", None)
+    if ensure is not None and steps:
+        ensure(steps)
+
+
+def rotate_and_sum(be: RotatingBackend, ct: Any, steps: list[int]) -> Any:
+    """ct += rot(ct, s) for each s: log2(span) rotations instead of span."""
+    _ensure_keys(be, steps)
+    for s in steps:
+        ct = be.add(ct, be.rotate(ct, s))
+    return ct
+
+
+# -------------------------
+# Across ciphertexts
+# -------------------------
+def tree_sum(be: HEBackend, cts: Sequence[Any], workers: int = 1) -> Any:
+    """
+    Balanced pairwise reduction: n-1 additions in ceil(log2 n) levels. Each
+    level's additions are independent, so they can run on `workers` threads.
+    """
+    if not cts:
+        raise ValueError("tree_sum needs at least one ciphertext")
+    level = list(cts)
+    pool = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        while len(level) > 1:
+            pairs = [(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+            if pool is not None:
+                summed = list(pool.map(lambda ab: be.add(*ab), pairs))
+            else:
+                summed = [be.add(a, b) for a, b in pairs]
+            if len(level) % 2:
+                summed.append(level[-1])
+            level = summed
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return level[0]
+
+
+class TreeAccumulator:
+    """
+    Incremental balanced tree sum for ciphertexts that arrive one at a time
+    (streamed batches, client updates). Like a binary counter, it merges
+    equal-height partials as they appear, so at most log2(n) ciphertexts are
+    held and the final tree is as shallow as tree_sum's.
+    """
+
+    def __init__(self, be: HEBackend) -> None:
+        self._be = be
+        self._stack: list[tuple[int, Any]] = []
+        self.count = 0
+
+    def add(self, ct: Any) -> None:
+        height = 0
+        while self._stack and self._stack[-1][0] == height:
+            _, left = self._stack.pop()
+            ct = self._be.add(left, ct)
+            height += 1
+        self._stack.append((height, ct))
+        self.count += 1
+
+    def extend(self, cts: Sequence[Any]) -> None:
+        for ct in cts:
+            self.add(ct)
+
+    def result(self) -> Any:
+        if not self._stack:
+            raise ValueError("no ciphertexts accumulated")
+        return tree_sum(self._be, [ct for _, ct in reversed(self._stack)])
+
+
+# -------------------------
+# Public API
+# -------------------------
+def aggregate(be: HEBackend, batch: EncryptedBatch, workers: int = 1) -> Aggregate:
+    """
+    Column totals over every row in the batch: tree-sum the ciphertexts, then
+    fold the row blocks inside the result with log2(rows per ct) rotations.
+    """
+    ct = tree_sum(be, batch.ciphertexts, workers=workers)
+    width = block_width(batch.d)
+    blocks = be.slots // width
+    if blocks > 1 and be.supports_rotation:
+        ct = rotate_and_sum(cast(RotatingBackend, be), ct, rotation_steps(be.slots, width))
+        blocks = 1
+    return Aggregate(ciphertext=ct, d=batch.d, blocks=blocks)
+
+
+def group_totals(
+    be: HEBackend,
+    batch: EncryptedBatch,
+    groups: np.ndarray,
+    workers: int = 1,
+) -> dict[Any, Aggregate]:
+    """
+    Encrypted group-by: column totals per plaintext group label (store,
+    category, ...). Rows are selected with 0/1 plaintext masks; ciphertexts
+    holding no rows of a group are skipped rather than multiplied by zero.
+    """
+    groups = np.asarray(groups)
+    if groups.shape[0] != batch.n_rows:
+        raise ValueError("groups must have one label per encrypted row")
+
+    width = block_width(batch.d)
+    per_ct = be.slots // width
+    n_pad = len(batch.ciphertexts) * per_ct
+    ct_of_row = np.arange(batch.n_rows) // per_ct
+
+    out: dict[Any, Aggregate] = {}
+    for label in np.unique(groups):
+        member = groups == label
+        masks = np.zeros((n_pad, width))
+        masks[: batch.n_rows][member, : batch.d] = 1.0
+        masks = masks.reshape(len(batch.ciphertexts), per_ct * width)
+        selected = [
+            be.multiply_plain(batch.ciphertexts[i], masks[i])
+            for i in np.unique(ct_of_row[member])
+        ]
+        sub = EncryptedBatch(
+            ciphertexts=selected,
+            n_rows=int(member.sum()),
+            d=batch.d,
+            params=batch.params,
+        )
+        key = label.item() if hasattr(label, "item") else label
+        out[key] = aggregate(be, sub, workers=workers)
+    return out
+
+
+def row_totals(be: RotatingBackend, ct: Any, d: int) -> Any:
+    """Sum each row's d features into the first slot of its block."""
+    return rotate_and_sum(be, ct, rotation_steps(block_width(d)))
+
+
+def decrypt_aggregate(be: HEBackend, agg: Aggregate) -> np.ndarray:
+    """Decrypt to a length-d vector, folding any blocks left by aggregate()."""
+    width = block_width(agg.d)
+    vec = be.decrypt_vector(agg.ciphertext)[: agg.blocks * width]
+    return vec.reshape(agg.blocks, width).sum(axis=0)[: agg.d]
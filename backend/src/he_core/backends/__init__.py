@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Optional, Protocol, cast
+
+import numpy as np
+
+from src.he_core.utils import CKKSParams, EncryptedBatch
+from src.infra.metrics import instrument_backend
+
+
+class HEBackend(Protocol):
+    """
+    Operations every CKKS backend provides. Batch-level encrypt/decrypt work
+    on (n, d) matrices; the remaining ops act on single ciphertexts.
+    """
+
+    name: str
+    params: CKKSParams
+    # False when the backend has no rotate() (aggregation then folds after decrypt)
+    supports_rotation: bool
+
+    @property
+    def slots(self) -> int: ...
+
+    def encrypt(self, x: np.ndarray) -> EncryptedBatch: ...
+
+    def decrypt(self, batch: EncryptedBatch) -> np.ndarray: ...
+
+    def encrypt_vector(self, v: np.ndarray) -> Any: ...
+
+    def decrypt_vector(self, ct: Any) -> np.ndarray: ...
+
+    def add(self, a: Any, b: Any) -> Any: ...
+
+    def multiply_plain(self, ct: Any, plain: np.ndarray | float) -> Any: ...
+
+    def sum(self, ct: Any) -> Any: ...
+
+    def polyval(self, ct: Any, coeffs: list[float]) -> Any:
+        """sum(coeffs[i] * ct**i), in ceil(log2(degree + 1)) levels."""
+        ...
+
+    def public_keys(self) -> bytes:
+        """Encryption-only key material; get_backend(..., public_keys=...) loads it."""
+        ...
+
+    def serialize(self, ct: Any) -> bytes: ...
+
+    def deserialize(self, data: bytes) -> Any: ...
+
+
+class RotatingBackend(HEBackend, Protocol):
+    """A backend with supports_rotation set: it also has rotate()."""
+
+    def rotate(self, ct: Any, steps: int) -> Any:
+        """Rotate slots left by `steps` (right when negative)."""
+        ...
+
+
+# factory(params, public_keys=None): with public_keys the backend can encrypt
+# and evaluate but holds no secret key
+BackendFactory = Callable[..., HEBackend]
+
+# name -> (factory, availability probe)
+_REGISTRY: dict[str, tuple[BackendFactory, Callable[[], bool]]] = {}
+
+
+def register_backend(
+    name: str,
+    factory: BackendFactory,
+    available: Callable[[], bool] = lambda: True,
+) -> None:
+    _REGISTRY[name] = (factory, available)
+
+
+def registered_backends() -> list[str]:
+    return sorted(_REGISTRY)
+
+
+def available_backends(*, native_only: bool = False) -> list[str]:
+    names = [n for n, (_, ok) in sorted(_REGISTRY.items()) if ok()]
+    if native_only:
+        names = [n for n in names if n != "mock"]
+    return names
+
+
+def get_backend(
+    name: str,
+    params: Optional[CKKSParams] = None,
+    *,
+    public_keys: Optional[bytes] = None,
+) -> HEBackend:
+    try:
+        factory, available = _REGISTRY[name]
+    except KeyError:
+        raise ValueError(
+            f"unknown HE backend {name!r}; registered: {', '.join(registered_backends())}"
+        ) from None
+    if not available():
+        raise RuntimeError(f"HE backend {name!r} is registered but its library is not installed")
+    be = factory(params, public_keys=public_keys) if public_keys is not None else factory(params)
+    return cast(HEBackend, instrument_backend(be))
+
+
+def preload(names: Optional[list[str]] = None, params: Optional[CKKSParams] = None) -> list[str]:
+    """
+    Build or load the key sets of the given (default: all available native)
+    backends, so processes forked afterwards (RQ work horses) inherit them.
+    """
+    loaded = []
+    for name in names if names is not None else available_backends(native_only=True):
+        get_backend(name, params)
+        loaded.append(name)
+    return loaded
+
+
+def _register_builtin() -> None:
+    from src.he_core.backends.mock_backend import MockBackend
+    from src.he_core.backends.openfhe_backend import OpenFHEBackend, openfhe_available
+    from src.he_core.backends.tenseal_backend import TenSEALBackend, tenseal_available
+
+    register_backend("mock", MockBackend)
+    register_backend("tenseal", TenSEALBackend, tenseal_available)
+    register_backend("openfhe", OpenFHEBackend, openfhe_available)
+
+
+_register_builtin()
+
+__all__ = [
+    "HEBackend",
+    "RotatingBackend",
+    "available_backends",
+    "get_backend",
+    "preload",
+    "register_backend",
+    "registered_backends",
+]
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+
+from src.he_core.backends import available_backends, get_backend
+from src.he_core.utils import DEFAULT_PARAMS, CKKSParams
+
+AUTO = "auto"
+NO_NATIVE_BACKEND = (
+    'backend "auto" needs a native HE backend (tenseal or openfhe) and none is installed; '
+    'name "mock" explicitly to run without encryption'
+)
+
+# (d, batch_size, params) -> {backend name: seconds}
+_timings: dict[tuple[int, int, CKKSParams], dict[str, float]] = {}
+_lock = threading.Lock()
+
+
+def time_backend(
+    name: str,
+    d: int,
+    batch_size: int,
+    params: Optional[CKKSParams] = None,
+    repeats: int = 2,
+) -> float:
+    """
+    Best-of-`repeats` wall time for the operations jobs run: encrypt a
+    (batch_size, d) batch, add its ciphertexts up, decrypt. No rotations,
+    so timing a backend never builds Galois keys the jobs don't need.
+    """
+    be = get_backend(name, params)
+    x = np.random.default_rng(0).normal(size=(batch_size, d))
+    best = float("inf")
+    for _ in range(max(1, repeats)):
+        t0 = time.perf_counter()
+        batch = be.encrypt(x)
+        acc = batch.ciphertexts[0]
+        for ct in batch.ciphertexts[1:]:
+            acc = be.add(acc, ct)
+        be.decrypt_vector(acc)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def calibrate(
+    d: int,
+    batch_size: int,
+    candidates: Optional[list[str]] = None,
+    params: Optional[CKKSParams] = None,
+) -> str:
+    """
+    Time each candidate backend on this workload and return the fastest.
+    Results are cached per (d, batch_size, params) for the process lifetime.
+    Never picks the unencrypted mock on its own: with no native backend
+    installed this raises, and mock has to be named explicitly.
+    """
+    params = params or DEFAULT_PARAMS
+    names = candidates if candidates is not None else available_backends(native_only=True)
+    if not names:
+        raise RuntimeError(NO_NATIVE_BACKEND)
+
+    key = (d, batch_size, params)
+    with _lock:
+        timings = _timings.setdefault(key, {})
+    for name in names:
+        if name not in timings:
+            timings[name] = time_backend(name, d, batch_size, params)
+    return min(names, key=lambda n: timings[n])
+
+
+def calibration_table() -> dict[tuple[int, int, CKKSParams], dict[str, float]]:
+    with _lock:
+        return {k: dict(v) for k, v in _timings.items()}
+
+
+def resolve_backend_name(
+    name: str,
+    d: int,
+    batch_size: int,
+    params: Optional[CKKSParams] = None,
+) -> str:
+    """Map a per-job backend choice ("auto" or a registry name) to a name."""
+    if name == AUTO:
+        return calibrate(d, batch_size, params=params)
+    return name
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+
+from src.he_core.utils import (
+    DEFAULT_PARAMS,
+    CKKSParams,
+    EncryptedBatch,
+    pack_rows,
+    unpack_rows,
+)
+
+
+class MockBackend:
+    """
+    Plaintext stand-in with the same interface as the CKKS backends.
+    A "ciphertext" is a float64 array of `slots` values. NOT secure: use it
+    for tests and for running the pipeline without native HE libraries.
+    """
+
+    name = "mock"
+    supports_rotation = True
+
+    def __init__(self, params: Optional[CKKSParams] = None, public_keys: Optional[bytes] = None) -> None:
+        # no keys to load: public_keys is accepted for interface parity
+        self.params = params or DEFAULT_PARAMS
+
+    @property
+    def slots(self) -> int:
+        return self.params.slots
+
+    def encrypt(self, x: np.ndarray) -> EncryptedBatch:
+        x = np.asarray(x, dtype=np.float64)
+        if x.ndim == 1:
+            x = x[None, :]
+        packed = pack_rows(x, self.slots)
+        return EncryptedBatch(
+            ciphertexts=list(packed),
+            n_rows=x.shape[0],
+            d=x.shape[1],
+            params=self.params,
+        )
+
+    def decrypt(self, batch: EncryptedBatch) -> np.ndarray:
+        packed = np.stack([self.decrypt_vector(ct) for ct in batch.ciphertexts])
+        return unpack_rows(packed, batch.n_rows, batch.d)
+
+    def encrypt_vector(self, v: np.ndarray) -> np.ndarray:
+        out = np.zeros(self.slots, dtype=np.float64)
+        v = np.asarray(v, dtype=np.float64).ravel()
+        out[: v.size] = v
+        return out
+
+    def decrypt_vector(self, ct: np.ndarray) -> np.ndarray:
+        return np.array(ct, dtype=np.float64)
+
+    def add(self, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        return a + b
+
+    def multiply_plain(self, ct: np.ndarray, plain: np.ndarray | float) -> np.ndarray:
+        if np.ndim(plain) == 0:
+            return ct * float(plain)
+        return ct * self.encrypt_vector(np.asarray(plain))
+
+    def rotate(self, ct: np.ndarray, steps: int) -> np.ndarray:
+        # Positive steps rotate left, as in SEAL/OpenFHE
+        return np.roll(ct, -steps)
+
+    def sum(self, ct: np.ndarray) -> np.ndarray:
+        # Callers read slot 0; rotate-and-sum leaves the total in every slot
+        return np.full(self.slots, ct.sum(), dtype=np.float64)
+
+    def polyval(self, ct: np.ndarray, coeffs: list[float]) -> np.ndarray:
+        return np.polynomial.polynomial.polyval(ct, coeffs)
+
+    def public_keys(self) -> bytes:
+        return b""
+
+    def serialize(self, ct: np.ndarray) -> bytes:
+        return np.asarray(ct, dtype="<f8").tobytes()
+
+    def deserialize(self, data: bytes) -> np.ndarray:
+        return np.frombuffer(data, dtype="<f8").astype(np.float64)
@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Any, Optional
+
+import numpy as np
+
+from src.he_core.utils import (
+    DEFAULT_PARAMS,
+    CKKSParams,
+    EncryptedBatch,
+    key_cache,
+    pack_blobs,
+    pack_rows,
+    params_hash,
+    unpack_blobs,
+    unpack_rows,
+)
+
+try:  # optional native dependency (pip install ".[he]")
+    import openfhe as fhe
+except ImportError:  # pragma: no cover - exercised only without the extra
+    fhe = None
+
+
+def openfhe_available() -> bool:
+    return fhe is not None
+
+
+@dataclass
+class _OpenFHEState:
+    cc: Any
+    keys: Any
+    rotation_steps: set[int] = field(default_factory=set)
+    has_sum_keys: bool = False
+
+
+def crypto_context(params: CKKSParams, multiparty: bool = False) -> Any:
+    """A CKKS crypto context for `params`, without keys."""
+    if fhe is None:
+        raise RuntimeError("openfhe is not installed; pip install '.[he]'")
+    cp = fhe.CCParamsCKKSRNS()
+    cp.SetMultiplicativeDepth(max(1, len(params.coeff_mod_bit_sizes) - 2))
+    cp.SetScalingModSize(params.global_scale_bits)
+    cp.SetFirstModSize(params.coeff_mod_bit_sizes[0])
+    cp.SetRingDim(params.poly_modulus_degree)
+    cp.SetBatchSize(params.slots)
+
+    cc = fhe.GenCryptoContext(cp)
+    for feature in (
+        fhe.PKESchemeFeature.PKE,
+        fhe.PKESchemeFeature.KEYSWITCH,
+        fhe.PKESchemeFeature.LEVELEDSHE,
+        fhe.PKESchemeFeature.ADVANCEDSHE,
+    ):
+        cc.Enable(feature)
+    if multiparty:
+        cc.Enable(fhe.PKESchemeFeature.MULTIPARTY)
+    return cc
+
+
+def _dump_state(st: _OpenFHEState) -> bytes:
+    return pack_blobs(
+        fhe.Serialize(st.cc, fhe.BINARY),
+        fhe.Serialize(st.keys.publicKey, fhe.BINARY),
+        fhe.Serialize(st.keys.secretKey, fhe.BINARY),
+    )
+
+
+def _load_state(blob: bytes) -> _OpenFHEState:
+    cc_blob, pk_blob, sk_blob = unpack_blobs(blob)
+    cc = fhe.DeserializeCryptoContextString(cc_blob, fhe.BINARY)
+    keys = SimpleNamespace(
+        publicKey=fhe.DeserializePublicKeyString(pk_blob, fhe.BINARY),
+        secretKey=fhe.DeserializePrivateKeyString(sk_blob, fhe.BINARY),
+    )
+    cc.EvalMultKeyGen(keys.secretKey)
+    return _OpenFHEState(cc=cc, keys=keys)
+
+
+def _build_state(params: CKKSParams) -> _OpenFHEState:
+    cc = crypto_context(params)
+    keys = cc.KeyGen()
+    cc.EvalMultKeyGen(keys.secretKey)
+    # Rotation / sum keys are generated lazily, only for the steps used
+    return _OpenFHEState(cc=cc, keys=keys)
+
+
+def _state(params: CKKSParams) -> _OpenFHEState:
+    """
+    One crypto context and key pair per parameter set, shared through
+    key_cache(): every process loading the same entry decrypts the same
+    ciphertexts. The relinearization key is re-derived from the secret key
+    on load.
+    """
+    if fhe is None:
+        raise RuntimeError("openfhe is not installed; pip install '.[he]'")
+    return key_cache().get_or_create(
+        "openfhe",
+        params_hash(params),
+        build=lambda: _build_state(params),
+        dump=_dump_state,
+        load=_load_state,
+    )
+
+
+def _public_state(blob: bytes) -> _OpenFHEState:
+    """Encrypt-only state from OpenFHEBackend.public_keys(): no secret key."""
+    if fhe is None:
+        raise RuntimeError("openfhe is not installed; pip install '.[he]'")
+    cc_blob, pk_blob = unpack_blobs(blob)
+    cc = fhe.DeserializeCryptoContextString(cc_blob, fhe.BINARY)
+    pk = fhe.DeserializePublicKeyString(pk_blob, fhe.BINARY)
+    return _OpenFHEState(cc=cc, keys=SimpleNamespace(publicKey=pk, secretKey=None))
+
+
+class OpenFHEBackend:
+    """CKKS via OpenFHE (openfhe-python), same packing as the TenSEAL backend."""
+
+    name = "openfhe"
+    supports_rotation = True
+
+    def __init__(self, params: Optional[CKKSParams] = None, public_keys: Optional[bytes] = None) -> None:
+        self.params = params or DEFAULT_PARAMS
+        self._st = _state(self.params) if public_keys is None else _public_state(public_keys)
+
+    @classmethod
+    def from_state(cls, params: CKKSParams, state: _OpenFHEState) -> OpenFHEBackend:
+        """Wrap an existing context and key set (e.g. a joint threshold public key)."""
+        be = cls.__new__(cls)
+        be.params = params
+        be._st = state
+        return be
+
+    @property
+    def slots(self) -> int:
+        return self.params.slots
+
+    def _plain(self, v: np.ndarray) -> Any:
+        padded = np.zeros(self.slots, dtype=np.float64)
+        v = np.asarray(v, dtype=np.float64).ravel()[: self.slots]
+        padded[: v.size] = v
+        return self._st.cc.MakeCKKSPackedPlaintext(padded.tolist())
+
+    def encrypt(self, x: np.ndarray) -> EncryptedBatch:
+        x = np.asarray(x, dtype=np.float64)
+        if x.ndim == 1:
+            x = x[None, :]
+        packed = pack_rows(x, self.slots)
+        cc, pk = self._st.cc, self._st.keys.publicKey
+        cts = [cc.Encrypt(pk, cc.MakeCKKSPackedPlaintext(row.tolist())) for row in packed]
+        return EncryptedBatch(ciphertexts=cts, n_rows=x.shape[0], d=x.shape[1], params=self.params)
+
+    def decrypt(self, batch: EncryptedBatch) -> np.ndarray:
+        packed = np.stack([self.decrypt_vector(ct) for ct in batch.ciphertexts])
+        return unpack_rows(packed, batch.n_rows, batch.d)
+
+    def encrypt_vector(self, v: np.ndarray) -> Any:
+        return self._st.cc.Encrypt(self._st.keys.publicKey, self._plain(v))
+
+    def decrypt_vector(self, ct: Any) -> np.ndarray:
+        pt = self._st.cc.Decrypt(ct, self._st.keys.secretKey)
+        pt.SetLength(self.slots)
+        return np.asarray(pt.GetRealPackedValue(), dtype=np.float64)
+
+    def add(self, a: Any, b: Any) -> Any:
+        return self._st.cc.EvalAdd(a, b)
+
+    def multiply_plain(self, ct: Any, plain: np.ndarray | float) -> Any:
+        if np.ndim(plain) == 0:
+            return self._st.cc.EvalMult(ct, float(plain))
+        return self._st.cc.EvalMult(ct, self._plain(np.asarray(plain)))
+
+    def ensure_rotation_keys(self, steps: list[int]) -> None:
+        missing = sorted(set(steps) - self._st.rotation_steps)
+        if missing:
+            self._st.cc.EvalRotateKeyGen(self._st.keys.secretKey, missing)
+            self._st.rotation_steps.update(missing)
+
+    def rotate(self, ct: Any, steps: int) -> Any:
+        self.ensure_rotation_keys([steps])
+        return self._st.cc.EvalRotate(ct, steps)
+
+    def sum(self, ct: Any) -> Any:
+        if not self._st.has_sum_keys:
+            self._st.cc.EvalSumKeyGen(self._st.keys.secretKey)
+            self._st.has_sum_keys = True
+        return self._st.cc.EvalSum(ct, self.slots)
+
+    def polyval(self, ct: Any, coeffs: list[float]) -> Any:
+        # Paterson-Stockmeyer inside OpenFHE; needs the relinearization key
+        return self._st.cc.EvalPoly(ct, [float(c) for c in coeffs])
+
+    def public_keys(self) -> bytes:
+        return pack_blobs(
+            fhe.Serialize(self._st.cc, fhe.BINARY),
+            fhe.Serialize(self._st.keys.publicKey, fhe.BINARY),
+        )
+
+    def serialize(self, ct: Any) -> bytes:
+        return fhe.Serialize(ct, fhe.BINARY)
+
+    def deserialize(self, data: bytes) -> Any:
+        return fhe.DeserializeCiphertextString(data, fhe.BINARY)
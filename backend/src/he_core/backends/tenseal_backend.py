@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import threading
+from typing import Any, Optional
+
+import numpy as np
+
+from src.he_core.utils import (
+    DEFAULT_PARAMS,
+    CKKSParams,
+    EncryptedBatch,
+    key_cache,
+    pack_rows,
+    params_hash,
+    unpack_rows,
+)
+
+try:  # optional native dependency (pip install ".[he]")
+    import tenseal as ts
+except ImportError:  # pragma: no cover - exercised only without the extra
+    ts = None
+
+
+_keygen_lock = threading.Lock()
+
+
+def tenseal_available() -> bool:
+    return ts is not None
+
+
+def _build_context(params: CKKSParams) -> Any:
+    ctx = ts.context(
+        ts.SCHEME_TYPE.CKKS,
+        poly_modulus_degree=params.poly_modulus_degree,
+        coeff_mod_bit_sizes=list(params.coeff_mod_bit_sizes),
+    )
+    ctx.global_scale = 2.0**params.global_scale_bits
+    # Galois keys are large and slow to build; only sum() needs them, and
+    # ensure_galois_keys() generates them on its first call
+    return ctx
+
+
+def _dump_context(ctx: Any) -> bytes:
+    return ctx.serialize(
+        save_public_key=True,
+        save_secret_key=True,
+        save_galois_keys=True,
+        save_relin_keys=True,
+    )
+
+
+def _context(params: CKKSParams) -> Any:
+    """One CKKS context (and key set) per parameter set, shared through key_cache()."""
+    if ts is None:
+        raise RuntimeError("tenseal is not installed; pip install '.[he]'")
+    return key_cache().get_or_create(
+        "tenseal",
+        params_hash(params),
+        build=lambda: _build_context(params),
+        dump=_dump_context,
+        load=ts.context_from,
+    )
+
+
+class TenSEALBackend:
+    """
+    CKKS via TenSEAL. Rows are SIMD-packed, slots // block_width(d) rows per
+    ciphertext, so a 256-wide row costs 1/16th of a ciphertext at N=8192.
+    """
+
+    name = "tenseal"
+    supports_rotation = False
+
+    def __init__(self, params: Optional[CKKSParams] = None, public_keys: Optional[bytes] = None) -> None:
+        self.params = params or DEFAULT_PARAMS
+        if public_keys is not None:
+            if ts is None:
+                raise RuntimeError("tenseal is not installed; pip install '.[he]'")
+            self.context = ts.context_from(public_keys)
+        else:
+            self.context = _context(self.params)
+
+    @property
+    def slots(self) -> int:
+        return self.params.slots
+
+    def encrypt(self, x: np.ndarray) -> EncryptedBatch:
+        """Encrypt an (n, d) matrix; packing is one vectorised NumPy pass."""
+        x = np.asarray(x, dtype=np.float64)
+        if x.ndim == 1:
+            x = x[None, :]
+        packed = pack_rows(x, self.slots)
+        cts = [ts.ckks_vector(self.context, row.tolist()) for row in packed]
+        return EncryptedBatch(ciphertexts=cts, n_rows=x.shape[0], d=x.shape[1], params=self.params)
+
+    def decrypt(self, batch: EncryptedBatch) -> np.ndarray:
+        packed = np.stack([self.decrypt_vector(ct) for ct in batch.ciphertexts])
+        return unpack_rows(packed, batch.n_rows, batch.d)
+
+    def encrypt_vector(self, v: np.ndarray) -> Any:
+        return ts.ckks_vector(self.context, np.asarray(v, dtype=np.float64).ravel().tolist())
+
+    def decrypt_vector(self, ct: Any) -> np.ndarray:
+        out = np.zeros(self.slots, dtype=np.float64)
+        vals = np.asarray(ct.decrypt(), dtype=np.float64)
+        out[: vals.size] = vals
+        return out
+
+    def add(self, a: Any, b: Any) -> Any:
+        return a + b
+
+    def multiply_plain(self, ct: Any, plain: np.ndarray | float) -> Any:
+        if np.ndim(plain) == 0:
+            return ct * float(plain)  # scalar: no plaintext encoding of a full vector
+        plain = np.asarray(plain, dtype=np.float64).ravel()
+        padded = np.zeros(ct.size(), dtype=np.float64)
+        padded[: plain.size] = plain[: padded.size]
+        return ct * padded.tolist()
+
+    # No rotate(): TenSEAL's Python API does not expose slot rotation
+    # (supports_rotation = False); sum() rotates natively
+
+    def ensure_galois_keys(self) -> None:
+        """
+        Build the Galois keys sum() needs. TenSEAL can only build the full
+        set (every power-of-two step, both directions): it has no per-step
+        key generation, unlike OpenFHE's EvalRotateKeyGen.
+        """
+        with _keygen_lock:
+            if not self.context.has_galois_keys():
+                self.context.generate_galois_keys()
+                if self.context.is_private():
+                    # persist the new keys so other workers skip this step
+                    key_cache().put("tenseal", params_hash(self.params), self.context, _dump_context)
+
+    def sum(self, ct: Any) -> Any:
+        self.ensure_galois_keys()
+        return ct.sum()
+
+    def polyval(self, ct: Any, coeffs: list[float]) -> Any:
+        return ct.polyval([float(c) for c in coeffs])
+
+    def public_keys(self) -> bytes:
+        # public + relinearization keys; Galois keys stay with the key holder
+        return self.context.serialize(
+            save_public_key=True,
+            save_secret_key=False,
+            save_galois_keys=False,
+            save_relin_keys=True,
+        )
+
+    def serialize(self, ct: Any) -> bytes:
+        return ct.serialize()
+
+    def deserialize(self, data: bytes) -> Any:
+        return ts.ckks_vector_from(self.context, data)
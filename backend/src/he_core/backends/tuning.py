@@ -0,0 +1,321 @@
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+
+from src.he_core.backends import get_backend
+from src.he_core.utils import (
+    MAX_COEFF_BITS_128,
+    CKKSParams,
+    EncryptedBatch,
+    block_width,
+    pack_rows,
+    rows_per_ciphertext,
+)
+from src.infra.files import results_dir
+
+# Scale (one prime per rescaling level) sizes tried on every ring, smallest first
+SCALE_BITS = (20, 25, 30, 35, 40, 45, 50)
+# SEAL's coefficient-modulus primes are at most 60 bits
+_MAX_PRIME_BITS = 60
+# Integer bits the first prime keeps above a value's magnitude before it wraps
+_HEADROOM_BITS = 10
+# Reported precision when decryption is exact (mock)
+_EXACT_BITS = 64.0
+# Per-row cost gain a larger ring needs over the current pick: per-row costs
+# of neighbouring rings are often within timing noise, and the smaller ring
+# also has smaller ciphertexts and keys
+_MIN_GAIN = 0.1
+
+
+def magnitude_bits(max_abs: float) -> int:
+    """Bits left of the binary point needed for values up to max_abs."""
+    return max(0, math.ceil(math.log2(max_abs))) if max_abs > 0 else 0
+
+
+def candidates(depth: int, d: int, max_abs: float = 1.0) -> list[CKKSParams]:
+    """
+    Every 128-bit-secure setting with `depth` rescaling levels that fits a
+    d-wide row, cheapest first: by ring dimension, then by chain length.
+    Chains are (edge, scale * depth, edge), the edge primes sized to hold
+    max_abs at that scale.
+    """
+    if depth < 0:
+        raise ValueError(f"depth must be >= 0, got {depth}")
+    mag = magnitude_bits(max_abs)
+    out = []
+    for n, max_bits in sorted(MAX_COEFF_BITS_128.items()):
+        if block_width(d) > n // 2:
+            continue
+        for scale in SCALE_BITS:
+            edge = scale + mag + _HEADROOM_BITS
+            chain = (edge,) + (scale,) * depth + (edge,)
+            if edge > _MAX_PRIME_BITS or sum(chain) > max_bits:
+                break
+            out.append(CKKSParams(poly_modulus_degree=n, coeff_mod_bit_sizes=chain, global_scale_bits=scale))
+    return out
+
+
+# -------------------------
+# Measurement
+# -------------------------
+@dataclass(frozen=True)
+class Measurement:
+    params: CKKSParams
+    # encrypt + depth plaintext multiplications + decrypt, per packed row
+    seconds_per_row: float
+    # -log2 of the largest absolute error after decryption
+    precision_bits: float
+
+
+def measure(
+    backend: str,
+    params: CKKSParams,
+    depth: int,
+    d: int,
+    max_abs: float = 1.0,
+    repeats: int = 3,
+) -> Measurement:
+    """
+    Run the probe circuit on one full ciphertext of d-wide rows with values
+    in [-max_abs, max_abs]: encrypt, `depth` multiplications by plaintext
+    factors in [0.5, 1] (one rescale each), decrypt. Latency is best of
+    `repeats`, divided by the rows a ciphertext holds, so rings compare by
+    throughput rather than per-ciphertext cost.
+    """
+    be = get_backend(backend, params)
+    rows = rows_per_ciphertext(d, be.slots)
+    rng = np.random.default_rng(0)
+    x = rng.uniform(-max_abs, max_abs, (rows, d))
+    factors = rng.uniform(0.5, 1.0, (depth, rows, d))
+    masks = [pack_rows(f, be.slots)[0] for f in factors]
+    expected = x * factors.prod(axis=0)
+
+    best, err = float("inf"), 0.0
+    for _ in range(max(1, repeats)):
+        t0 = time.perf_counter()
+        ct = be.encrypt(x).ciphertexts[0]
+        for m in masks:
+            ct = be.multiply_plain(ct, m)
+        out = be.decrypt(EncryptedBatch([ct], n_rows=rows, d=d, params=params))
+        best = min(best, time.perf_counter() - t0)
+        err = max(err, float(np.abs(out - expected).max()))
+    bits = _EXACT_BITS if err == 0 else min(_EXACT_BITS, -math.log2(err))
+    return Measurement(params=params, seconds_per_row=best / rows, precision_bits=round(bits, 2))
+
+
+# -------------------------
+# Search
+# -------------------------
+@dataclass
+class Tuning:
+    backend: str
+    depth: int
+    precision_bits: int
+    width: int
+    magnitude_bits: int
+    best: Measurement
+    tried: list[Measurement] = field(default_factory=list)
+
+    @property
+    def params(self) -> CKKSParams:
+        return self.best.params
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, d: dict[str, Any]) -> Tuning:
+        def m(x: dict[str, Any]) -> Measurement:
+            return Measurement(
+                params=CKKSParams.from_dict(x["params"]),
+                seconds_per_row=x["seconds_per_row"],
+                precision_bits=x["precision_bits"],
+            )
+
+        return cls(
+            backend=d["backend"],
+            depth=d["depth"],
+            precision_bits=d["precision_bits"],
+            width=d["width"],
+            magnitude_bits=d["magnitude_bits"],
+            best=m(d["best"]),
+            tried=[m(x) for x in d["tried"]],
+        )
+
+
+def tune(
+    depth: int,
+    precision_bits: int,
+    d: int,
+    *,
+    max_abs: float = 1.0,
+    backend: str = "tenseal",
+    repeats: int = 3,
+) -> Tuning:
+    """
+    Measure candidates(depth, d, max_abs) in order and return the cheapest
+    (lowest seconds per row) that reaches `precision_bits`. A ring's chains
+    are tried shortest first and the first one that passes is the ring's
+    pick; the search stops at the first measurement not clearly cheaper
+    (by _MIN_GAIN) than the best so far, since longer chains and larger
+    rings only cost more.
+    """
+    tried: list[Measurement] = []
+    best: Optional[Measurement] = None
+    for params in candidates(depth, d, max_abs):
+        # encoding alone loses everything below 2**-scale
+        if params.global_scale_bits < precision_bits:
+            continue
+        if best is not None and best.params.poly_modulus_degree == params.poly_modulus_degree:
+            continue
+        try:
+            m = measure(backend, params, depth, d, max_abs, repeats)
+        except (RuntimeError, ValueError):
+            # e.g. too few primes of this size for the ring: not a usable chain
+            continue
+        tried.append(m)
+        if best is not None and m.seconds_per_row >= best.seconds_per_row * (1 - _MIN_GAIN):
+            break
+        if m.precision_bits >= precision_bits:
+            best = m
+    if best is None:
+        raise ValueError(
+            f"no 128-bit-secure setting reaches {precision_bits} bits at depth {depth} "
+            f"for d={d}, |x| <= {max_abs:g} (tried {len(tried)})"
+        )
+    return Tuning(
+        backend=backend,
+        depth=depth,
+        precision_bits=precision_bits,
+        width=block_width(d),
+        magnitude_bits=magnitude_bits(max_abs),
+        best=best,
+        tried=tried,
+    )
+
+
+# -------------------------
+# Parameter table
+# -------------------------
+# (backend, depth, precision_bits, block_width(d), magnitude_bits) -> Tuning;
+# d enters only through its block width, so d=200 and d=256 share an entry
+_table: dict[tuple[str, int, int, int, int], Tuning] = {}
+_lock = threading.Lock()
+# one search at a time: concurrent jobs wait for the entry instead of re-measuring
+_tune_lock = threading.Lock()
+
+
+def _table_dir() -> Path:
+    return results_dir() / "cache" / "params"
+
+
+def _entry_path(key: tuple[str, int, int, int, int]) -> Path:
+    return _table_dir() / ("-".join(str(k) for k in key) + ".json")
+
+
+def _lookup(key: tuple[str, int, int, int, int]) -> Optional[Tuning]:
+    with _lock:
+        hit = _table.get(key)
+    if hit is not None:
+        return hit
+    path = _entry_path(key)
+    if not path.is_file():
+        return None
+    hit = Tuning.from_dict(json.loads(path.read_text(encoding="utf-8")))
+    with _lock:
+        _table[key] = hit
+    return hit
+
+
+def _store(key: tuple[str, int, int, int, int], tuning: Tuning) -> None:
+    path = _entry_path(key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_text(json.dumps(tuning.to_dict(), indent=1), encoding="utf-8")
+    os.replace(tmp, path)
+    with _lock:
+        _table[key] = tuning
+
+
+def tuned(
+    depth: int,
+    precision_bits: int,
+    d: int,
+    *,
+    max_abs: float = 1.0,
+    backend: str = "tenseal",
+) -> Tuning:
+    """
+    The table entry for (depth, precision_bits, d, max_abs) on `backend`:
+    from memory, else RESULTS_DIR/cache/params (shared by every process),
+    else tuned now and stored in both.
+    """
+    key = (backend, depth, precision_bits, block_width(d), magnitude_bits(max_abs))
+    hit = _lookup(key)
+    if hit is not None:
+        return hit
+    with _tune_lock:
+        hit = _lookup(key)
+        if hit is not None:
+            return hit
+        result = tune(depth, precision_bits, d, max_abs=max_abs, backend=backend)
+        _store(key, result)
+        return result
+
+
+def tuned_params(
+    depth: int,
+    precision_bits: int,
+    d: int,
+    *,
+    max_abs: float = 1.0,
+    backend: str = "tenseal",
+) -> CKKSParams:
+    return tuned(depth, precision_bits, d, max_abs=max_abs, backend=backend).params
+
+
+def parameter_table() -> list[Tuning]:
+    """Every entry tuned so far, in this process or on disk."""
+    entries = {}
+    directory = _table_dir()
+    if directory.is_dir():
+        for path in sorted(directory.glob("*.json")):
+            t = Tuning.from_dict(json.loads(path.read_text(encoding="utf-8")))
+            entries[(t.backend, t.depth, t.precision_bits, t.width, t.magnitude_bits)] = t
+    with _lock:
+        entries.update(_table)
+    return list(entries.values())
+
+
+def clear_table(disk: bool = False) -> None:
+    with _lock:
+        _table.clear()
+    if disk and _table_dir().is_dir():
+        for f in _table_dir().glob("*.json"):
+            f.unlink(missing_ok=True)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Tune (or look up) CKKS parameters for a circuit")
+    ap.add_argument("--depth", type=int, required=True, help="multiplicative depth (rescaling levels)")
+    ap.add_argument("--precision", type=int, required=True, help="required bits of absolute precision")
+    ap.add_argument("--d", type=int, required=True, help="row width")
+    ap.add_argument("--max-abs", type=float, default=1.0, help="largest |value| the circuit produces")
+    ap.add_argument("--backend", default="tenseal")
+    args = ap.parse_args(argv)
+    t = tuned(args.depth, args.precision, args.d, max_abs=args.max_abs, backend=args.backend)
+    print(json.dumps(t.to_dict(), indent=1))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import zlib
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Iterator, Optional
+
+import numpy as np
+
+from src.he_core.utils import CKKSParams, EncryptedBatch, params_hash
+
+# Artifact.kind of ciphertext containers recorded by jobs
+CIPHERTEXTS = "ciphertexts"
+
+# -------------------------
+# Layout
+# -------------------------
+# preamble | header (JSON) | pad to 8 | index | payloads
+#
+# - preamble: magic, version, header length, ciphertext count
+# - header: backend, params, n_rows, d, compression, seeded, plus caller meta
+# - index: one (offset, length, raw length) u64 triple per ciphertext;
+#   offsets are absolute, so ciphertext k is one slice of the mapped file
+# - payloads: backend.serialize() blobs, each compressed on its own so any
+#   one can be read without the others
+MAGIC = b"HECB"
+VERSION = 1
+FORMAT = "hecb"
+_PREAMBLE = struct.Struct("<4sH2xII")
+_ENTRY = np.dtype("<u8")
+_ENTRY_BYTES = 3 * _ENTRY.itemsize
+_ALIGN = 8
+
+Codec = tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]
+
+
+def _align(n: int) -> int:
+    return -(-n // _ALIGN) * _ALIGN
+
+
+def _codec(name: Optional[str]) -> Optional[Codec]:
+    """(compress, decompress) for a compression name; None means stored as is."""
+    if name in (None, "", "none"):
+        return None
+    if name == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("zstandard is not installed; pip install '.[compress]'") from None
+        return zstandard.ZstdCompressor(level=3).compress, zstandard.ZstdDecompressor().decompress
+    if name == "zlib":
+        return (lambda b: zlib.compress(b, 6)), zlib.decompress
+    raise ValueError(f"unknown compression {name!r}; use none, zlib or zstd")
+
+
+def default_compression() -> Optional[str]:
+    """HE_ARTIFACT_COMPRESSION: none (default), zlib or zstd."""
+    name = os.environ.get("HE_ARTIFACT_COMPRESSION", "").strip().lower()
+    return None if name in ("", "none") else name
+
+
+# -------------------------
+# Writing
+# -------------------------
+class ContainerWriter:
+    """
+    Streams ciphertexts into a container. Payloads go to a side file as
+    they are appended; close() writes preamble, header and index, copies
+    the payloads behind them and moves the result into place atomically,
+    hashing it on the way (meta["sha256"], so record_artifact skips the
+    re-read).
+
+    seeded=True stores the backend's seeded form (serialize_seeded: the
+    uniformly random half of a fresh symmetric-key ciphertext replaced by
+    its PRNG seed, about half the size). Only fresh ciphertexts have one,
+    and only backends that define serialize_seeded can write it;
+    deserialize() reads both forms.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        he: Any,
+        *,
+        n_rows: int = 0,
+        d: int = 0,
+        compression: Optional[str] = None,
+        seeded: bool = False,
+        meta: Optional[dict[str, Any]] = None,
+    ) -> None:
+        self.path = Path(path)
+        self._codec = _codec(compression)
+        if seeded and not hasattr(he, "serialize_seeded"):
+            raise ValueError(f"backend {he.name!r} cannot serialize seeded ciphertexts")
+        self._serialize: Callable[[Any], bytes] = he.serialize_seeded if seeded else he.serialize
+        self.header: dict[str, Any] = {
+            **(meta or {}),
+            "backend": he.name,
+            "params": asdict(he.params),
+            "n_rows": n_rows,
+            "d": d,
+            "compression": compression if self._codec else None,
+            "seeded": seeded,
+        }
+        self.meta: dict[str, Any] = {}
+        self._entries: list[tuple[int, int, int]] = []
+        self._pos = 0
+        self._part = self.path.with_name(f"{self.path.name}.{os.getpid()}.part")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._f: BinaryIO = self._part.open("wb")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def append(self, ct: Any) -> None:
+        raw = self._serialize(ct)
+        blob = self._codec[0](raw) if self._codec else raw
+        self._f.write(blob)
+        self._entries.append((self._pos, len(blob), len(raw)))
+        self._pos += len(blob)
+
+    def extend(self, cts: list[Any]) -> None:
+        for ct in cts:
+            self.append(ct)
+
+    def close(self) -> dict[str, Any]:
+        """Finish the file; returns its artifact metadata (also in self.meta)."""
+        self._f.close()
+        header = json.dumps(self.header, sort_keys=True).encode()
+        index_offset = _align(_PREAMBLE.size + len(header))
+        data_offset = index_offset + _ENTRY_BYTES * len(self._entries)
+        index = np.array(self._entries, dtype=_ENTRY).reshape(-1, 3)
+        index[:, 0] += data_offset
+
+        digest = hashlib.sha256()
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with tmp.open("wb") as f:
+            for chunk in (
+                _PREAMBLE.pack(MAGIC, VERSION, len(header), len(self._entries)),
+                header,
+                b"\0" * (index_offset - _PREAMBLE.size - len(header)),
+                index.tobytes(),
+            ):
+                f.write(chunk)
+                digest.update(chunk)
+            with self._part.open("rb") as src:
+                while chunk := src.read(1 << 20):
+                    f.write(chunk)
+                    digest.update(chunk)
+        os.replace(tmp, self.path)
+        self._part.unlink(missing_ok=True)
+
+        self.meta = {
+            "format": FORMAT,
+            "version": VERSION,
+            "count": len(self._entries),
+            "backend": self.header["backend"],
+            "params_hash": params_hash(CKKSParams.from_dict(self.header["params"])),
+            "compression": self.header["compression"],
+            "seeded": self.header["seeded"],
+            "index_offset": index_offset,
+            "index_entry_bytes": _ENTRY_BYTES,
+            "data_offset": data_offset,
+            "payload_bytes": self._pos,
+            "raw_bytes": int(index[:, 2].sum()) if len(index) else 0,
+            "sha256": digest.hexdigest(),
+        }
+        return self.meta
+
+    def abort(self) -> None:
+        self._f.close()
+        self._part.unlink(missing_ok=True)
+
+    def __enter__(self) -> ContainerWriter:
+        return self
+
+    def __exit__(self, exc_type: object, *exc: object) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_batch(path: Path, he: Any, batch: EncryptedBatch, **kwargs: Any) -> dict[str, Any]:
+    """Write an EncryptedBatch as one container; returns its artifact metadata."""
+    with ContainerWriter(path, he, n_rows=batch.n_rows, d=batch.d, **kwargs) as w:
+        w.extend(batch.ciphertexts)
+    return w.meta
+
+
+# -------------------------
+# Reading
+# -------------------------
+def is_container(path: Path) -> bool:
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class CiphertextContainer:
+    """
+    A container file, memory-mapped: opening it reads the preamble, header
+    and index only, and blob(k) touches just ciphertext k's pages.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._file = open(self.path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if len(self._mm) < _PREAMBLE.size:
+                raise ValueError(f"{self.path} is not a ciphertext container")
+            magic, version, header_len, count = _PREAMBLE.unpack_from(self._mm, 0)
+        except Exception:
+            self._file.close()
+            raise
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{self.path} is not a ciphertext container")
+        if version != VERSION:
+            self.close()
+            raise ValueError(f"{self.path}: unsupported container version {version}")
+        self.header: dict[str, Any] = json.loads(self._mm[_PREAMBLE.size : _PREAMBLE.size + header_len])
+        start = _align(_PREAMBLE.size + header_len)
+        # a copy, so the map can be closed while the index is still referenced
+        self.index = np.frombuffer(self._mm[start : start + _ENTRY_BYTES * count], dtype=_ENTRY).reshape(count, 3)
+        self._codec = _codec(self.header["compression"])
+
+    @property
+    def params(self) -> CKKSParams:
+        return CKKSParams.from_dict(self.header["params"])
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def blob(self, k: int) -> bytes:
+        """Serialized ciphertext k, decompressed."""
+        offset, length, _ = (int(v) for v in self.index[k])
+        data = self._mm[offset : offset + length]
+        return self._codec[1](data) if self._codec else data
+
+    def __iter__(self) -> Iterator[bytes]:
+        for k in range(len(self)):
+            yield self.blob(k)
+
+    def _check(self, he: Any) -> None:
+        if he.name != self.header["backend"] or he.params != self.params:
+            raise ValueError(
+                f"{self.path} holds {self.header['backend']} ciphertexts "
+                f"(params {params_hash(self.params)}), not {he.name} ({params_hash(he.params)})"
+            )
+
+    def ciphertext(self, k: int, he: Any) -> Any:
+        """Ciphertext k, deserialized by a backend with the container's parameters."""
+        self._check(he)
+        return he.deserialize(self.blob(k))
+
+    def batch(self, he: Any) -> EncryptedBatch:
+        self._check(he)
+        return EncryptedBatch(
+            ciphertexts=[he.deserialize(b) for b in self],
+            n_rows=self.header["n_rows"],
+            d=self.header["d"],
+            params=self.params,
+        )
+
+    def close(self) -> None:
+        if getattr(self, "_mm", None) is not None:
+            self._mm.close()
+        self._file.close()
+
+    def __enter__(self) -> CiphertextContainer:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+def open_container(path: Path) -> CiphertextContainer:
+    return CiphertextContainer(path)
+
+
+def read_batch(path: Path, he: Any) -> EncryptedBatch:
+    with open_container(path) as c:
+        return c.batch(he)
@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional, Sequence
+
+import numpy as np
+
+from src.he_core.aggregation import TreeAccumulator
+from src.he_core.backends import HEBackend, get_backend
+from src.he_core.multiparty.threshold_api import ThresholdBackend, threshold_decrypt, threshold_keygen
+from src.he_core.utils import CKKSParams
+
+# client_fn(store_id, global_weights) -> (update of width d, local sample count)
+ClientFn = Callable[[int, np.ndarray], tuple[np.ndarray, int]]
+
+
+# -------------------------
+# Simulated store clients
+# -------------------------
+@dataclass(frozen=True)
+class SimulatedStores:
+    """
+    Deterministic synthetic stores for a linear model: store k always sees the
+    same local data, and its update is the sample-weighted local gradient of
+    the squared loss at the broadcast weights. Picklable, so it can be shipped
+    to worker processes.
+    """
+
+    seed: int = 0
+    min_rows: int = 50
+    max_rows: int = 500
+    noise: float = 0.1
+
+    def true_weights(self, d: int) -> np.ndarray:
+        return np.random.default_rng(self.seed).normal(size=d)
+
+    def data(self, store_id: int, d: int) -> tuple[np.ndarray, np.ndarray]:
+        rng = np.random.default_rng([self.seed, store_id])
+        n = int(rng.integers(self.min_rows, self.max_rows + 1))
+        X = rng.normal(size=(n, d))
+        y = X @ self.true_weights(d) + self.noise * rng.normal(size=n)
+        return X, y
+
+    def __call__(self, store_id: int, w: np.ndarray) -> tuple[np.ndarray, int]:
+        X, y = self.data(store_id, len(w))
+        return X.T @ (X @ w - y) / len(y), len(y)
+
+
+# -------------------------
+# Worker-process side
+# -------------------------
+_client_be: Optional[HEBackend] = None
+
+
+def _init_client(backend: str, params: Optional[CKKSParams], public_keys: bytes) -> None:
+    # Once per worker process: load the coordinator's public keys only
+    global _client_be
+    _client_be = get_backend(backend, params, public_keys=public_keys)
+
+
+@dataclass
+class ClientUpdate:
+    store_id: int
+    payload: list[bytes]
+    n_samples: int
+    seconds: float
+
+
+def _client_round(client_fn: ClientFn, store_id: int, w: np.ndarray) -> ClientUpdate:
+    """Compute a store's update, encrypt [n * update, n] and serialise it."""
+    assert _client_be is not None, "worker process was not initialised"
+    t0 = time.perf_counter()
+    update, n = client_fn(store_id, w)
+    values = np.append(np.asarray(update, dtype=np.float64) * n, float(n))
+    slots = _client_be.slots
+    payload = [
+        _client_be.serialize(_client_be.encrypt_vector(values[i : i + slots]))
+        for i in range(0, values.size, slots)
+    ]
+    return ClientUpdate(store_id, payload, int(n), time.perf_counter() - t0)
+
+
+# -------------------------
+# Coordinator
+# -------------------------
+@dataclass
+class RoundReport:
+    round: int
+    clients: int
+    samples: int
+    update: np.ndarray
+    seconds: float
+    first_arrival: float
+    ingest_seconds: float
+    client_seconds: list[float] = field(default_factory=list)
+    failed: list[int] = field(default_factory=list)
+
+    def as_dict(self) -> dict[str, Any]:
+        lat = np.asarray(self.client_seconds) if self.client_seconds else np.zeros(1)
+        return {
+            "round": self.round,
+            "clients": self.clients,
+            "failed": len(self.failed),
+            "samples": self.samples,
+            "seconds": round(self.seconds, 4),
+            "stores_per_second": round(self.clients / self.seconds, 2) if self.seconds else None,
+            "first_arrival": round(self.first_arrival, 4),
+            "ingest_seconds": round(self.ingest_seconds, 4),
+            "client_p50": round(float(np.percentile(lat, 50)), 4),
+            "client_p95": round(float(np.percentile(lat, 95)), 4),
+        }
+
+
+def _max_workers() -> int:
+    return int(os.environ.get("FEDERATED_WORKERS", os.cpu_count() or 1))
+
+
+class FederatedCoordinator:
+    """
+    Runs federated-averaging rounds over simulated store clients.
+
+    The coordinator owns the secret key; worker processes get only the public
+    keys (once, in the pool initializer) and return serialised ciphertexts.
+    Contributions are folded into a TreeAccumulator in arrival order, so
+    ingestion overlaps with the slower stores and only O(log n) partial sums
+    are held at any time. One decryption per round yields the sum of
+    n_k * update_k and the sample total, i.e. the weighted mean update.
+
+    client_fn defaults to a fresh SimulatedStores().
+
+    With parties >= 2 there is no single secret key: updates are encrypted
+    under an n-of-n threshold public key and each round ends in a threshold
+    decryption.
+    """
+
+    def __init__(
+        self,
+        d: int,
+        backend: str = "mock",
+        params: Optional[CKKSParams] = None,
+        workers: Optional[int] = None,
+        client_fn: Optional[ClientFn] = None,
+        parties: int = 0,
+    ) -> None:
+        self.d = d
+        self.threshold: Optional[ThresholdBackend] = None
+        if parties:
+            self.threshold = threshold_keygen(backend, parties, params)
+            self.be = self.threshold.be
+        else:
+            self.be = get_backend(backend, params)
+        self.backend = backend
+        self.params = params
+        self.workers = workers or _max_workers()
+        self.client_fn = client_fn if client_fn is not None else SimulatedStores()
+        self.n_ct = -(-(d + 1) // self.be.slots)
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: native HE libraries do not survive fork() with live threads
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_client,
+                initargs=(self.backend, self.params, self.be.public_keys()),
+            )
+        return self._pool
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def __enter__(self) -> FederatedCoordinator:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def run_round(self, stores: Sequence[int], w: np.ndarray, round_no: int = 0) -> RoundReport:
+        pool = self._get_pool()
+        t0 = time.perf_counter()
+        futures: dict[Future[ClientUpdate], int] = {
+            pool.submit(_client_round, self.client_fn, sid, w): sid for sid in stores
+        }
+        accs = [TreeAccumulator(self.be) for _ in range(self.n_ct)]
+        lat: list[float] = []
+        failed: list[int] = []
+        first: Optional[float] = None
+        ingest = 0.0
+        for fut in as_completed(futures):
+            try:
+                upd = fut.result()
+            except Exception:
+                # a dropped store is left out of the round, not fatal to it
+                failed.append(futures[fut])
+                continue
+            t_in = time.perf_counter()
+            if first is None:
+                first = t_in - t0
+            for acc, blob in zip(accs, upd.payload):
+                acc.add(self.be.deserialize(blob))
+            ingest += time.perf_counter() - t_in
+            lat.append(upd.seconds)
+
+        if not lat:
+            raise RuntimeError(f"round {round_no}: all {len(stores)} clients failed")
+        sums = [acc.result() for acc in accs]
+        if self.threshold is not None:
+            total = threshold_decrypt(self.threshold, sums).ravel()
+        else:
+            total = np.concatenate([self.be.decrypt_vector(ct) for ct in sums])
+        samples = float(total[self.d])
+        return RoundReport(
+            round=round_no,
+            clients=len(lat),
+            samples=int(round(samples)),
+            update=total[: self.d] / samples,
+            seconds=time.perf_counter() - t0,
+            first_arrival=first or 0.0,
+            ingest_seconds=ingest,
+            client_seconds=lat,
+            failed=sorted(failed),
+        )
+
+    def train(
+        self,
+        stores: Sequence[int],
+        rounds: int,
+        lr: float = 0.5,
+        w: Optional[np.ndarray] = None,
+    ) -> tuple[np.ndarray, list[RoundReport]]:
+        """Gradient-descent rounds: w <- w - lr * (weighted mean client update)."""
+        w = np.zeros(self.d) if w is None else np.asarray(w, dtype=np.float64)
+        reports = []
+        for r in range(rounds):
+            rep = self.run_round(stores, w, r)
+            w = w - lr * rep.update
+            reports.append(rep)
+        return w, reports
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import hashlib
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional, Protocol, Sequence
+
+import numpy as np
+
+from src.he_core.aggregation import Aggregate
+from src.he_core.backends import HEBackend
+from src.he_core.backends.mock_backend import MockBackend
+from src.he_core.utils import CKKSParams, block_width
+
+# Ciphertexts per partial-decryption call: large enough to amortise the
+# per-call overhead, small enough that combining overlaps the next batch
+DEFAULT_BATCH = 64
+
+
+class ThresholdBackend(Protocol):
+    """
+    n-of-n threshold CKKS: `be` encrypts and evaluates under the joint public
+    key, but no single party can decrypt. Every party produces a partial
+    decryption of the same ciphertexts (party 0 is the lead); `combine`
+    fuses one partial from each party into plaintext slot values.
+    """
+
+    name: str
+    n_parties: int
+    be: HEBackend
+
+    def partial_decrypt(self, party: int, cts: Sequence[Any]) -> list[Any]: ...
+
+    def combine(self, partials: Sequence[Sequence[Any]]) -> list[np.ndarray]:
+        """partials[p][j] is party p's share of ciphertext j."""
+        ...
+
+
+# -------------------------
+# Key generation registry
+# -------------------------
+ThresholdKeygen = Callable[[int, Optional[CKKSParams]], ThresholdBackend]
+
+_SCHEMES: dict[str, tuple[ThresholdKeygen, Callable[[], bool]]] = {}
+
+
+def register_threshold(
+    name: str,
+    keygen: ThresholdKeygen,
+    available: Callable[[], bool] = lambda: True,
+) -> None:
+    _SCHEMES[name] = (keygen, available)
+
+
+def threshold_keygen(name: str, n_parties: int, params: Optional[CKKSParams] = None) -> ThresholdBackend:
+    """Joint public key plus one secret-key share per party."""
+    if n_parties < 2:
+        raise ValueError(f"threshold decryption needs at least 2 parties, got {n_parties}")
+    try:
+        keygen, available = _SCHEMES[name]
+    except KeyError:
+        raise ValueError(f"no threshold scheme for backend {name!r}; have: {', '.join(sorted(_SCHEMES))}") from None
+    if not available():
+        raise RuntimeError(f"threshold backend {name!r} is registered but its library is not installed")
+    return keygen(n_parties, params)
+
+
+# -------------------------
+# Batched, concurrent decryption
+# -------------------------
+def _workers(n_parties: int) -> int:
+    return int(os.environ.get("THRESHOLD_WORKERS", min(32, 2 * n_parties)))
+
+
+def threshold_decrypt(
+    tb: ThresholdBackend,
+    cts: Sequence[Any],
+    batch_size: int = DEFAULT_BATCH,
+    workers: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Decrypt many ciphertexts to an (n, slots) array. Ciphertexts are split
+    into batches; every party's partial decryption of every batch is queued
+    up front and runs concurrently, and each batch is combined as soon as its
+    partials are in, while later batches are still being partially decrypted.
+    """
+    cts = list(cts)
+    out = np.empty((len(cts), tb.be.slots))
+    if not cts:
+        return out
+    starts = range(0, len(cts), batch_size)
+    with ThreadPoolExecutor(max_workers=workers or _workers(tb.n_parties)) as pool:
+        pending: list[list[Future[list[Any]]]] = [
+            [pool.submit(tb.partial_decrypt, p, cts[s : s + batch_size]) for p in range(tb.n_parties)]
+            for s in starts
+        ]
+        for s, futs in zip(starts, pending):
+            values = tb.combine([f.result() for f in futs])
+            out[s : s + len(values)] = np.stack(values)
+    return out
+
+
+def threshold_decrypt_aggregates(
+    tb: ThresholdBackend,
+    aggs: Sequence[Aggregate],
+    batch_size: int = DEFAULT_BATCH,
+    workers: Optional[int] = None,
+) -> list[np.ndarray]:
+    """Batched threshold counterpart of aggregation.decrypt_aggregate."""
+    rows = threshold_decrypt(tb, [a.ciphertext for a in aggs], batch_size, workers)
+    out = []
+    for agg, vec in zip(aggs, rows):
+        width = block_width(agg.d)
+        out.append(vec[: agg.blocks * width].reshape(agg.blocks, width).sum(axis=0)[: agg.d])
+    return out
+
+
+# -------------------------
+# Mock scheme
+# -------------------------
+class MockThreshold:
+    """
+    Threshold decryption over MockBackend "ciphertexts" (plaintext arrays).
+    Parties hold pairwise PRG seeds: each partial is the ciphertext masked by
+    R(k_i,i+1) - R(k_i-1,i) (the lead also adds the ciphertext itself), so the
+    masks telescope away only when all n partials are summed. NOT secure;
+    it exercises the same protocol shape as the OpenFHE scheme.
+    """
+
+    name = "mock"
+
+    def __init__(self, n_parties: int, params: Optional[CKKSParams] = None, seed: Optional[int] = None) -> None:
+        self.n_parties = n_parties
+        self.be: HEBackend = MockBackend(params)
+        rng = np.random.default_rng(seed)
+        # _pair_keys[i] is shared by parties i and i+1 (mod n)
+        self._pair_keys = [int(k) for k in rng.integers(0, 2**63, size=n_parties)]
+
+    def _mask(self, key: int, ct: np.ndarray) -> np.ndarray:
+        digest = int.from_bytes(hashlib.blake2b(ct.tobytes(), digest_size=8).digest(), "little")
+        return np.random.default_rng([key, digest]).uniform(-1e3, 1e3, size=ct.shape)
+
+    def partial_decrypt(self, party: int, cts: Sequence[Any]) -> list[np.ndarray]:
+        right = self._pair_keys[party]
+        left = self._pair_keys[party - 1]
+        out = []
+        for ct in cts:
+            share = self._mask(right, ct) - self._mask(left, ct)
+            out.append(share + ct if party == 0 else share)
+        return out
+
+    def combine(self, partials: Sequence[Sequence[Any]]) -> list[np.ndarray]:
+        if len(partials) != self.n_parties:
+            raise ValueError(f"need partial decryptions from all {self.n_parties} parties, got {len(partials)}")
+        return list(np.sum(np.stack([np.stack(p) for p in partials]), axis=0))
+
+
+def _register_builtin() -> None:
+    from src.he_core.backends.openfhe_backend import openfhe_available
+    from src.he_core.multiparty.threshold_openfhe import OpenFHEThreshold
+
+    register_threshold("mock", MockThreshold)
+    register_threshold("openfhe", OpenFHEThreshold, openfhe_available)
+
+
+_register_builtin()
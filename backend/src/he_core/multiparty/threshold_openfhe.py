@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+from typing import Any, Optional, Sequence
+
+import numpy as np
+
+from src.he_core.backends import HEBackend
+from src.he_core.backends.openfhe_backend import (
+    OpenFHEBackend,
+    _OpenFHEState,
+    crypto_context,
+    fhe,
+)
+from src.he_core.utils import DEFAULT_PARAMS, CKKSParams
+
+
+class OpenFHEThreshold:
+    """
+    n-of-n threshold CKKS with OpenFHE's multiparty API. Key shares are
+    chained: party 0 runs KeyGen and party i extends party i-1's public key
+    with MultipartyKeyGen; the last public key is the joint key.
+
+    MultipartyDecryptLead/Main take a whole list of ciphertexts, so each
+    party handles a batch in one call. Only the joint public key is set up
+    (no joint relinearization or rotation keys): this is for decrypting
+    aggregates, which need additions only.
+    """
+
+    name = "openfhe"
+
+    def __init__(self, n_parties: int, params: Optional[CKKSParams] = None) -> None:
+        if fhe is None:
+            raise RuntimeError("openfhe is not installed; pip install '.[he]'")
+        self.params = params or DEFAULT_PARAMS
+        self.n_parties = n_parties
+        cc = crypto_context(self.params, multiparty=True)
+        kp = cc.KeyGen()
+        self._shares = [kp.secretKey]
+        for _ in range(1, n_parties):
+            kp = cc.MultipartyKeyGen(kp.publicKey)
+            self._shares.append(kp.secretKey)
+        self._cc = cc
+        joint = SimpleNamespace(publicKey=kp.publicKey, secretKey=None)
+        self.be: HEBackend = OpenFHEBackend.from_state(self.params, _OpenFHEState(cc=cc, keys=joint))
+
+    def partial_decrypt(self, party: int, cts: Sequence[Any]) -> list[Any]:
+        if party == 0:
+            return list(self._cc.MultipartyDecryptLead(list(cts), self._shares[0]))
+        return list(self._cc.MultipartyDecryptMain(list(cts), self._shares[party]))
+
+    def combine(self, partials: Sequence[Sequence[Any]]) -> list[np.ndarray]:
+        if len(partials) != self.n_parties:
+            raise ValueError(f"need partial decryptions from all {self.n_parties} parties, got {len(partials)}")
+        out = []
+        for shares in zip(*partials):
+            pt = self._cc.MultipartyDecryptFusion(list(shares))
+            pt.SetLength(self.params.slots)
+            out.append(np.asarray(pt.GetRealPackedValue(), dtype=np.float64))
+        return out
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Iterable
+
+import numpy as np
+
+from src.he_core.aggregation import TreeAccumulator, tree_sum
+from src.he_core.backends import HEBackend
+
+
+class StageTimer:
+    """Accumulates wall time per named stage."""
+
+    def __init__(self) -> None:
+        self.seconds: dict[str, float] = defaultdict(float)
+
+    def add(self, stage: str, t0: float) -> float:
+        now = time.perf_counter()
+        self.seconds[stage] += now - t0
+        return now
+
+    def as_dict(self) -> dict[str, float]:
+        return {k: round(v, 6) for k, v in self.seconds.items()}
+
+
+# -------------------------
+# Ridge regression
+# -------------------------
+class EncryptedGramAccumulator:
+    """
+    Encrypted sufficient statistics for ridge regression. Each row batch
+    contributes upper-triangle(X^T X) and X^T y, SIMD-packed into
+    ceil((d(d+1)/2 + d) / slots) ciphertexts; contributions are summed per
+    slot-chunk with a balanced tree. Larger batches mean fewer encryptions
+    and additions for the same rows.
+    """
+
+    def __init__(self, be: HEBackend, d: int) -> None:
+        self.be = be
+        self.d = d
+        self._iu = np.triu_indices(d)
+        self.n_values = len(self._iu[0]) + d
+        self.n_ct = -(-self.n_values // be.slots)
+        self._accs = [TreeAccumulator(be) for _ in range(self.n_ct)]
+        self.rows = 0
+        self.contributions = 0
+        self.timer = StageTimer()
+
+    def add_batch(self, X: np.ndarray, y: np.ndarray) -> None:
+        t0 = time.perf_counter()
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64).ravel()
+        stats = np.zeros(self.n_ct * self.be.slots)
+        stats[: len(self._iu[0])] = (X.T @ X)[self._iu]
+        stats[len(self._iu[0]) : self.n_values] = X.T @ y
+        t0 = self.timer.add("pack", t0)
+
+        cts = self.be.encrypt(stats.reshape(self.n_ct, self.be.slots)).ciphertexts
+        t0 = self.timer.add("encrypt", t0)
+
+        for acc, ct in zip(self._accs, cts):
+            acc.add(ct)
+        self.timer.add("accumulate", t0)
+        self.rows += X.shape[0]
+        self.contributions += 1
+
+    def decrypt(self) -> tuple[np.ndarray, np.ndarray]:
+        t0 = time.perf_counter()
+        vals = np.concatenate([self.be.decrypt_vector(acc.result()) for acc in self._accs])
+        self.timer.add("decrypt", t0)
+        xtx = np.zeros((self.d, self.d))
+        xtx[self._iu] = vals[: len(self._iu[0])]
+        xtx = xtx + np.triu(xtx, 1).T
+        return xtx, vals[len(self._iu[0]) : self.n_values]
+
+
+def ridge_solve(xtx: np.ndarray, xty: np.ndarray, lam: float) -> np.ndarray:
+    return np.linalg.solve(xtx + lam * np.eye(xtx.shape[0]), xty)
+
+
+@dataclass
+class RidgeResult:
+    coef: np.ndarray
+    rows: int
+    batch_size: int
+    ciphertexts: int
+    timings: dict[str, float] = field(default_factory=dict)
+
+
+def encrypted_ridge(
+    be: HEBackend,
+    batches: Iterable[tuple[np.ndarray, np.ndarray]],
+    d: int,
+    lam: float = 1.0,
+    batch_size: int = 0,
+) -> RidgeResult:
+    """Accumulate encrypted Gram statistics over streamed (X, y) batches, decrypt, solve."""
+    acc = EncryptedGramAccumulator(be, d)
+    for X, y in batches:
+        acc.add_batch(X, y)
+    xtx, xty = acc.decrypt()
+    t0 = time.perf_counter()
+    coef = ridge_solve(xtx, xty, lam)
+    acc.timer.add("solve", t0)
+    timings = acc.timer.as_dict()
+    timings["total"] = round(sum(timings.values()), 6)
+    return RidgeResult(
+        coef=coef,
+        rows=acc.rows,
+        batch_size=batch_size,
+        ciphertexts=acc.contributions * acc.n_ct,
+        timings=timings,
+    )
+
+
+# -------------------------
+# Logistic regression inference
+# -------------------------
+def sigmoid_poly(degree: int, bound: float = 8.0) -> np.ndarray:
+    """
+    Least-squares odd polynomial approximation of the sigmoid on
+    [-bound, bound] (Chebyshev nodes); ascending coefficients.
+    """
+    if degree < 1 or degree % 2 == 0:
+        raise ValueError("sigmoid approximation degree must be odd and >= 1")
+    t = bound * np.cos(np.pi * (np.arange(512) + 0.5) / 512)
+    powers = np.arange(1, degree + 1, 2)
+    A = np.column_stack([np.ones_like(t)] + [t**p for p in powers])
+    sol, *_ = np.linalg.lstsq(A, 1.0 / (1.0 + np.exp(-t)), rcond=None)
+    coeffs = np.zeros(degree + 1)
+    coeffs[0] = sol[0]
+    coeffs[powers] = sol[1:]
+    return coeffs
+
+
+def logistic_depth(degree: int) -> int:
+    """Levels consumed: one for w*x, ceil(log2(degree + 1)) for the polynomial."""
+    return 1 + int(np.ceil(np.log2(degree + 1)))
+
+
+class EncryptedLogisticScorer:
+    """
+    Batched encrypted scoring with a plaintext model. Features are packed
+    column-wise (one ciphertext per feature, one customer per slot), so a
+    batch scores up to `slots` customers with d scalar multiplications, d-1
+    additions and one polynomial: no rotations or Galois keys needed.
+    The bias is folded into the polynomial's constant term.
+    """
+
+    def __init__(self, be: HEBackend, w: np.ndarray, b: float, degree: int = 3, bound: float = 8.0) -> None:
+        self.be = be
+        self.w = np.asarray(w, dtype=np.float64).ravel()
+        self.degree = degree
+        # p(z + b) re-expanded in z
+        shifted = np.polynomial.Polynomial(sigmoid_poly(degree, bound))(np.polynomial.Polynomial([b, 1.0]))
+        self.coeffs = np.zeros(degree + 1)
+        self.coeffs[: len(shifted.coef)] = shifted.coef
+        self.timer = StageTimer()
+
+    def encrypt_batch(self, X: np.ndarray) -> list[Any]:
+        X = np.asarray(X, dtype=np.float64)
+        if X.shape[0] > self.be.slots:
+            raise ValueError(f"batch of {X.shape[0]} customers exceeds {self.be.slots} slots")
+        t0 = time.perf_counter()
+        cols = np.zeros((X.shape[1], self.be.slots))
+        cols[:, : X.shape[0]] = X.T
+        cts = self.be.encrypt(cols).ciphertexts
+        self.timer.add("encrypt", t0)
+        return cts
+
+    def score(self, feature_cts: list[Any]) -> Any:
+        t0 = time.perf_counter()
+        terms = [self.be.multiply_plain(ct, float(wj)) for ct, wj in zip(feature_cts, self.w)]
+        z = tree_sum(self.be, terms)
+        t0 = self.timer.add("dot", t0)
+        out = self.be.polyval(z, self.coeffs.tolist())
+        self.timer.add("sigmoid", t0)
+        return out
+
+    def decrypt(self, ct: Any, n: int) -> np.ndarray:
+        t0 = time.perf_counter()
+        scores = self.be.decrypt_vector(ct)[:n]
+        self.timer.add("decrypt", t0)
+        return scores
+
+    def score_all(self, X: np.ndarray, batch_size: int) -> np.ndarray:
+        """Encrypt, score and decrypt X in batches of batch_size customers."""
+        out = np.empty(X.shape[0])
+        for start in range(0, X.shape[0], batch_size):
+            chunk = X[start : start + batch_size]
+            out[start : start + len(chunk)] = self.decrypt(self.score(self.encrypt_batch(chunk)), len(chunk))
+        return out
@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import struct
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Optional, TypeVar
+
+import numpy as np
+
+from src.infra.files import results_dir
+
+
+# -------------------------
+# Parameters
+# -------------------------
+@dataclass(frozen=True)
+class CKKSParams:
+    poly_modulus_degree: int = 8192
+    coeff_mod_bit_sizes: tuple[int, ...] = (60, 40, 40, 60)
+    global_scale_bits: int = 40
+
+    @property
+    def slots(self) -> int:
+        return self.poly_modulus_degree // 2
+
+    @classmethod
+    def from_dict(cls, d: dict[str, Any]) -> CKKSParams:
+        """Inverse of asdict(), e.g. for parameters kept in job state or JSON."""
+        return cls(
+            poly_modulus_degree=int(d["poly_modulus_degree"]),
+            coeff_mod_bit_sizes=tuple(int(b) for b in d["coeff_mod_bit_sizes"]),
+            global_scale_bits=int(d["global_scale_bits"]),
+        )
+
+
+DEFAULT_PARAMS = CKKSParams()
+
+# Max total coeff-modulus bits for 128-bit classical security (HE standard)
+MAX_COEFF_BITS_128 = {4096: 109, 8192: 218, 16384: 438, 32768: 881}
+
+
+def params_for_depth(depth: int, scale_bits: int = 40, edge_bits: int = 60) -> CKKSParams:
+    """
+    Smallest secure ring with `depth` rescaling levels: one scale-sized prime
+    per multiplication plus the two edge primes. Keeping depth low keeps N
+    (and every op's cost) small.
+    """
+    chain = (edge_bits,) + (scale_bits,) * depth + (edge_bits,)
+    for n, max_bits in sorted(MAX_COEFF_BITS_128.items()):
+        if sum(chain) <= max_bits:
+            return CKKSParams(poly_modulus_degree=n, coeff_mod_bit_sizes=chain, global_scale_bits=scale_bits)
+    raise ValueError(f"depth {depth} does not fit any supported ring at 128-bit security")
+
+
+# -------------------------
+# SIMD packing
+# -------------------------
+def block_width(d: int) -> int:
+    """Slot block reserved per row: d rounded up to a power of two."""
+    if d < 1:
+        raise ValueError(f"d must be positive, got {d}")
+    return 1 << (d - 1).bit_length()
+
+
+def rows_per_ciphertext(d: int, slots: int) -> int:
+    width = block_width(d)
+    if width > slots:
+        raise ValueError(f"d={d} does not fit in {slots} CKKS slots")
+    return slots // width
+
+
+def pack_rows(x: np.ndarray, slots: int) -> np.ndarray:
+    """
+    Pack an (n, d) matrix into an (n_ct, slots) matrix, one row per
+    ciphertext. Each input row occupies a zero-padded power-of-two block so
+    that rotations within a block never leak into its neighbours.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    if x.ndim == 1:
+        x = x[None, :]
+    n, d = x.shape
+    width = block_width(d)
+    per_ct = rows_per_ciphertext(d, slots)
+    n_ct = max(1, -(-n // per_ct))
+
+    packed = np.zeros((n_ct * per_ct, width), dtype=np.float64)
+    packed[:n, :d] = x
+    return packed.reshape(n_ct, per_ct * width)
+
+
+def unpack_rows(packed: np.ndarray, n_rows: int, d: int) -> np.ndarray:
+    """Inverse of pack_rows: (n_ct, slots) -> (n_rows, d)."""
+    width = block_width(d)
+    blocks = np.asarray(packed)[:, : (packed.shape[1] // width) * width]
+    return blocks.reshape(-1, width)[:n_rows, :d]
+
+
+@dataclass
+class EncryptedBatch:
+    """Ciphertexts holding n_rows packed rows of width d."""
+
+    ciphertexts: list[Any]
+    n_rows: int
+    d: int
+    params: CKKSParams = field(default=DEFAULT_PARAMS)
+
+    def __len__(self) -> int:
+        return len(self.ciphertexts)
+
+
+# -------------------------
+# Wire format
+# -------------------------
+def pack_blobs(*blobs: bytes) -> bytes:
+    """Length-prefixed concatenation, for shipping several key/ciphertext blobs as one."""
+    return b"".join(struct.pack("<Q", len(b)) + b for b in blobs)
+
+
+def unpack_blobs(data: bytes) -> list[bytes]:
+    out, pos = [], 0
+    view = memoryview(data)
+    while pos < len(view):
+        (size,) = struct.unpack_from("<Q", view, pos)
+        pos += 8
+        out.append(bytes(view[pos : pos + size]))
+        pos += size
+    return out
+
+
+# -------------------------
+# Key / context cache
+# -------------------------
+T = TypeVar("T")
+
+
+def params_hash(params: CKKSParams) -> str:
+    """Stable digest of a parameter set, used as its cache key."""
+    blob = json.dumps(asdict(params), sort_keys=True).encode()
+    return hashlib.sha256(blob).hexdigest()[:32]
+
+
+def _cache_dir() -> Path:
+    return results_dir() / "cache" / "keys"
+
+
+class KeyCache:
+    """
+    Two-tier cache for expensive, serialisable HE objects (contexts with
+    their key sets, evaluation keys, ciphertext blobs), addressed by
+    (namespace, key); contexts use params_hash(params) as the key.
+
+    - memory: LRU over live objects, bounded by the serialised size of the
+      entries (`budget_bytes`); evicted objects stay valid for whoever
+      still holds them
+    - disk: one file per entry under `directory`, written atomically, so
+      every process sharing RESULTS_DIR (RQ workers, the inline runtime,
+      scripts) loads the same keys instead of generating its own
+
+    Entries can include secret keys; files are created mode 0600.
+    """
+
+    def __init__(self, budget_bytes: int, directory: Optional[Path] = None) -> None:
+        self.budget_bytes = budget_bytes
+        self.directory = directory
+        self._mem: OrderedDict[tuple[str, str], tuple[Any, int]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._build_locks: dict[tuple[str, str], threading.Lock] = {}
+        self.hits = {"memory": 0, "disk": 0, "miss": 0}
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    def _path(self, namespace: str, key: str) -> Optional[Path]:
+        return self.directory / namespace / f"{key}.bin" if self.directory is not None else None
+
+    def _remember(self, slot: tuple[str, str], value: Any, size: int) -> None:
+        with self._lock:
+            if slot in self._mem:
+                self._bytes -= self._mem.pop(slot)[1]
+            self._mem[slot] = (value, size)
+            self._bytes += size
+            # keep at least the newest entry even if it alone exceeds the budget
+            while self._bytes > self.budget_bytes and len(self._mem) > 1:
+                _, (_, old) = self._mem.popitem(last=False)
+                self._bytes -= old
+
+    def _lookup(self, slot: tuple[str, str]) -> Any:
+        with self._lock:
+            hit = self._mem.get(slot)
+            if hit is not None:
+                self._mem.move_to_end(slot)
+                self.hits["memory"] += 1
+                return hit[0]
+        return None
+
+    def put(self, namespace: str, key: str, value: Any, dump: Callable[[Any], bytes]) -> None:
+        """Insert or refresh an entry in both tiers (e.g. after adding keys to a context)."""
+        blob = dump(value)
+        path = self._path(namespace, key)
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "wb") as f:
+                f.write(blob)
+            os.replace(tmp, path)
+        self._remember((namespace, key), value, len(blob))
+
+    def get_or_create(
+        self,
+        namespace: str,
+        key: str,
+        build: Callable[[], T],
+        dump: Callable[[T], bytes],
+        load: Callable[[bytes], T],
+    ) -> T:
+        slot = (namespace, key)
+        value = self._lookup(slot)
+        if value is not None:
+            return value
+        with self._lock:
+            build_lock = self._build_locks.setdefault(slot, threading.Lock())
+        # one builder per entry: concurrent jobs wait instead of duplicating keygen
+        with build_lock:
+            value = self._lookup(slot)
+            if value is not None:
+                return value
+            path = self._path(namespace, key)
+            if path is not None and path.is_file():
+                blob = path.read_bytes()
+                value = load(blob)
+                self.hits["disk"] += 1
+                self._remember(slot, value, len(blob))
+                return value
+            self.hits["miss"] += 1
+            value = build()
+            self.put(namespace, key, value, dump)
+            return value
+
+    def clear(self, disk: bool = False) -> None:
+        with self._lock:
+            self._mem.clear()
+            self._bytes = 0
+        if disk and self.directory is not None and self.directory.is_dir():
+            for f in self.directory.glob("*/*.bin"):
+                f.unlink(missing_ok=True)
+
+
+_key_cache: Optional[KeyCache] = None
+_key_cache_lock = threading.Lock()
+
+
+def key_cache() -> KeyCache:
+    """
+    Process-wide cache: HE_KEY_CACHE_MB of memory (default 1024) and
+    RESULTS_DIR/cache/keys on disk (HE_KEY_CACHE_DISK=0 disables the disk tier).
+    """
+    global _key_cache
+    with _key_cache_lock:
+        if _key_cache is None:
+            budget = int(float(os.environ.get("HE_KEY_CACHE_MB", "1024")) * 1024 * 1024)
+            disk = os.environ.get("HE_KEY_CACHE_DISK", "1").lower() not in {"0", "false", "no"}
+            _key_cache = KeyCache(budget, _cache_dir() if disk else None)
+        return _key_cache
+
+
+def reset_key_cache() -> None:
+    """Drop the process-wide cache (after changing RESULTS_DIR or the budget)."""
+    global _key_cache
+    with _key_cache_lock:
+        _key_cache = None
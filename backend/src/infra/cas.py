@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Optional, Sequence
+
+from src.infra.files import results_dir, sha256_file
+
+# Directories under RESULTS_DIR that must never be served from /files
+PRIVATE_DIRS = ("cas", "cache", "uploads")
+
+_HEX64 = re.compile(r"^[0-9a-f]{64}$")
+
+
+def store_root() -> Path:
+    return results_dir() / "cas" / "sha256"
+
+
+def memo_root() -> Path:
+    return results_dir() / "cache" / "derived"
+
+
+def _budget(var: str) -> int:
+    """Byte budget from an MB environment variable; 0 (the default) = unbounded."""
+    return max(0, int(float(os.environ.get(var, "0") or 0) * 1024 * 1024))
+
+
+def _evict(entries: list[tuple[float, int, Path]], budget: int, remove: Callable[[Path], None]) -> int:
+    """
+    Drop (last use, size, path) entries, least recently used first, until
+    the rest fit in `budget` bytes. Returns the number removed.
+    """
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in sorted(entries, key=lambda e: e[0]):
+        if total <= budget:
+            break
+        remove(path)
+        total -= size
+        removed += 1
+    return removed
+
+
+# -------------------------
+# Content-addressed blobs
+# -------------------------
+def blob_path(digest: str) -> Path:
+    """Where the blob with this SHA-256 lives (fanned out on the first two hex chars)."""
+    if not _HEX64.match(digest):
+        raise ValueError(f"not a sha256 hex digest: {digest!r}")
+    return store_root() / digest[:2] / digest
+
+
+def staging_path() -> Path:
+    """A fresh temporary file inside the store, on the same filesystem as the blobs."""
+    tmp = store_root() / "tmp"
+    tmp.mkdir(parents=True, exist_ok=True)
+    return tmp / f"{uuid.uuid4().hex}.part"
+
+
+def put_file(staged: Path, digest: str) -> tuple[Path, bool]:
+    """
+    Move a fully written, already hashed file into the store. If the same
+    content is stored already the staged copy is dropped. Returns
+    (blob path, created); a new blob may evict older ones (prune_blobs).
+    """
+    dest = blob_path(digest)
+    if dest.exists():
+        staged.unlink(missing_ok=True)
+        os.utime(dest)  # last use, for prune_blobs
+        return dest, False
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    os.chmod(staged, 0o444)
+    os.replace(staged, dest)
+    prune_blobs(keep=dest)
+    return dest, True
+
+
+def resolve(ref: str) -> Optional[Path]:
+    """Blob for a "sha256:<hex>" reference, or None if it is not stored."""
+    if not ref.startswith("sha256:"):
+        return None
+    try:
+        p = blob_path(ref[len("sha256:") :].lower())
+    except ValueError:
+        return None
+    if not p.is_file():
+        return None
+    os.utime(p)  # last use, for prune_blobs
+    return p
+
+
+def prune_blobs(keep: Optional[Path] = None) -> int:
+    """
+    Keep the blob store within CAS_MAX_MB (unset or 0: unbounded) by
+    deleting the blobs least recently stored or resolved; `keep` is never
+    deleted. A job whose upload was evicted before it ran fails on the
+    missing input.
+    """
+    budget = _budget("CAS_MAX_MB")
+    root = store_root()
+    if not budget or not root.is_dir():
+        return 0
+    entries = []
+    for p in root.glob("??/*"):
+        if p == keep or not _HEX64.match(p.name):
+            continue
+        try:
+            st = p.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((st.st_mtime, st.st_size, p))
+    if keep is not None and keep.is_file():
+        budget = max(0, budget - keep.stat().st_size)
+    return _evict(entries, budget, lambda p: p.unlink(missing_ok=True))
+
+
+_digests: dict[tuple[str, int, int], str] = {}
+_digests_lock = threading.Lock()
+
+
+def digest_of(path: Path) -> str:
+    """
+    SHA-256 of a file. Blobs are named by their digest; other files are
+    hashed once per (path, size, mtime) and remembered for the process.
+    """
+    path = Path(path).resolve()
+    if path.parent.parent == store_root().resolve() and _HEX64.match(path.name):
+        return path.name
+    st = path.stat()
+    key = (str(path), st.st_size, st.st_mtime_ns)
+    with _digests_lock:
+        known = _digests.get(key)
+    if known is not None:
+        return known
+    digest = sha256_file(path)
+    with _digests_lock:
+        _digests[key] = digest
+    return digest
+
+
+# -------------------------
+# Memoized derived outputs
+# -------------------------
+def memo_key(stage: str, *parts: Any) -> str:
+    """Key of a derived output: the stage name plus everything it depends on."""
+    blob = json.dumps([stage, *parts], sort_keys=True, default=str).encode()
+    return f"{stage}-{hashlib.sha256(blob).hexdigest()[:40]}"
+
+
+def _link_or_copy(src: Path, dest: Path) -> None:
+    dest.unlink(missing_ok=True)
+    try:
+        os.link(src, dest)
+    except OSError:  # cross-device or no hard links on this filesystem
+        shutil.copy2(src, dest)
+
+
+def memo_fetch(key: str, dest_dir: Path) -> Optional[dict[str, Any]]:
+    """
+    Materialise a memoized entry's files into dest_dir (hard links when
+    possible) and return its metadata, or None on a miss.
+    """
+    entry = memo_root() / key
+    meta_path = entry / "meta.json"
+    if not meta_path.is_file():
+        return None
+    try:
+        meta: dict[str, Any] = json.loads(meta_path.read_text(encoding="utf-8"))
+        dest_dir.mkdir(parents=True, exist_ok=True)
+        for name in meta.get("files", []):
+            _link_or_copy(entry / name, dest_dir / name)
+        os.utime(meta_path)  # last use, for prune_memo
+    except FileNotFoundError:  # evicted while we read it
+        return None
+    return meta
+
+
+def memo_store(key: str, files: Sequence[Path], meta: dict[str, Any]) -> None:
+    """
+    Publish files plus metadata under `key`. The entry is assembled in a
+    scratch directory and renamed into place, so readers never see a partial
+    entry; if another job published the same key first, theirs is kept.
+    """
+    root = memo_root()
+    entry = root / key
+    if entry.exists():
+        return
+    scratch = root / f".{key}.{uuid.uuid4().hex}"
+    scratch.mkdir(parents=True)
+    try:
+        for f in files:
+            _link_or_copy(Path(f), scratch / Path(f).name)
+        full = {**meta, "files": [Path(f).name for f in files]}
+        (scratch / "meta.json").write_text(json.dumps(full, default=str), encoding="utf-8")
+        os.rename(scratch, entry)
+    except OSError:
+        if not entry.exists():
+            raise
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    prune_memo(keep=key)
+
+
+def _drop_entry(entry: Path) -> None:
+    # renamed out of the way first, so no reader links from a half-deleted entry
+    doomed = entry.with_name(f".{entry.name}.{uuid.uuid4().hex}.evict")
+    try:
+        os.rename(entry, doomed)
+    except FileNotFoundError:
+        return
+    shutil.rmtree(doomed, ignore_errors=True)
+
+
+def prune_memo(keep: Optional[str] = None) -> int:
+    """
+    Keep memoized entries within MEMO_MAX_MB (unset or 0: unbounded) by
+    dropping those least recently stored or fetched; entry `keep` is never
+    dropped. Files still hard-linked from job directories only free their
+    space once those are deleted too.
+    """
+    budget = _budget("MEMO_MAX_MB")
+    root = memo_root()
+    if not budget or not root.is_dir():
+        return 0
+    entries = []
+    for entry in root.iterdir():
+        if entry.name.startswith("."):
+            continue
+        try:
+            used = (entry / "meta.json").stat().st_mtime
+            size = sum(f.stat().st_size for f in entry.iterdir())
+        except FileNotFoundError:
+            continue
+        if entry.name == keep:
+            budget = max(0, budget - size)
+            continue
+        entries.append((used, size, entry))
+    return _evict(entries, budget, _drop_entry)
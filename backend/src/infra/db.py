@@ -1,13 +1,17 @@
 from __future__ import annotations
 
 import os
-import hashlib
+import base64
+import threading
+import time
 import datetime as dt
+from contextlib import contextmanager
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Optional, List, cast
+from typing import Any, Iterable, Iterator, Optional, List, cast
 
-from sqlalchemy import Column, desc
-from sqlalchemy.engine import Engine
+from sqlalchemy import Column, Index, and_, desc, event, insert, or_
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.sql import func
 from sqlalchemy.sql.elements import ColumnElement
 from sqlmodel import (
@@ -19,17 +23,30 @@ from sqlmodel import (
     select,
 )
 
+from src.infra import events
+from src.infra.files import results_dir, sha256_file
+
 
 # -------------------------
 # Models
 # -------------------------
 class JobRecord(SQLModel, table=True):
+    # keyset pagination: newest first on (created_at, id), optionally filtered
+    __table_args__ = (
+        Index("ix_jobrecord_created_at_id", "created_at", "id"),
+        Index("ix_jobrecord_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_jobrecord_kind_created_at_id", "kind", "created_at", "id"),
+        # idempotent submission: newest job for a key
+        Index("ix_jobrecord_idempotency_key_created_at", "idempotency_key", "created_at"),
+    )
+
     id: str = Field(primary_key=True, index=True)
     kind: str
     status: str
     created_at: dt.datetime
     updated_at: dt.datetime
     meta: Optional[dict[str, Any]] = Field(default=None, sa_column=Column(JSON))
+    idempotency_key: Optional[str] = None
 
 
 class Artifact(SQLModel, table=True):
@@ -54,22 +71,54 @@ class JobLog(SQLModel, table=True):
 # Engine / setup
 # -------------------------
 _engine: Optional[Engine] = None
+_engine_lock = threading.Lock()
 
 
 def _default_db_url() -> str:
-    results_dir = os.environ.get("RESULTS_DIR")
-    base = Path(results_dir) if results_dir else (Path.cwd() / "results")
+    base = results_dir()
     base.mkdir(parents=True, exist_ok=True)
     return f"sqlite:///{base}/he.sqlite"
 
 
+def _sqlite_pragmas(dbapi_conn: Any, _record: Any) -> None:
+    # WAL lets API readers proceed while a worker writes; busy_timeout makes
+    # concurrent writers wait for the lock instead of failing with
+    # "database is locked"; synchronous=NORMAL is durable under WAL except
+    # for the last transactions on power loss
+    busy_ms = int(os.environ.get("DB_BUSY_TIMEOUT_MS", "5000"))
+    cur = dbapi_conn.cursor()
+    cur.execute("PRAGMA journal_mode=WAL")
+    cur.execute(f"PRAGMA busy_timeout={busy_ms}")
+    cur.execute("PRAGMA synchronous=NORMAL")
+    cur.close()
+
+
+def _engine_kwargs(url: str) -> dict[str, Any]:
+    if make_url(url).get_backend_name() == "sqlite":
+        # sessions may be used from job threads other than the creating one
+        return {"connect_args": {"check_same_thread": False}}
+    return {
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", "10")),
+        "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": True,
+    }
+
+
 def ensure_engine(db_url: Optional[str] = None) -> Engine:
     global _engine
-    if _engine is None:
-        url = db_url or os.environ.get("DB_URL") or _default_db_url()
-        _engine = create_engine(url, echo=False, future=True)
-        SQLModel.metadata.create_all(_engine)
-    return _engine
+    if _engine is not None:
+        return _engine
+    # job threads and the API may race to create the engine and the tables
+    with _engine_lock:
+        if _engine is None:
+            url = db_url or os.environ.get("DB_URL") or _default_db_url()
+            engine = create_engine(url, echo=False, future=True, **_engine_kwargs(url))
+            if engine.dialect.name == "sqlite" and make_url(url).database not in (None, "", ":memory:"):
+                event.listen(engine, "connect", _sqlite_pragmas)
+            SQLModel.metadata.create_all(engine)
+            _engine = engine
+        return _engine
 
 
 def create_tables() -> None:
@@ -77,6 +126,51 @@ def create_tables() -> None:
     SQLModel.metadata.create_all(engine)
 
 
+# -------------------------
+# Unit of work
+# -------------------------
+@contextmanager
+def unit_of_work() -> Iterator[Session]:
+    """
+    One transaction: commits when the block exits, rolls back on error.
+    Pass the session to the helpers below (session=...) to group a job
+    transition (status, log lines, artifacts) into a single commit.
+    """
+    with Session(ensure_engine(), expire_on_commit=False) as s:
+        try:
+            yield s
+            s.commit()
+        except BaseException:
+            s.rollback()
+            raise
+
+
+def _emit(s: Session, job_id: str, event_type: str, data: dict[str, Any]) -> None:
+    # queued on the session and published only once its transaction commits
+    s.info.setdefault("job_events", []).append((job_id, event_type, data))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed(s: Session) -> None:
+    for job_id, event_type, data in s.info.pop("job_events", []):
+        events.publish(job_id, event_type, data)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back(s: Session) -> None:
+    s.info.pop("job_events", None)
+
+
+@contextmanager
+def _using(session: Optional[Session]) -> Iterator[Session]:
+    # the caller's unit of work commits; otherwise each helper is its own
+    if session is not None:
+        yield session
+    else:
+        with unit_of_work() as s:
+            yield s
+
+
 # -------------------------
 # Job helpers
 # -------------------------
@@ -86,6 +180,8 @@ def create_job_record(
     kind: str,
     status: str,
     meta: Optional[dict[str, Any]] = None,
+    idempotency_key: Optional[str] = None,
+    session: Optional[Session] = None,
 ) -> None:
     now = dt.datetime.now(dt.UTC)
     rec = JobRecord(
@@ -95,38 +191,87 @@ def create_job_record(
         created_at=now,
         updated_at=now,
         meta=meta or {},
+        idempotency_key=idempotency_key,
     )
-    engine = ensure_engine()
-    with Session(engine) as s:
+    with _using(session) as s:
         s.add(rec)
-        s.commit()
 
 
-def update_job_status(job_id: str, status: str) -> None:
-    engine = ensure_engine()
-    with Session(engine) as s:
+def update_job_status(job_id: str, status: str, session: Optional[Session] = None) -> None:
+    with _using(session) as s:
         rec = s.get(JobRecord, job_id)
         if rec is None:
             return
         rec.status = status
         rec.updated_at = dt.datetime.now(dt.UTC)
         s.add(rec)
-        s.commit()
-
-
-def append_job_log(job_id: str, line: str) -> None:
-    engine = ensure_engine()
-    with Session(engine) as s:
-        s.add(JobLog(job_id=job_id, created_at=dt.datetime.now(dt.UTC), line=line))
-        s.commit()
+        _emit(s, job_id, events.STATUS, {"status": status, "updated_at": rec.updated_at.isoformat()})
 
 
-def _sha256_file(path: Path) -> str:
-    h = hashlib.sha256()
-    with path.open("rb") as f:
-        for chunk in iter(lambda: f.read(1024 * 1024), b""):
-            h.update(chunk)
-    return h.hexdigest()
+def append_job_log(job_id: str, line: str, session: Optional[Session] = None) -> None:
+    now = dt.datetime.now(dt.UTC)
+    with _using(session) as s:
+        s.add(JobLog(job_id=job_id, created_at=now, line=line))
+        _emit(s, job_id, events.LOG, {"lines": [{"created_at": now.isoformat(), "line": line}]})
+
+
+class JobLogWriter:
+    """
+    Buffered log sink for one job. Lines are collected in memory and
+    written with one bulk INSERT when `max_lines` are pending, `max_seconds`
+    after the first pending line (a timer flushes even if the job goes
+    quiet), or on flush()/close() at job end. Use as a context manager so a
+    failing job still flushes what it logged:
+
+        with JobLogWriter(job_id) as log:
+            log("step 1")
+    """
+
+    def __init__(self, job_id: str, max_lines: Optional[int] = None, max_seconds: Optional[float] = None) -> None:
+        self.job_id = job_id
+        self.max_lines = max_lines or int(os.environ.get("JOB_LOG_BATCH", "500"))
+        self.max_seconds = max_seconds if max_seconds is not None else float(os.environ.get("JOB_LOG_FLUSH_S", "1.0"))
+        self._rows: list[dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self.flushes = 0
+
+    def write(self, line: str) -> None:
+        with self._lock:
+            self._rows.append({"job_id": self.job_id, "created_at": dt.datetime.now(dt.UTC), "line": line})
+            full = len(self._rows) >= self.max_lines
+            if not full and self._timer is None:
+                self._timer = threading.Timer(self.max_seconds, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+
+    __call__ = write
+
+    def flush(self, session: Optional[Session] = None) -> None:
+        """Insert pending lines; with `session` they join that unit of work."""
+        with self._lock:
+            rows, self._rows = self._rows, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            # inserted under the lock so concurrent flushes keep line order
+            if rows:
+                with _using(session) as s:
+                    s.execute(insert(JobLog), rows)
+                    lines = [{"created_at": r["created_at"].isoformat(), "line": r["line"]} for r in rows]
+                    _emit(s, self.job_id, events.LOG, {"lines": lines})
+                self.flushes += 1
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self) -> JobLogWriter:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
 
 
 def record_artifact(
@@ -137,15 +282,18 @@ def record_artifact(
     path: Optional[str],
     url: Optional[str],
     meta: Optional[dict[str, Any]] = None,
+    session: Optional[Session] = None,
 ) -> None:
-    engine = ensure_engine()
-    with Session(engine) as s:
-        extra = dict(meta or {})
-        if path:
-            p = Path(path)
-            if p.exists():
-                extra.setdefault("sha256", _sha256_file(p))
-
+    # hashed before the transaction opens, but inside a caller's unit of
+    # work that is still file I/O under a held transaction: such callers
+    # (and those that hashed while writing) pass meta["sha256"] instead
+    extra = dict(meta or {})
+    if path and "sha256" not in extra:
+        p = Path(path)
+        if p.exists():
+            extra["sha256"] = sha256_file(p)
+
+    with _using(session) as s:
         art = Artifact(
             job_id=job_id,
             kind=kind,
@@ -156,7 +304,24 @@ def record_artifact(
             meta=extra,
         )
         s.add(art)
-        s.commit()
+        _emit(s, job_id, events.ARTIFACT, artifact_dict(art))
+
+
+def artifact_dict(a: Artifact) -> dict[str, Any]:
+    return {
+        "kind": a.kind,
+        "name": a.name,
+        "path": a.path,
+        "url": a.url,
+        "created_at": a.created_at.isoformat(),
+        "meta": a.meta,
+    }
+
+
+def list_job_logs(job_id: str) -> List[JobLog]:
+    with Session(ensure_engine()) as s:
+        cols = cast(ColumnElement[Any], JobLog.id)
+        return list(s.exec(select(JobLog).where(JobLog.job_id == job_id).order_by(cols)).all())
 
 
 def get_job_record(job_id: str) -> Optional[JobRecord]:
@@ -165,6 +330,26 @@ def get_job_record(job_id: str) -> Optional[JobRecord]:
         return s.get(JobRecord, job_id)
 
 
+def find_job_by_idempotency_key(
+    key: str,
+    *,
+    since: dt.datetime,
+    statuses: Iterable[str],
+) -> Optional[JobRecord]:
+    """Newest job submitted under `key` after `since` whose status is one of `statuses`."""
+    with Session(ensure_engine()) as s:
+        created = cast(ColumnElement[Any], JobRecord.created_at)
+        stmt = (
+            select(JobRecord)
+            .where(JobRecord.idempotency_key == key)
+            .where(created >= since)
+            .where(cast(ColumnElement[Any], JobRecord.status).in_(list(statuses)))
+            .order_by(desc(created))
+            .limit(1)
+        )
+        return s.exec(stmt).first()
+
+
 def list_artifacts(job_id: str) -> List[Artifact]:
     engine = ensure_engine()
     with Session(engine) as s:
@@ -172,23 +357,112 @@ def list_artifacts(job_id: str) -> List[Artifact]:
         return list(s.exec(stmt).all())
 
 
-def list_jobs(limit: int = 50, offset: int = 0) -> tuple[List[JobRecord], int]:
-    engine = ensure_engine()
-    with Session(engine) as s:
-        # mypy: cast created_at to a SQL column element for desc()
-        created_col = cast(ColumnElement[Any], JobRecord.created_at)
+# -------------------------
+# Job listing
+# -------------------------
+@dataclass
+class JobPage:
+    items: List[JobRecord]
+    next_cursor: Optional[str]
+    total: Optional[int]
+
+
+def encode_cursor(rec: JobRecord) -> str:
+    raw = f"{rec.created_at.isoformat()}|{rec.id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[dt.datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created, job_id = raw.split("|", 1)
+        return dt.datetime.fromisoformat(created), job_id
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError(f"invalid cursor {cursor!r}") from None
+
+
+def _filters(status: Optional[str], kind: Optional[str]) -> list[ColumnElement[bool]]:
+    conds: list[ColumnElement[bool]] = []
+    if status is not None:
+        conds.append(cast(ColumnElement[bool], JobRecord.status == status))
+    if kind is not None:
+        conds.append(cast(ColumnElement[bool], JobRecord.kind == kind))
+    return conds
+
+
+_count_cache: dict[tuple[Optional[str], Optional[str]], tuple[int, float]] = {}
+_count_lock = threading.Lock()
+
+
+def _count_ttl() -> float:
+    return float(os.environ.get("JOBS_COUNT_TTL_S", "30"))
+
+
+def count_jobs(status: Optional[str] = None, kind: Optional[str] = None, *, cached: bool = True) -> int:
+    """
+    COUNT(*) for a filter. With `cached` the value may be up to
+    JOBS_COUNT_TTL_S seconds old, so deep-page requests do not rescan the table.
+    """
+    key = (status, kind)
+    now = time.monotonic()
+    if cached:
+        with _count_lock:
+            hit = _count_cache.get(key)
+        if hit is not None and now - hit[1] < _count_ttl():
+            return hit[0]
+    with Session(ensure_engine()) as s:
+        stmt = select(func.count()).select_from(JobRecord)
+        for cond in _filters(status, kind):
+            stmt = stmt.where(cond)
+        # Total count; cast to a tuple then index to satisfy mypy
+        row = cast(tuple[int], s.exec(stmt).one())
+        total = int(row if isinstance(row, int) else row[0])
+    with _count_lock:
+        _count_cache[key] = (total, now)
+    return total
 
-        items_stmt = (
-            select(JobRecord)
-            .order_by(desc(created_col))
-            .limit(limit)
-            .offset(offset)
+
+def list_jobs_page(
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    *,
+    offset: int = 0,
+    status: Optional[str] = None,
+    kind: Optional[str] = None,
+    count: str = "cached",
+) -> JobPage:
+    """
+    Newest jobs first. With `cursor` (the previous page's next_cursor) the
+    page starts strictly after that job via an index range scan on
+    (created_at, id), independent of depth; `offset` is only used without a
+    cursor. `count` is "exact", "cached" (see count_jobs) or "none".
+    """
+    if count not in ("exact", "cached", "none"):
+        raise ValueError(f"count must be exact, cached or none, got {count!r}")
+    created_col = cast(ColumnElement[Any], JobRecord.created_at)
+    id_col = cast(ColumnElement[Any], JobRecord.id)
+
+    stmt = select(JobRecord)
+    for cond in _filters(status, kind):
+        stmt = stmt.where(cond)
+    if cursor is not None:
+        after_created, after_id = decode_cursor(cursor)
+        stmt = stmt.where(
+            or_(created_col < after_created, and_(created_col == after_created, id_col < after_id))
         )
-        items = list(s.exec(items_stmt).all())
+    elif offset:
+        stmt = stmt.offset(offset)
+    # one extra row tells whether there is a next page
+    stmt = stmt.order_by(desc(created_col), desc(id_col)).limit(limit + 1)
+
+    with Session(ensure_engine()) as s:
+        rows = list(s.exec(stmt).all())
+    items = rows[:limit]
+    next_cursor = encode_cursor(items[-1]) if len(rows) > limit and items else None
+    total = None if count == "none" else count_jobs(status, kind, cached=count == "cached")
+    return JobPage(items=items, next_cursor=next_cursor, total=total)
 
-        # Total count; cast to a tuple then index to satisfy mypy
-        total_stmt = select(func.count()).select_from(JobRecord)
-        row = cast(tuple[int], s.exec(total_stmt).one())
-        total = int(row if isinstance(row, int) else row[0])
 
-        return items, total
\ No newline at end of file
+def list_jobs(limit: int = 50, offset: int = 0) -> tuple[List[JobRecord], int]:
+    page = list_jobs_page(limit, offset=offset, count="exact")
+    return page.items, page.total or 0
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import threading
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Optional
+
+# Job event types pushed to subscribers
+STATUS = "status"
+LOG = "log"
+ARTIFACT = "artifact"
+
+TERMINAL_STATUSES = frozenset({"succeeded", "failed"})
+
+log = logging.getLogger(__name__)
+
+
+def _use_redis() -> bool:
+    # Same switch as the job runtime: with RQ, jobs run in other processes
+    return os.environ.get("USE_RQ", "").strip().lower() in {"1", "true", "yes"}
+
+
+def _channel(job_id: str) -> str:
+    return f"job-events:{job_id}"
+
+
+# -------------------------
+# In-process broadcast
+# -------------------------
+class _Broadcaster:
+    """
+    Fan-out from job threads to asyncio subscribers. Each subscriber owns a
+    queue on its event loop; publishers (any thread) hand events over with
+    call_soon_threadsafe.
+    """
+
+    def __init__(self) -> None:
+        self._subs: dict[str, set[tuple[asyncio.AbstractEventLoop, asyncio.Queue[dict[str, Any]]]]] = {}
+        self._lock = threading.Lock()
+
+    def publish(self, job_id: str, event: dict[str, Any]) -> None:
+        with self._lock:
+            subs = list(self._subs.get(job_id, ()))
+        for loop, queue in subs:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+            except RuntimeError:  # subscriber's loop already closed
+                pass
+
+    def add(self, job_id: str) -> asyncio.Queue[dict[str, Any]]:
+        queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+        with self._lock:
+            self._subs.setdefault(job_id, set()).add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def remove(self, job_id: str, queue: asyncio.Queue[dict[str, Any]]) -> None:
+        with self._lock:
+            subs = self._subs.get(job_id, set())
+            subs.difference_update({s for s in subs if s[1] is queue})
+            if not subs:
+                self._subs.pop(job_id, None)
+
+    def subscribers(self, job_id: str) -> int:
+        with self._lock:
+            return len(self._subs.get(job_id, ()))
+
+
+_local = _Broadcaster()
+
+
+# -------------------------
+# Redis pub/sub
+# -------------------------
+def _redis_url() -> str:
+    return os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+
+_sync_redis: Any = None
+
+
+def _publisher() -> Any:
+    global _sync_redis
+    if _sync_redis is None:
+        from redis import Redis
+
+        _sync_redis = Redis.from_url(_redis_url())
+    return _sync_redis
+
+
+def _subscriber_client() -> Any:
+    from redis.asyncio import Redis
+
+    return Redis.from_url(_redis_url())
+
+
+# -------------------------
+# Public API
+# -------------------------
+def publish(job_id: str, event_type: str, data: dict[str, Any]) -> None:
+    """Push one event to everyone watching `job_id`. Never raises into the job."""
+    event = {"event": event_type, "job_id": job_id, "data": data}
+    if _use_redis():
+        from redis.exceptions import RedisError
+
+        # every API process, this one included, receives it through its pump
+        try:
+            _publisher().publish(_channel(job_id), json.dumps(event, default=str))
+            return
+        except RedisError as exc:  # pub/sub is best effort; the DB stays authoritative
+            log.debug("publishing %s for job %s locally only: %r", event_type, job_id, exc)
+    _local.publish(job_id, event)
+
+
+def _log_pump_exit(task: asyncio.Task[None]) -> None:
+    # a dead pump only costs this subscriber live events from other processes
+    if not task.cancelled() and task.exception() is not None:
+        log.warning("job event subscription lost: %r", task.exception())
+
+
+@asynccontextmanager
+async def subscribe(job_id: str) -> AsyncIterator[asyncio.Queue[dict[str, Any]]]:
+    """
+    Queue receiving the job's events from now on, from this process and,
+    when RQ is enabled, from workers via Redis pub/sub.
+    """
+    queue = _local.add(job_id)
+    pump: Optional[asyncio.Task[None]] = None
+    client: Any = None
+    pubsub: Any = None
+    if _use_redis():
+        client = _subscriber_client()
+        pubsub = client.pubsub()
+        await pubsub.subscribe(_channel(job_id))
+
+        async def _pump() -> None:
+            async for msg in pubsub.listen():
+                if msg.get("type") == "message":
+                    queue.put_nowait(json.loads(msg["data"]))
+
+        pump = asyncio.create_task(_pump())
+        pump.add_done_callback(_log_pump_exit)
+    try:
+        yield queue
+    finally:
+        _local.remove(job_id, queue)
+        if pump is not None:
+            pump.cancel()
+            await asyncio.gather(pump, return_exceptions=True)  # reported by _log_pump_exit
+        if pubsub is not None:
+            await pubsub.unsubscribe(_channel(job_id))
+            await pubsub.aclose()
+        if client is not None:
+            await client.aclose()
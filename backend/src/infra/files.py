@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+import hashlib
+import os
+from pathlib import Path
+
+
+def results_dir() -> Path:
+    """
+    RESULTS_DIR, else ./results: job outputs, the SQLite database, the blob
+    store and the caches of every process that shares it.
+    """
+    base = os.environ.get("RESULTS_DIR")
+    return Path(base) if base else (Path.cwd() / "results")
+
+
+def sha256_file(path: str | Path) -> str:
+    """SHA-256 hex digest of a file, read in 1 MiB chunks."""
+    h = hashlib.sha256()
+    with Path(path).open("rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import logging
+import math
+import os
+import time
+from functools import wraps
+from typing import Any, Callable, Iterable, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily, Metric
+from prometheus_client.registry import Collector
+
+log = logging.getLogger(__name__)
+
+# With PROMETHEUS_MULTIPROC_DIR set (before the process starts) every
+# process -- API workers, RQ workers and their work horses -- writes its
+# samples there and /metrics merges them; without it only this process's
+# samples are exported.
+MULTIPROC_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+# Jobs and stages run for seconds to tens of minutes
+_JOB_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+# Single HE primitives: tens of microseconds (mock) to seconds (large N)
+_OP_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+# -------------------------
+# HTTP
+# -------------------------
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+)
+
+# -------------------------
+# Jobs
+# -------------------------
+JOB_SECONDS = Histogram(
+    "he_job_duration_seconds",
+    "Wall time of a job run, by final status",
+    ["kind", "status"],
+    buckets=_JOB_BUCKETS,
+)
+STAGE_SECONDS = Histogram(
+    "he_job_stage_duration_seconds",
+    "Wall time of one pipeline stage",
+    ["kind", "stage"],
+    buckets=_JOB_BUCKETS,
+)
+
+# -------------------------
+# HE primitives
+# -------------------------
+HE_OPS = Counter(
+    "he_operations",
+    "Ciphertext-level HE work: encryptions, rotations, serializations; "
+    "*_estimate ops are derived from sum()/polyval() arguments, not counted inside the library",
+    ["backend", "op"],
+)
+HE_OP_SECONDS = Histogram(
+    "he_operation_duration_seconds",
+    "Latency of one backend call",
+    ["backend", "call"],
+    buckets=_OP_BUCKETS,
+)
+HE_SERIALIZED_BYTES = Counter(
+    "he_serialized_bytes",
+    "Bytes produced by ciphertext serialization",
+    ["backend"],
+)
+
+
+def _wrap(be: Any, attr: str, after: Callable[[tuple[Any, ...], Any], None]) -> None:
+    fn = getattr(be, attr, None)
+    if fn is None:  # e.g. rotate() on backends without rotation
+        return
+    seconds = HE_OP_SECONDS.labels(be.name, attr)
+
+    @wraps(fn)
+    def call(*args: Any, **kwargs: Any) -> Any:
+        t0 = time.perf_counter()
+        out = fn(*args, **kwargs)
+        seconds.observe(time.perf_counter() - t0)
+        after(args, out)
+        return out
+
+    setattr(be, attr, call)
+
+
+def instrument_backend(be: Any) -> Any:
+    """
+    Count and time a backend instance's costly primitives. Encryptions,
+    rotate() calls and serializations are counted as they happen. sum()
+    and polyval() run inside the HE library, so their rotations and
+    relinearizations are estimates under their own op labels: sum() as
+    log2(slots) rotations, polyval() of degree k as k - 1 relinearizations
+    (one per ciphertext power).
+    """
+    name = be.name
+    encryptions = HE_OPS.labels(name, "encryption")
+    rotations = HE_OPS.labels(name, "rotation")
+    estimated_rotations = HE_OPS.labels(name, "rotation_estimate")
+    estimated_relinearizations = HE_OPS.labels(name, "relinearization_estimate")
+    serializations = HE_OPS.labels(name, "serialization")
+    nbytes = HE_SERIALIZED_BYTES.labels(name)
+    fold = max(1, int(math.log2(be.slots)))
+
+    def serialized(args: tuple[Any, ...], out: bytes) -> None:
+        serializations.inc()
+        nbytes.inc(len(out))
+
+    _wrap(be, "encrypt", lambda args, out: encryptions.inc(len(out.ciphertexts)))
+    _wrap(be, "encrypt_vector", lambda args, out: encryptions.inc())
+    _wrap(be, "rotate", lambda args, out: rotations.inc())
+    _wrap(be, "sum", lambda args, out: estimated_rotations.inc(fold))
+    _wrap(be, "polyval", lambda args, out: estimated_relinearizations.inc(max(0, len(args[1]) - 2)))
+    _wrap(be, "serialize", serialized)
+    return be
+
+
+# -------------------------
+# Exposition
+# -------------------------
+def _store_errors() -> tuple[type[BaseException], ...]:
+    """What reading queue depths raises when the DB or Redis is unreachable."""
+    from sqlalchemy.exc import SQLAlchemyError
+
+    errors: tuple[type[BaseException], ...] = (SQLAlchemyError, OSError)
+    try:
+        from redis.exceptions import RedisError
+    except ImportError:  # queue extra not installed: the in-process pool only
+        return errors
+    return (*errors, RedisError)
+
+
+class _QueueDepth(Collector):
+    """
+    he_job_queue_depth per queue, plus he_job_queue_depth_up: 0 when the
+    depths could not be read (the scrape itself still succeeds).
+    """
+
+    def __init__(self, read: Callable[[], dict[str, int]]) -> None:
+        self._read = read
+
+    def collect(self) -> Iterable[Metric]:
+        up = GaugeMetricFamily("he_job_queue_depth_up", "Whether the job queue depths could be read")
+        try:
+            depths = self._read()
+        except _store_errors() as exc:
+            log.warning("queue depths unavailable: %r", exc)
+            up.add_metric([], 0)
+            return [up]
+        up.add_metric([], 1)
+        g = GaugeMetricFamily("he_job_queue_depth", "Jobs waiting for a worker", labels=["queue"])
+        for name, n in depths.items():
+            g.add_metric([name], n)
+        return [up, g]
+
+
+def render(queue_depths: Optional[Callable[[], dict[str, int]]] = None) -> tuple[bytes, str]:
+    """
+    The /metrics body and its content type. `queue_depths` is read at scrape
+    time, so the gauge is current however many processes serve the API.
+    """
+    if os.environ.get(MULTIPROC_ENV):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        body = generate_latest(registry)
+    else:
+        body = generate_latest(REGISTRY)
+    if queue_depths is not None:
+        scrape = CollectorRegistry(auto_describe=False)
+        scrape.register(_QueueDepth(queue_depths))
+        body += generate_latest(scrape)
+    return body, CONTENT_TYPE_LATEST
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CHUNK_ROWS = 100_000
+
+# One chunk of (row key, feature bucket, value) triples
+Triples = tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+# -------------------------
+# Chunked readers
+# -------------------------
+def iter_csv_chunks(
+    path: str | Path,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    usecols: Optional[Sequence[str]] = None,
+    dtype: Optional[dict[str, str]] = None,
+) -> Iterator[pd.DataFrame]:
+    """Yield DataFrames of at most `chunk_rows` rows; never loads the whole file."""
+    wanted = set(usecols) if usecols is not None else None
+    reader = pd.read_csv(
+        path,
+        chunksize=chunk_rows,
+        usecols=(lambda c: c in wanted) if wanted is not None else None,
+        dtype=dtype,
+        encoding_errors="replace",
+    )
+    with reader:
+        yield from reader
+
+
+def iter_xlsx_chunks(path: str | Path, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Stream an .xlsx sheet row by row (openpyxl read-only mode) in chunks."""
+    try:
+        from openpyxl import load_workbook
+    except ImportError as exc:  # pragma: no cover - optional dependency
+        raise RuntimeError("reading .xlsx needs openpyxl; export to CSV or pip install openpyxl") from exc
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = [str(h) for h in next(rows)]
+        buf: list[tuple[object, ...]] = []
+        for row in rows:
+            buf.append(row)
+            if len(buf) >= chunk_rows:
+                yield pd.DataFrame(buf, columns=header)
+                buf = []
+        if buf:
+            yield pd.DataFrame(buf, columns=header)
+    finally:
+        wb.close()
+
+
+def iter_table_chunks(path: str | Path, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    if Path(path).suffix.lower() in {".xlsx", ".xlsm"}:
+        return iter_xlsx_chunks(path, chunk_rows)
+    return iter_csv_chunks(path, chunk_rows)
+
+
+def iter_xy_batches(
+    path: str | Path,
+    target: str,
+    batch_size: int,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+    """
+    Stream a numeric CSV as (X, y) batches of exactly batch_size rows (the
+    last may be shorter); every column except `target` is a feature.
+    """
+    carry: Optional[np.ndarray] = None
+    for chunk in iter_csv_chunks(path, chunk_rows):
+        if target not in chunk.columns:
+            raise ValueError(f"{path}: no target column {target!r}")
+        cols = [c for c in chunk.columns if c != target] + [target]
+        block = chunk[cols].apply(pd.to_numeric, errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+        if carry is not None:
+            block = np.vstack([carry, block])
+        full = (block.shape[0] // batch_size) * batch_size
+        for start in range(0, full, batch_size):
+            b = block[start : start + batch_size]
+            yield b[:, :-1], b[:, -1]
+        carry = block[full:] if full < block.shape[0] else None
+    if carry is not None:
+        yield carry[:, :-1], carry[:, -1]
+
+
+# -------------------------
+# Feature hashing
+# -------------------------
+def hash_buckets(values: np.ndarray | pd.Series, d: int) -> np.ndarray:
+    """
+    Deterministic, vectorised feature hashing of ids into [0, d).
+    Uses pandas' fixed-key SipHash, so buckets are stable across processes.
+    """
+    arr = np.asarray(values, dtype=object)
+    return (pd.util.hash_array(arr, categorize=True) % np.uint64(d)).astype(np.int64)
+
+
+def scatter_add(matrix: np.ndarray, rows: np.ndarray, cols: np.ndarray, values: np.ndarray) -> None:
+    """
+    matrix[rows, cols] += values with duplicates summed. Only the rows this
+    chunk touches are read/written, via one bincount over a compact index.
+    """
+    if rows.size == 0:
+        return
+    d = matrix.shape[1]
+    touched, local = np.unique(rows, return_inverse=True)
+    acc = np.bincount(local * d + cols, weights=values, minlength=touched.size * d)
+    matrix[touched] += acc.reshape(touched.size, d).astype(matrix.dtype)
+
+
+def two_pass_to_npy(
+    make_chunks: Callable[[bool], Iterable[Triples]],
+    out: str | Path,
+    d: int,
+) -> tuple[np.ndarray, int]:
+    """
+    Aggregate a re-iterable stream of (key, bucket, value) chunks into an
+    (n_keys, d) float32 .npy memmap at `out`:
+      1. collect the distinct row keys (make_chunks(True) may skip buckets
+         and values, which are not read on this pass)
+      2. scatter-add each chunk into the memmap
+    Peak memory is one chunk plus the key index. The chunk is bounded, the
+    index is not: it holds every distinct row key, so it grows with the
+    number of keys (customers, users) though not with the number of lines.
+    Returns (sorted keys, lines consumed).
+    """
+    keys_seen: set[str] = set()
+    for keys_chunk, _, _ in make_chunks(True):
+        keys_seen.update(np.unique(keys_chunk).tolist())
+    keys = np.array(sorted(keys_seen), dtype=str)
+    del keys_seen
+
+    matrix = open_npy(out, len(keys), d)
+    lines = 0
+    for keys_chunk, cols, values in make_chunks(False):
+        rows = np.searchsorted(keys, keys_chunk.astype(str))
+        scatter_add(matrix, rows, cols, values)
+        lines += len(keys_chunk)
+    matrix.flush()
+    del matrix
+    return keys, lines
+
+
+# -------------------------
+# Outputs
+# -------------------------
+def open_npy(path: str | Path, n_rows: int, d: int, dtype: str = "float32") -> np.memmap:
+    """Zero-filled, disk-backed (n_rows, d) .npy that callers fill in place."""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    return np.lib.format.open_memmap(str(path), mode="w+", dtype=dtype, shape=(n_rows, d))
+
+
+def write_parquet(
+    path: str | Path,
+    matrix: np.ndarray,
+    keys: np.ndarray,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> None:
+    """Copy a (memory-mapped) matrix to Parquet one row group at a time."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as exc:  # pragma: no cover - optional dependency
+        raise RuntimeError("Parquet output needs pyarrow; use a .npy output instead") from exc
+
+    d = matrix.shape[1]
+    schema = pa.schema([("key", pa.string())] + [(f"f{i}", pa.float32()) for i in range(d)])
+    with pq.ParquetWriter(str(path), schema) as writer:
+        for start in range(0, matrix.shape[0], chunk_rows):
+            block = np.asarray(matrix[start : start + chunk_rows], dtype=np.float32)
+            cols: list[Iterable[object]] = [keys[start : start + chunk_rows].astype(str)]
+            cols += [block[:, i] for i in range(d)]
+            writer.write_table(pa.Table.from_arrays(cols, schema=schema))
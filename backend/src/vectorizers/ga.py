@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.infra.files import sha256_file
+from src.vectorizers.common import (
+    DEFAULT_CHUNK_ROWS,
+    Triples,
+    hash_buckets,
+    iter_csv_chunks,
+    two_pass_to_npy,
+)
+
+# Accepted spellings for GA4 / Universal Analytics item-level exports
+USER_COLUMNS = ("user_pseudo_id", "client_id", "user_id", "fullVisitorId")
+ITEM_COLUMNS = ("item_id", "sku", "product_sku", "productSKU", "StockCode")
+VALUE_COLUMNS = ("item_revenue", "revenue", "productRevenue", "price")
+CATEGORY_COLUMNS = ("item_category", "category", "productCategory")
+
+
+@dataclass
+class GAVectorizeResult:
+    """
+    `lines` counts the export rows read; `mapped` of them went into the
+    vectors, the rest were dropped: `incomplete` lack a user or item id,
+    `unmapped` items are missing from the catalog.
+    """
+
+    path: Path
+    keys_path: Path
+    n_rows: int
+    d: int
+    lines: int
+    mode: str
+    unmapped: int = 0
+    mapped: int = 0
+    incomplete: int = 0
+
+
+def _pick(columns: list[str], candidates: tuple[str, ...]) -> Optional[str]:
+    return next((c for c in candidates if c in columns), None)
+
+
+def _require(columns: list[str], candidates: tuple[str, ...], what: str) -> str:
+    col = _pick(columns, candidates)
+    if col is None:
+        raise ValueError(f"no {what} column; expected one of {', '.join(candidates)}")
+    return col
+
+
+_EMPTY = np.empty(0)
+
+
+def _numeric(s: pd.Series) -> np.ndarray:
+    return pd.to_numeric(s, errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+
+
+# -------------------------
+# Catalog lookup table
+# -------------------------
+@dataclass
+class CatalogIndex:
+    """Sorted item ids and their bucket, for vectorised searchsorted lookup."""
+
+    ids: np.ndarray
+    buckets: np.ndarray
+    d: int
+
+    def lookup(self, items: np.ndarray) -> np.ndarray:
+        """Bucket per item, -1 for items missing from the catalog."""
+        items = items.astype(str)
+        if self.ids.size == 0:
+            return np.full(items.shape, -1, dtype=np.int64)
+        pos = np.searchsorted(self.ids, items)
+        pos_c = np.minimum(pos, self.ids.size - 1)
+        found = self.ids[pos_c] == items
+        return np.where(found, self.buckets[pos_c], -1)
+
+    @classmethod
+    def build(cls, catalog_csv: str | Path, d: int) -> CatalogIndex:
+        """
+        Bucket per catalog item: an explicit `bucket` column if present,
+        else the item's category (categories numbered in sorted order, mod d),
+        else hashing of the id.
+        """
+        df = pd.read_csv(catalog_csv, dtype=str)
+        cols = list(df.columns)
+        item_col = _require(cols, ITEM_COLUMNS, "item id")
+        df = df.dropna(subset=[item_col]).drop_duplicates(subset=[item_col], keep="first")
+        ids = df[item_col].to_numpy(dtype=str)
+
+        cat_col = _pick(cols, CATEGORY_COLUMNS)
+        if "bucket" in cols:
+            buckets = pd.to_numeric(df["bucket"], errors="coerce").fillna(0).to_numpy(dtype=np.int64) % d
+        elif cat_col is not None:
+            codes, _ = pd.factorize(df[cat_col].fillna(""), sort=True)
+            buckets = codes.astype(np.int64) % d
+        else:
+            buckets = hash_buckets(ids, d)
+
+        order = np.argsort(ids, kind="stable")
+        return cls(ids=ids[order], buckets=buckets[order], d=d)
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp.npz")
+        np.savez(tmp, ids=self.ids, buckets=self.buckets, d=self.d)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> CatalogIndex:
+        with np.load(path) as z:
+            return cls(ids=z["ids"], buckets=z["buckets"], d=int(z["d"]))
+
+
+def catalog_index(catalog_csv: str | Path, d: int, cache_dir: Optional[Path] = None) -> CatalogIndex:
+    """Build the lookup table once per (catalog checksum, d); reuse it from disk after."""
+    if cache_dir is None:
+        return CatalogIndex.build(catalog_csv, d)
+    cached = cache_dir / "catalogs" / f"{sha256_file(catalog_csv)}_d{d}.npz"
+    if cached.exists():
+        return CatalogIndex.load(cached)
+    index = CatalogIndex.build(catalog_csv, d)
+    index.save(cached)
+    return index
+
+
+# -------------------------
+# Vectoriser
+# -------------------------
+def vectorize(
+    ga_csv: str | Path,
+    out: str | Path,
+    d: int = 256,
+    catalog_csv: Optional[str | Path] = None,
+    cache_dir: Optional[Path] = None,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> GAVectorizeResult:
+    """
+    Per-user item-revenue vectors of width d from a GA export.
+    Items are mapped to buckets by feature hashing, or through the catalog
+    lookup table when `catalog_csv` is given (unknown items are dropped and
+    counted, as are rows without a user or item id). Each chunk is mapped
+    with whole-array NumPy operations.
+    """
+    out = Path(out)
+    index = catalog_index(catalog_csv, d, cache_dir) if catalog_csv else None
+    header = list(pd.read_csv(ga_csv, nrows=0).columns)
+    user_col = _require(header, USER_COLUMNS, "user id")
+    item_col = _require(header, ITEM_COLUMNS, "item id")
+    value_col = _pick(header, VALUE_COLUMNS)
+    qty_col = "quantity" if "quantity" in header else None
+    usecols = [c for c in (user_col, item_col, value_col, qty_col) if c]
+    read = incomplete = unmapped = 0
+
+    def chunks(keys_only: bool) -> Iterator[Triples]:
+        nonlocal read, incomplete, unmapped
+        read = incomplete = unmapped = 0
+        dtype = {user_col: "str", item_col: "str"}
+        for chunk in iter_csv_chunks(ga_csv, chunk_rows, usecols=usecols, dtype=dtype):
+            read += len(chunk)
+            complete = chunk.dropna(subset=[user_col, item_col])
+            incomplete += len(chunk) - len(complete)
+            chunk = complete
+            users = chunk[user_col].to_numpy(dtype=str)
+            if keys_only and index is None:
+                yield users, _EMPTY, _EMPTY
+                continue
+            items = chunk[item_col].to_numpy(dtype=str)
+            # revenue if exported, else price * quantity, else quantity, else 1 per event
+            values = np.ones(len(chunk))
+            if value_col is not None:
+                values = _numeric(chunk[value_col])
+            if qty_col is not None and value_col in (None, "price"):
+                values = values * _numeric(chunk[qty_col])
+
+            cols = index.lookup(items) if index is not None else hash_buckets(items, d)
+            keep = cols >= 0
+            unmapped += int((~keep).sum())
+            yield users[keep], cols[keep], values[keep]
+
+    npy_path = out if out.suffix == ".npy" else out.with_suffix(".npy")
+    keys, mapped = two_pass_to_npy(chunks, npy_path, d)
+    keys_path = out.with_name(f"{out.stem}_keys.npy")
+    np.save(keys_path, keys)
+    return GAVectorizeResult(
+        path=npy_path,
+        keys_path=keys_path,
+        n_rows=len(keys),
+        d=d,
+        lines=read,
+        mode="catalog" if index is not None else "hash",
+        unmapped=unmapped,
+        mapped=mapped,
+        incomplete=incomplete,
+    )
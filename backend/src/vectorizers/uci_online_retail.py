@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Literal
+
+import numpy as np
+import pandas as pd
+
+from src.vectorizers.common import (
+    DEFAULT_CHUNK_ROWS,
+    Triples,
+    hash_buckets,
+    iter_table_chunks,
+    two_pass_to_npy,
+    write_parquet,
+)
+
+By = Literal["customer", "product"]
+
+# Online Retail (2011) and Online Retail II (2009-2011) column spellings
+_ALIASES = {
+    "InvoiceNo": "invoice",
+    "Invoice": "invoice",
+    "StockCode": "stock_code",
+    "Quantity": "quantity",
+    "UnitPrice": "price",
+    "Price": "price",
+    "CustomerID": "customer_id",
+    "Customer ID": "customer_id",
+}
+
+
+_EMPTY = np.empty(0)
+
+
+@dataclass
+class VectorizeResult:
+    path: Path
+    keys_path: Path
+    n_rows: int
+    d: int
+    lines: int
+
+
+def _ids(s: pd.Series) -> pd.Series:
+    # xlsx exports read CustomerID as float (17850.0); normalise to "17850"
+    return s.astype(str).str.strip().str.replace(r"\.0$", "", regex=True)
+
+
+def normalized_chunks(path: str | Path, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Yield (invoice, stock_code, customer_id, amount) frames, one chunk at a time."""
+    for chunk in iter_table_chunks(path, chunk_rows):
+        chunk = chunk.rename(columns=_ALIASES)
+        missing = {"stock_code", "quantity", "price", "customer_id"} - set(chunk.columns)
+        if missing:
+            raise ValueError(f"{path}: missing columns {sorted(missing)}")
+        chunk = chunk.dropna(subset=["stock_code", "customer_id"])
+        out = pd.DataFrame(
+            {
+                "stock_code": _ids(chunk["stock_code"]),
+                "customer_id": _ids(chunk["customer_id"]),
+                "amount": pd.to_numeric(chunk["quantity"], errors="coerce").fillna(0)
+                * pd.to_numeric(chunk["price"], errors="coerce").fillna(0),
+            }
+        )
+        yield out
+
+
+def _columns(by: By) -> tuple[str, str]:
+    # (row key, hashed feature) for each aggregation level
+    return ("customer_id", "stock_code") if by == "customer" else ("stock_code", "customer_id")
+
+
+def vectorize(
+    src: str | Path,
+    out: str | Path,
+    d: int = 256,
+    by: By = "customer",
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> VectorizeResult:
+    """
+    Per-customer (or per-product) spend vectors: the other id is hashed into
+    one of d buckets and aggregated in two streaming passes over `src`.
+    Writes `out` (.npy, or .parquet via pyarrow) plus `<stem>_keys.npy`.
+    """
+    key_col, feat_col = _columns(by)
+    out = Path(out)
+    npy_path = out if out.suffix == ".npy" else out.with_suffix(".npy")
+
+    def chunks(keys_only: bool) -> Iterator[Triples]:
+        for chunk in normalized_chunks(src, chunk_rows):
+            if keys_only:
+                yield chunk[key_col].to_numpy(dtype=str), _EMPTY, _EMPTY
+                continue
+            yield (
+                chunk[key_col].to_numpy(dtype=str),
+                hash_buckets(chunk[feat_col].to_numpy(), d),
+                chunk["amount"].to_numpy(dtype=np.float64),
+            )
+
+    keys, lines = two_pass_to_npy(chunks, npy_path, d)
+
+    keys_path = out.with_name(f"{out.stem}_keys.npy")
+    np.save(keys_path, keys)
+
+    if out.suffix == ".parquet":
+        write_parquet(out, np.load(npy_path, mmap_mode="r"), keys, chunk_rows)
+        npy_path.unlink()
+    return VectorizeResult(path=out, keys_path=keys_path, n_rows=len(keys), d=d, lines=lines)
@@ -1,3 +1,4 @@
+import os
 import sys
 from pathlib import Path
 
@@ -5,3 +6,28 @@ from pathlib import Path
 BACKEND_ROOT = Path(__file__).resolve().parents[1]
 if str(BACKEND_ROOT) not in sys.path:
     sys.path.insert(0, str(BACKEND_ROOT))
+
+import pytest
+
+# Keep generated HE keys in memory unless a test opts in to the disk tier
+os.environ.setdefault("HE_KEY_CACHE_DISK", "0")
+
+
+@pytest.fixture
+def results_env(tmp_path, monkeypatch):
+    """Isolated RESULTS_DIR + SQLite DB with a fresh engine for each test."""
+    from src.he_core.utils import reset_key_cache
+    from src.infra import db
+
+    results = tmp_path / "results"
+    results.mkdir()
+    monkeypatch.setenv("RESULTS_DIR", str(results))
+    monkeypatch.setenv("DB_URL", f"sqlite:///{results}/he.sqlite")
+    monkeypatch.setattr(db, "_engine", None)
+    reset_key_cache()
+    yield results
+    # let jobs submitted by the test finish while RESULTS_DIR still points here
+    from src.aggregator.jobs_runtime import shutdown_executor
+
+    shutdown_executor(wait=True)
+    reset_key_cache()
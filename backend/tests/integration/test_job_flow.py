@@ -1,7 +1,9 @@
 import asyncio
+import json
 import pytest
 from httpx import AsyncClient, ASGITransport
 from src.aggregator.api import create_app  # build the app after setting env
+from src.he_core.backends import available_backends
 
 @pytest.mark.asyncio
 async def test_job_flow(tmp_path, monkeypatch):
@@ -64,3 +66,419 @@ async def test_healthz(tmp_path, monkeypatch):
         r = await ac.get("/healthz")
         assert r.status_code == 200
         assert r.json() == {"ok": True}
+
+@pytest.mark.asyncio
+async def test_job_with_ga_export(tmp_path, monkeypatch):
+    import numpy as np
+    import pandas as pd
+
+    from src.infra import db
+
+    results = tmp_path / "results"
+    (results / "uploads" / "ga_csv").mkdir(parents=True)
+    monkeypatch.setenv("RESULTS_DIR", str(results))
+    monkeypatch.setenv("DB_URL", f"sqlite:///{results}/he.sqlite")
+    monkeypatch.setattr(db, "_engine", None)
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        {
+            "user_pseudo_id": rng.choice(["u1", "u2", "u3"], 200),
+            "item_id": rng.choice(["A", "B", "C", "D"], 200),
+            "item_revenue": rng.uniform(1, 10, 200).round(2),
+        }
+    )
+    df.to_csv(results / "uploads" / "ga_csv" / "export.csv", index=False)
+
+    app = create_app()
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        r = await ac.post(
+            "/api/v1/jobs/make-all-ga",
+            json={"ga_csv": "export.csv", "d": 8, "backend": "mock", "batch_size": 2},
+        )
+        job_id = r.json()["id"]
+        for _ in range(100):
+            r = await ac.get(f"/api/v1/jobs/{job_id}")
+            if r.json()["status"] in ("succeeded", "failed"):
+                break
+            await asyncio.sleep(0.05)
+        assert r.json()["status"] == "succeeded"
+
+        arts = (await ac.get(f"/api/v1/jobs/{job_id}/artifacts")).json()
+        totals = next(a for a in arts if a["name"] == "totals.csv")
+        table = np.loadtxt(totals["path"], delimiter=",", skiprows=1)
+        assert np.isclose(table[:, 1].sum(), df["item_revenue"].sum(), rtol=1e-4)
+
+        # encrypted partials and aggregate are recorded with their container index
+        cts = {a["name"]: a["meta"] for a in arts if a["kind"] == "ciphertexts"}
+        assert set(cts) == {"encrypted.bin", "aggregate.bin"}
+        assert cts["encrypted.bin"]["format"] == "hecb" and cts["encrypted.bin"]["count"] == 2  # 3 users, batch_size 2
+        assert cts["aggregate.bin"]["count"] == 1 and cts["aggregate.bin"]["data_offset"] > 0
+
+@pytest.mark.asyncio
+async def test_ridge_job(results_env):
+    import json
+
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(40, 4))
+    y = X @ np.array([1.0, -2.0, 0.5, 3.0])
+    pd.DataFrame(np.column_stack([X, y]), columns=["a", "b", "c", "d", "y"]).to_csv(results_env / "train.csv", index=False)
+
+    app = create_app()
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        r = await ac.post(
+            "/api/v1/jobs/ridge",
+            json={"data_csv": str(results_env / "train.csv"), "lam": 0.0, "batch_sizes": [1, 16], "backend": "mock"},
+        )
+        job_id = r.json()["id"]
+        for _ in range(100):
+            r = await ac.get(f"/api/v1/jobs/{job_id}")
+            if r.json()["status"] in ("succeeded", "failed"):
+                break
+            await asyncio.sleep(0.05)
+        assert r.json() | {"kind": "ridge", "status": "succeeded"} == r.json()
+
+        arts = (await ac.get(f"/api/v1/jobs/{job_id}/artifacts")).json()
+        report = json.loads(open(next(a["path"] for a in arts if a["name"] == "ridge.json")).read())
+        assert np.allclose(report["coef"], [1.0, -2.0, 0.5, 3.0])
+        assert [run["batch_size"] for run in report["runs"]] == [1, 16]
+        assert report["runs"][0]["ciphertexts"] == 40 and report["runs"][1]["ciphertexts"] == 3
+
+
+@pytest.mark.asyncio
+async def test_list_jobs_cursor_pagination(results_env):
+    from src.infra.db import create_job_record
+
+    for i in range(5):
+        create_job_record(job_id=f"j{i}", kind="ridge" if i < 2 else "make_all_ga", status="succeeded")
+
+    app = create_app()
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        first = (await ac.get("/api/v1/jobs", params={"limit": 2, "kind": "make_all_ga"})).json()
+        assert first["total"] == 3 and len(first["items"]) == 2
+        second = (await ac.get("/api/v1/jobs", params={"limit": 2, "kind": "make_all_ga", "cursor": first["next_cursor"]})).json()
+        assert len(second["items"]) == 1 and second["next_cursor"] is None
+        ids = {j["id"] for j in first["items"] + second["items"]}
+        assert ids == {"j2", "j3", "j4"}
+        assert (await ac.get("/api/v1/jobs", params={"cursor": "%%%"})).status_code == 400
+
+
+def _parse_sse(body):
+    out = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if fields:
+            out.append((fields["event"], json.loads(fields["data"])))
+    return out
+
+
+@pytest.mark.asyncio
+async def test_job_events_stream_pushes_changes_until_terminal(results_env, monkeypatch):
+    from src.infra import events
+    from src.infra.db import JobLogWriter, append_job_log, create_job_record, record_artifact, update_job_status
+
+    monkeypatch.delenv("USE_RQ", raising=False)
+    create_job_record(job_id="sse1", kind="test", status="queued")
+    append_job_log("sse1", "queued line")
+
+    def worker():
+        update_job_status("sse1", "running")
+        with JobLogWriter("sse1") as log:
+            log("step 1")
+            log("step 2")
+        record_artifact(job_id="sse1", kind="text", name="out.txt", path=None, url=None)
+        update_job_status("sse1", "succeeded")
+
+    app = create_app()
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        req = asyncio.create_task(ac.get("/api/v1/jobs/sse1/events"))
+        for _ in range(200):
+            if events._local.subscribers("sse1"):
+                break
+            await asyncio.sleep(0.01)
+        await asyncio.to_thread(worker)
+        r = await asyncio.wait_for(req, 5)
+
+        assert r.headers["content-type"].startswith("text/event-stream")
+        got = _parse_sse(r.text)
+        assert got[0] == ("status", {"status": "queued", "updated_at": got[0][1]["updated_at"]})
+        lines = [ln["line"] for ev, d in got if ev == "log" for ln in d["lines"]]
+        assert lines == ["queued line", "step 1", "step 2"]
+        assert [d["name"] for ev, d in got if ev == "artifact"] == ["out.txt"]
+        assert got[-1][0] == "status" and got[-1][1]["status"] == "succeeded"
+
+        # finished jobs: snapshot only, then the stream closes
+        again = _parse_sse((await ac.get("/api/v1/jobs/sse1/events")).text)
+        assert again[0][1]["status"] == "succeeded" and len(again) == 3
+        assert (await ac.get("/api/v1/jobs/nope/events")).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_upload_streams_to_disk_with_hash_and_limit(results_env, monkeypatch):
+    import hashlib
+    from pathlib import Path
+
+    from starlette.requests import Request
+
+    monkeypatch.setenv("MAX_UPLOAD_MB", "0.01")  # ~10 KiB
+    app = create_app()
+    body = b"item_id,bucket\n" + b"".join(f"sku{i},{i % 7}\n".encode() for i in range(300))
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        r = await ac.post("/api/v1/upload/catalog", files={"file": ("cat.csv", body, "text/csv")})
+        assert r.status_code == 200
+        out = r.json()
+        assert out["sha256"] == hashlib.sha256(body).hexdigest() and out["size"] == len(body)
+        dest = Path(out["server_path"])
+        assert dest.name == out["sha256"] and dest.read_bytes() == body
+        assert out["ref"] == f"sha256:{out['sha256']}" and not out["deduplicated"]
+
+        # same bytes under another name and kind: stored once
+        r = await ac.put("/api/v1/upload/ga_csv/export.csv", content=body)
+        assert r.status_code == 200
+        assert r.json()["server_path"] == str(dest) and r.json()["deduplicated"]
+
+        async def _chunks():
+            for _ in range(20):
+                yield b"x" * 1024
+
+        # no Content-Length: the limit is enforced while streaming, partial file removed
+        r = await ac.put("/api/v1/upload/dataset/big.csv", content=_chunks())
+        assert r.status_code == 413
+        assert list((results_env / "cas" / "sha256" / "tmp").iterdir()) == []
+
+        # an oversized multipart body is refused from its Content-Length, before the form is parsed
+        with monkeypatch.context() as m:
+            m.setattr(Request, "form", lambda *a, **k: pytest.fail("parsed an oversized form"))
+            r = await ac.post("/api/v1/upload/catalog", files={"file": ("big.csv", b"x" * 20_000, "text/csv")})
+        assert r.status_code == 413 and "PUT" in r.json()["detail"]
+
+        r = await ac.post("/api/v1/upload/catalog", data={"other": "x"}, files={"f": ("a.csv", b"a", "text/csv")})
+        assert r.status_code in (400, 422)
+
+        r = await ac.put("/api/v1/upload/secrets/x.csv", content=b"a")
+        assert r.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_repeat_job_reuses_memoized_vectors_and_totals(results_env):
+    import numpy as np
+
+    from src.infra.db import list_job_logs
+
+    rows = ["user_pseudo_id,item_id,item_revenue"] + [f"u{i % 5},I{i % 11},{i % 7 + 0.5}" for i in range(400)]
+    body = ("\n".join(rows) + "\n").encode()
+
+    app = create_app()
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        ref = (await ac.put("/api/v1/upload/ga_csv/export.csv", content=body)).json()["ref"]
+
+        async def run_job(key: str) -> str:
+            # distinct idempotency keys force a second job over the same inputs
+            r = await ac.post(
+                "/api/v1/jobs/make-all-ga",
+                headers={"Idempotency-Key": key},
+                json={"ga_csv": ref, "d": 16, "backend": "mock", "batch_size": 64},
+            )
+            job_id = r.json()["id"]
+            for _ in range(100):
+                r = await ac.get(f"/api/v1/jobs/{job_id}")
+                if r.json()["status"] in ("succeeded", "failed"):
+                    break
+                await asyncio.sleep(0.05)
+            assert r.json()["status"] == "succeeded"
+            return job_id
+
+        first, second = await run_job("a"), await run_job("b")
+        logs = [entry.line for entry in list_job_logs(second)]
+        assert any(line.startswith("reused vectors") for line in logs)
+        assert any(line.startswith("reused encrypted totals") for line in logs)
+        assert not any(line.startswith("encrypted rows") for line in logs)
+
+        a, b = (np.loadtxt(results_env / j / "totals.csv", delimiter=",", skiprows=1) for j in (first, second))
+        assert np.array_equal(a, b)
+
+        # derived caches and blobs are not exposed through /files
+        for path in (f"/files/cas/sha256/{ref[7:9]}/{ref[7:]}", "/files/figures/../cache/derived/x"):
+            assert (await ac.get(path)).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_make_all_ga_resubmission_returns_the_existing_job(results_env, monkeypatch):
+    from src.aggregator import jobs_runtime
+    from src.infra.db import update_job_status
+
+    app = create_app()
+    body = {"ga_csv": "demo.csv", "d": 8, "backend": "mock"}
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        first = (await ac.post("/api/v1/jobs/make-all-ga", json=body)).json()
+        again = (await ac.post("/api/v1/jobs/make-all-ga", json=body)).json()
+        assert not first["reused"] and again == {"id": first["id"], "reused": True}
+
+        other = (await ac.post("/api/v1/jobs/make-all-ga", json={**body, "d": 16})).json()
+        assert other["id"] != first["id"]
+
+        # explicit header: same key and body reuse, same key with another body conflicts
+        hdr = {"Idempotency-Key": "dash-1"}
+        keyed = (await ac.post("/api/v1/jobs/make-all-ga", json=body, headers=hdr)).json()
+        assert keyed["id"] != first["id"]
+        assert (await ac.post("/api/v1/jobs/make-all-ga", json=body, headers=hdr)).json()["id"] == keyed["id"]
+        r = await ac.post("/api/v1/jobs/make-all-ga", json={**body, "d": 32}, headers=hdr)
+        assert r.status_code == 409
+
+        # a failed job is not reused (let the demo job finish before failing it)
+        jobs_runtime.shutdown_executor(wait=True)
+        update_job_status(first["id"], "failed")
+        retry = (await ac.post("/api/v1/jobs/make-all-ga", json=body)).json()
+        assert retry["id"] != first["id"] and not retry["reused"]
+
+        # ... nor is anything older than the TTL, even after the memory cache is cleared
+        monkeypatch.setattr(jobs_runtime, "job_cache", jobs_runtime.JobCache())
+        monkeypatch.setenv("JOB_CACHE_TTL_S", "0.000001")
+        await asyncio.sleep(0.01)
+        assert (await ac.post("/api/v1/jobs/make-all-ga", json=body)).json()["id"] != retry["id"]
+
+
+@pytest.mark.asyncio
+async def test_failed_job_retry_resumes_at_the_failed_stage(results_env, monkeypatch):
+    import numpy as np
+
+    from src.aggregator import tasks
+    from src.infra.db import list_job_logs
+
+    rows = ["user_pseudo_id,item_id,item_revenue"] + [f"u{i % 6},I{i % 5},{i % 4 + 1}" for i in range(120)]
+    export = results_env / "export.csv"
+    export.write_text("\n".join(rows) + "\n")
+
+    real_aggregate = tasks.aggregate
+    attempts = []
+
+    def flaky_aggregate(*a, **kw):
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("worker lost")
+        return real_aggregate(*a, **kw)
+
+    monkeypatch.setattr(tasks, "aggregate", flaky_aggregate)
+
+    app = create_app()
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+
+        async def wait(job_id):
+            for _ in range(100):
+                r = await ac.get(f"/api/v1/jobs/{job_id}")
+                if r.json()["status"] in ("succeeded", "failed"):
+                    return r.json()["status"]
+                await asyncio.sleep(0.05)
+
+        body = {"ga_csv": str(export), "d": 8, "backend": "mock", "batch_size": 16}
+        job_id = (await ac.post("/api/v1/jobs/make-all-ga", json=body)).json()["id"]
+        assert await wait(job_id) == "failed"
+        assert (await ac.post(f"/api/v1/jobs/{job_id}/retry")).status_code == 200
+        assert await wait(job_id) == "succeeded"
+        assert (await ac.post(f"/api/v1/jobs/{job_id}/retry")).status_code == 409
+        assert (await ac.post("/api/v1/jobs/nope/retry")).status_code == 404
+
+        lines = [e.line for e in list_job_logs(job_id)]
+        assert any(line.startswith("resume after load, vectorize, encrypt") for line in lines)
+        assert sum(line.startswith("encrypted rows") for line in lines) == 1
+
+        arts = (await ac.get(f"/api/v1/jobs/{job_id}/artifacts")).json()
+        stages = [a["name"] for a in arts if a["kind"] == "checkpoint"]
+        assert stages == ["load", "vectorize", "encrypt", "aggregate", "decrypt", "render"]
+        table = np.loadtxt(results_env / job_id / "totals.csv", delimiter=",", skiprows=1)
+        assert np.isclose(table[:, 1].sum(), sum(i % 4 + 1 for i in range(120)))
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif("tenseal" not in available_backends(), reason="tenseal not installed")
+async def test_precision_bits_pins_tuned_parameters(results_env):
+    import numpy as np
+
+    from src.he_core.backends import tuning
+    from src.infra.db import list_job_logs
+
+    rows = ["user_pseudo_id,item_id,item_revenue"] + [f"u{i % 9},I{i % 13},{i % 5 + 0.25}" for i in range(300)]
+    (results_env / "export.csv").write_text("\n".join(rows) + "\n")
+
+    app = create_app()
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        r = await ac.post(
+            "/api/v1/jobs/make-all-ga",
+            json={"ga_csv": str(results_env / "export.csv"), "d": 16, "backend": "tenseal", "precision_bits": 6},
+        )
+        job_id = r.json()["id"]
+        for _ in range(400):
+            r = await ac.get(f"/api/v1/jobs/{job_id}")
+            if r.json()["status"] in ("succeeded", "failed"):
+                break
+            await asyncio.sleep(0.05)
+        assert r.json()["status"] == "succeeded"
+
+    (entry,) = [t for t in tuning.parameter_table() if t.backend == "tenseal" and t.precision_bits == 6]
+    assert entry.depth == 0 and entry.best.precision_bits >= 6
+    assert any(line.startswith("params for 6 bits") for line in (e.line for e in list_job_logs(job_id)))
+    totals = np.loadtxt(results_env / job_id / "totals.csv", delimiter=",", skiprows=1)
+    assert abs(totals[:, 1].sum() - sum(i % 5 + 0.25 for i in range(300))) < 16 * 2.0**-6
+    tuning.clear_table(disk=True)
+
+
+@pytest.mark.asyncio
+async def test_unreachable_precision_keeps_default_parameters(results_env):
+    from src.infra.db import list_job_logs
+
+    # column totals in the thousands: 40 bits above them overflows a 60-bit prime
+    rows = ["user_pseudo_id,item_id,item_revenue"] + [f"u{i % 9},I{i % 13},{100 + i % 5}" for i in range(300)]
+    (results_env / "export.csv").write_text("\n".join(rows) + "\n")
+
+    app = create_app()
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        r = await ac.post(
+            "/api/v1/jobs/make-all-ga",
+            json={"ga_csv": str(results_env / "export.csv"), "d": 16, "backend": "mock", "precision_bits": 40},
+        )
+        job_id = r.json()["id"]
+        for _ in range(400):
+            r = await ac.get(f"/api/v1/jobs/{job_id}")
+            if r.json()["status"] in ("succeeded", "failed"):
+                break
+            await asyncio.sleep(0.05)
+        assert r.json()["status"] == "succeeded"
+
+    assert any(e.line.startswith("keeping default params: no 128-bit-secure setting") for e in list_job_logs(job_id))
+
+
+@pytest.mark.asyncio
+async def test_auto_backend_without_native_backends(results_env, monkeypatch):
+    from src.aggregator import jobs_runtime
+    from src.he_core.backends import calibration
+
+    # as in a `.[dev]` install: neither tenseal nor openfhe
+    monkeypatch.setattr(jobs_runtime, "available_backends", lambda native_only=False: [])
+    monkeypatch.setattr(calibration, "available_backends", lambda native_only=False: [])
+    (results_env / "export.csv").write_text("user_pseudo_id,item_id,item_revenue\nu1,I1,1.0\n")
+    (results_env / "train.csv").write_text("x,y\n1,2\n")
+
+    app = create_app()
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        # a missing input only writes the demo artifact, which needs no backend
+        r = await ac.post("/api/v1/jobs/make-all-ga", json={"ga_csv": "demo.csv", "d": 8})
+        assert r.status_code == 200
+        job_id = r.json()["id"]
+        for _ in range(100):
+            r = await ac.get(f"/api/v1/jobs/{job_id}")
+            if r.json()["status"] in ("succeeded", "failed"):
+                break
+            await asyncio.sleep(0.05)
+        assert r.json()["status"] == "succeeded"
+
+        r = await ac.post("/api/v1/jobs/make-all-ga", json={"ga_csv": str(results_env / "export.csv"), "d": 8})
+        assert r.status_code == 422 and "none is installed" in r.json()["detail"]
+        r = await ac.post("/api/v1/jobs/ridge", json={"data_csv": str(results_env / "train.csv")})
+        assert r.status_code == 422
+        r = await ac.post(
+            "/api/v1/jobs/make-all-ga", json={"ga_csv": str(results_env / "export.csv"), "d": 8, "backend": "mock"}
+        )
+        assert r.status_code == 200
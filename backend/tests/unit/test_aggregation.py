@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from src.he_core.aggregation import (
+    aggregate,
+    decrypt_aggregate,
+    group_totals,
+    required_rotation_keys,
+    rotation_steps,
+    row_totals,
+    tree_sum,
+)
+from src.he_core.backends.mock_backend import MockBackend
+from src.he_core.utils import CKKSParams
+
+PARAMS = CKKSParams(poly_modulus_degree=8192)
+
+
+class CountingMock(MockBackend):
+    def __init__(self, params=None):
+        super().__init__(params)
+        self.rotations: list[int] = []
+        self.keys: set[int] = set()
+
+    def ensure_rotation_keys(self, steps):
+        self.keys.update(steps)
+
+    def rotate(self, ct, steps):
+        assert steps in self.keys, "rotation without a generated key"
+        self.rotations.append(steps)
+        return super().rotate(ct, steps)
+
+
+def test_rotation_schedule_is_logarithmic():
+    assert rotation_steps(16) == [1, 2, 4, 8]
+    assert rotation_steps(4096, 256) == [256, 512, 1024, 2048]
+    assert required_rotation_keys(256, 4096) == [1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048]
+    with pytest.raises(ValueError):
+        rotation_steps(12)
+
+
+def test_tree_sum_matches_linear_fold():
+    be = MockBackend(PARAMS)
+    cts = [be.encrypt_vector(np.full(4, float(i))) for i in range(7)]
+    assert np.allclose(tree_sum(be, cts)[:4], 21.0)
+    assert np.allclose(tree_sum(be, cts, workers=3)[:4], 21.0)
+
+
+def test_aggregate_column_totals_with_few_rotations():
+    be = CountingMock(PARAMS)
+    x = np.random.default_rng(0).normal(size=(100, 200))
+    agg = aggregate(be, be.encrypt(x))
+    assert agg.blocks == 1
+    assert be.rotations == [256, 512, 1024, 2048]  # log2(16 rows per ct)
+    assert be.keys == {256, 512, 1024, 2048}
+    assert np.allclose(decrypt_aggregate(be, agg), x.sum(axis=0))
+
+
+def test_row_totals_land_in_block_start():
+    be = CountingMock(PARAMS)
+    x = np.random.default_rng(1).normal(size=(16, 256))
+    ct = row_totals(be, be.encrypt(x).ciphertexts[0], 256)
+    assert len(be.rotations) == 8
+    assert np.allclose(be.decrypt_vector(ct)[::256], x.sum(axis=1))
+
+
+def test_group_totals_skips_ciphertexts_without_members():
+    be = MockBackend(PARAMS)
+    x = np.random.default_rng(2).normal(size=(40, 8))  # 512 rows per ct -> 1 ct
+    stores = np.array(["a", "b"] * 20)
+    totals = group_totals(be, be.encrypt(x), stores)
+    assert set(totals) == {"a", "b"}
+    assert np.allclose(decrypt_aggregate(be, totals["a"]), x[stores == "a"].sum(axis=0))
+    assert np.allclose(decrypt_aggregate(be, totals["b"]), x[stores == "b"].sum(axis=0))
+
+
+def test_aggregate_without_rotation_folds_after_decrypt():
+    pytest.importorskip("tenseal")
+    from src.he_core.backends.tenseal_backend import TenSEALBackend
+
+    be = TenSEALBackend(PARAMS)
+    x = np.random.default_rng(3).normal(size=(40, 256))
+    agg = aggregate(be, be.encrypt(x))
+    assert agg.blocks == 16
+    assert np.allclose(decrypt_aggregate(be, agg), x.sum(axis=0), atol=1e-3)
+
+
+def test_tree_accumulator_keeps_log_partials():
+    from src.he_core.aggregation import TreeAccumulator
+
+    be = MockBackend(PARAMS)
+    acc = TreeAccumulator(be)
+    for i in range(100):
+        acc.add(be.encrypt_vector(np.array([float(i)])))
+        assert len(acc._stack) <= 7
+    assert acc.count == 100
+    assert be.decrypt_vector(acc.result())[0] == sum(range(100))
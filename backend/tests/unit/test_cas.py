@@ -0,0 +1,77 @@
+import hashlib
+import os
+
+import pytest
+
+from src.infra import cas
+
+
+def _stage(data: bytes):
+    part = cas.staging_path()
+    part.write_bytes(data)
+    return part, hashlib.sha256(data).hexdigest()
+
+
+def test_identical_content_is_stored_once(results_env):
+    blob, created = cas.put_file(*_stage(b"a,b\n1,2\n"))
+    again, created_again = cas.put_file(*_stage(b"a,b\n1,2\n"))
+    assert created and not created_again and again == blob
+    assert list((results_env / "cas" / "sha256" / "tmp").iterdir()) == []
+    assert cas.resolve(f"sha256:{blob.name}") == blob
+    assert cas.resolve("sha256:" + "0" * 64) is None
+    assert cas.resolve("sha256:../../he.sqlite") is None
+
+
+def test_digest_of_uses_blob_names_and_remembers_files(results_env, monkeypatch):
+    blob, _ = cas.put_file(*_stage(b"xyz"))
+    f = results_env / "plain.csv"
+    f.write_bytes(b"xyz")
+    assert cas.digest_of(f) == blob.name
+    monkeypatch.setattr(cas.hashlib, "sha256", lambda: pytest.fail("re-hashed"))
+    assert cas.digest_of(f) == blob.name
+    assert cas.digest_of(blob) == blob.name
+
+
+def test_memo_entries_round_trip_into_other_directories(results_env):
+    src = results_env / "job1"
+    src.mkdir()
+    (src / "v.npy").write_bytes(b"vectors")
+    key = cas.memo_key("ga-vectors", "abc", 16, None)
+    assert key != cas.memo_key("ga-vectors", "abc", 32, None)
+    assert cas.memo_fetch(key, results_env / "job2") is None
+
+    cas.memo_store(key, [src / "v.npy"], {"rows": 3})
+    cas.memo_store(key, [src / "v.npy"], {"rows": 999})  # first publisher wins
+    meta = cas.memo_fetch(key, results_env / "job2")
+    assert meta == {"rows": 3, "files": ["v.npy"]}
+    assert (results_env / "job2" / "v.npy").read_bytes() == b"vectors"
+
+
+def test_memo_store_evicts_least_recently_used_entries(results_env, monkeypatch):
+    monkeypatch.setenv("MEMO_MAX_MB", str(2.5 / 1024))  # 2.5 KiB: room for two 1 KiB entries
+    src = results_env / "job1"
+    src.mkdir()
+    (src / "v.npy").write_bytes(b"x" * 1024)
+    a, b, c = (cas.memo_key("ga-vectors", n) for n in "abc")
+    cas.memo_store(a, [src / "v.npy"], {})
+    cas.memo_store(b, [src / "v.npy"], {})
+    os.utime(cas.memo_root() / b / "meta.json", (1, 1))  # b is the least recently used
+    assert cas.memo_fetch(a, results_env / "job2") is not None
+
+    cas.memo_store(c, [src / "v.npy"], {})
+    assert sorted(p.name for p in cas.memo_root().iterdir()) == sorted([a, c])
+    assert cas.memo_fetch(b, results_env / "job3") is None
+
+
+def test_blob_store_stays_within_cas_max_mb(results_env, monkeypatch):
+    monkeypatch.setenv("CAS_MAX_MB", str(2.5 / 1024))
+    old, _ = cas.put_file(*_stage(b"1" * 1024))
+    used, _ = cas.put_file(*_stage(b"2" * 1024))
+    os.utime(old, (1, 1))
+    os.utime(used, (2, 2))
+    assert cas.resolve(f"sha256:{used.name}") == used  # resolving counts as use
+
+    new, _ = cas.put_file(*_stage(b"3" * 1024))
+    assert not old.exists() and used.exists() and new.exists()
+    monkeypatch.delenv("CAS_MAX_MB")
+    assert cas.prune_blobs() == 0
@@ -0,0 +1,134 @@
+import hashlib
+
+import numpy as np
+import pytest
+
+from src.he_core.backends import available_backends, get_backend
+from src.he_core.container import (
+    ContainerWriter,
+    is_container,
+    open_container,
+    read_batch,
+    write_batch,
+)
+from src.he_core.utils import CKKSParams
+
+
+def _batch(be, n=10, d=300, seed=0):
+    x = np.random.default_rng(seed).normal(size=(n, d))
+    return x, be.encrypt(x)  # 300 -> 512-wide blocks: 8 rows per mock ciphertext, 2 ciphertexts
+
+
+def test_roundtrip_index_and_artifact_meta(tmp_path):
+    be = get_backend("mock")
+    x, batch = _batch(be)
+    path = tmp_path / "batch.hecb"
+    meta = write_batch(path, be, batch)
+
+    assert meta["format"] == "hecb" and meta["count"] == 2
+    assert meta["compression"] is None and meta["seeded"] is False
+    assert meta["sha256"] == hashlib.sha256(path.read_bytes()).hexdigest()
+    assert meta["payload_bytes"] == meta["raw_bytes"] == sum(len(be.serialize(ct)) for ct in batch.ciphertexts)
+    assert path.stat().st_size == meta["data_offset"] + meta["payload_bytes"]
+    assert list(tmp_path.iterdir()) == [path]  # no side files left behind
+
+    with open_container(path) as c:
+        assert len(c) == 2 and c.header["n_rows"] == 10 and c.header["d"] == 300
+        assert int(c.index[0, 0]) == meta["data_offset"]
+        assert c.blob(1) == be.serialize(batch.ciphertexts[1])
+        assert np.array_equal(be.decrypt_vector(c.ciphertext(1, be)), batch.ciphertexts[1])
+    assert np.allclose(be.decrypt(read_batch(path, be)), x)
+
+
+def test_reading_ciphertext_k_touches_only_its_bytes(tmp_path):
+    be = get_backend("mock")
+    _, batch = _batch(be)
+    path = tmp_path / "batch.hecb"
+    write_batch(path, be, batch)
+    with open_container(path) as c:
+        offset, length, _ = (int(v) for v in c.index[0])
+    # clobber ciphertext 0: ciphertext 1 still reads back intact
+    with path.open("r+b") as f:
+        f.seek(offset)
+        f.write(b"\xff" * length)
+    with open_container(path) as c:
+        assert c.blob(1) == be.serialize(batch.ciphertexts[1])
+        assert c.blob(0) != be.serialize(batch.ciphertexts[0])
+
+
+def test_compression_is_per_ciphertext(tmp_path):
+    be = get_backend("mock")
+    batch = be.encrypt(np.ones((40, 4)))  # mostly zero slots: compresses well
+    meta = write_batch(tmp_path / "z.hecb", be, batch, compression="zlib")
+    assert meta["compression"] == "zlib"
+    assert meta["payload_bytes"] < meta["raw_bytes"] // 4
+    with open_container(tmp_path / "z.hecb") as c:
+        assert c.blob(0) == be.serialize(batch.ciphertexts[0])
+    assert np.allclose(be.decrypt(read_batch(tmp_path / "z.hecb", be)), 1.0)
+
+    with pytest.raises(ValueError, match="unknown compression"):
+        ContainerWriter(tmp_path / "x.hecb", be, compression="lz5")
+
+
+def test_zstd(tmp_path):
+    be = get_backend("mock")
+    batch = be.encrypt(np.ones((40, 4)))
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        with pytest.raises(RuntimeError, match="zstandard is not installed"):
+            write_batch(tmp_path / "z.hecb", be, batch, compression="zstd")
+        return
+    meta = write_batch(tmp_path / "z.hecb", be, batch, compression="zstd")
+    assert meta["compression"] == "zstd" and meta["payload_bytes"] < meta["raw_bytes"]
+    assert np.allclose(be.decrypt(read_batch(tmp_path / "z.hecb", be)), 1.0)
+
+
+def test_seeded_needs_backend_support(tmp_path):
+    be = get_backend("mock")
+    with pytest.raises(ValueError, match="cannot serialize seeded"):
+        ContainerWriter(tmp_path / "s.hecb", be, seeded=True)
+
+    class Seeded:
+        name, params = "mock", be.params
+
+        def serialize_seeded(self, ct):
+            return be.serialize(ct)[: len(be.serialize(ct)) // 2]
+
+    _, batch = _batch(be)
+    meta = write_batch(tmp_path / "s.hecb", Seeded(), batch, seeded=True)
+    assert meta["seeded"] is True and meta["raw_bytes"] == sum(len(be.serialize(ct)) // 2 for ct in batch.ciphertexts)
+
+
+def test_rejects_other_files_and_mismatched_backends(tmp_path):
+    be = get_backend("mock")
+    _, batch = _batch(be)
+    path = tmp_path / "batch.hecb"
+    write_batch(path, be, batch)
+    other = get_backend("mock", CKKSParams(poly_modulus_degree=4096))
+    with open_container(path) as c, pytest.raises(ValueError, match="holds mock ciphertexts"):
+        c.ciphertext(0, other)
+
+    (tmp_path / "raw.bin").write_bytes(b"not a container at all")
+    assert is_container(path) and not is_container(tmp_path / "raw.bin")
+    with pytest.raises(ValueError, match="not a ciphertext container"):
+        open_container(tmp_path / "raw.bin")
+
+
+def test_failed_write_leaves_nothing(tmp_path):
+    be = get_backend("mock")
+    with pytest.raises(RuntimeError), ContainerWriter(tmp_path / "x.hecb", be) as w:
+        w.append(be.encrypt_vector(np.ones(3)))
+        raise RuntimeError("encryption failed")
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.skipif("tenseal" not in available_backends(), reason="tenseal not installed")
+def test_tenseal_partial_read(tmp_path):
+    be = get_backend("tenseal")
+    x, batch = _batch(be, n=40, d=1000)  # 4 rows per ciphertext: 10 ciphertexts
+    write_batch(tmp_path / "t.hecb", be, batch)
+    with open_container(tmp_path / "t.hecb") as c:
+        assert len(c) == 10
+        row = be.decrypt_vector(c.ciphertext(7, be))[:1000]  # first row of ciphertext 7
+    assert np.allclose(row, x[28], atol=1e-3)
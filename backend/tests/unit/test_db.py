@@ -0,0 +1,198 @@
+import datetime as dt
+import threading
+import time
+
+import pytest
+from sqlalchemy import event, text
+from sqlmodel import Session, select
+
+from src.infra import db
+from src.infra.db import (
+    JobLog,
+    JobLogWriter,
+    JobRecord,
+    count_jobs,
+    append_job_log,
+    create_job_record,
+    ensure_engine,
+    get_job_record,
+    list_artifacts,
+    list_jobs_page,
+    record_artifact,
+    unit_of_work,
+    update_job_status,
+)
+
+
+def test_sqlite_engine_uses_wal_busy_timeout_and_normal_sync(results_env, monkeypatch):
+    monkeypatch.setenv("DB_BUSY_TIMEOUT_MS", "1234")
+    with ensure_engine().connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 1234
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+
+
+def test_server_databases_get_a_tuned_pool(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "12")
+    kwargs = db._engine_kwargs("postgresql+psycopg://u:p@db/he")
+    assert kwargs["pool_size"] == 12 and kwargs["pool_pre_ping"] is True
+    assert "pool_size" not in db._engine_kwargs("sqlite:///x.sqlite")
+
+
+def test_unit_of_work_commits_a_transition_once(results_env):
+    create_job_record(job_id="j1", kind="test", status="queued")
+    commits = []
+    with unit_of_work() as s:
+        event.listen(s, "after_commit", lambda _s: commits.append(1))
+        update_job_status("j1", "succeeded", session=s)
+        append_job_log("j1", "done", session=s)
+        record_artifact(job_id="j1", kind="text", name="a.txt", path=None, url=None, session=s)
+    assert commits == [1]
+    assert get_job_record("j1").status == "succeeded"
+    assert [a.name for a in list_artifacts("j1")] == ["a.txt"]
+
+
+def test_unit_of_work_rolls_back_everything_on_error(results_env):
+    create_job_record(job_id="j2", kind="test", status="queued")
+    with pytest.raises(RuntimeError):
+        with unit_of_work() as s:
+            update_job_status("j2", "succeeded", session=s)
+            append_job_log("j2", "done", session=s)
+            raise RuntimeError("crash mid-transition")
+    assert get_job_record("j2").status == "queued"
+    with Session(ensure_engine()) as s:
+        assert s.exec(select(JobLog).where(JobLog.job_id == "j2")).all() == []
+
+
+def test_concurrent_writers_do_not_hit_database_is_locked(results_env):
+    create_job_record(job_id="j3", kind="test", status="queued")
+    errors = []
+
+    def writer(n):
+        try:
+            for i in range(40):
+                with unit_of_work() as s:
+                    append_job_log("j3", f"w{n} line {i}", session=s)
+                    update_job_status("j3", "running", session=s)
+        except Exception as exc:  # pragma: no cover - the failure being tested for
+            errors.append(exc)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    with Session(ensure_engine()) as s:
+        assert len(s.exec(select(JobLog).where(JobLog.job_id == "j3")).all()) == 320
+
+
+def _lines(job_id):
+    with Session(ensure_engine()) as s:
+        rows = s.exec(select(JobLog).where(JobLog.job_id == job_id).order_by(JobLog.id)).all()
+        return [r.line for r in rows]
+
+
+def test_log_writer_flushes_on_size_threshold_and_close(results_env):
+    create_job_record(job_id="j4", kind="test", status="queued")
+    with JobLogWriter("j4", max_lines=100, max_seconds=60) as log:
+        for i in range(250):
+            log(f"line {i}")
+        assert len(_lines("j4")) == 200  # two full batches, 50 pending
+    assert _lines("j4") == [f"line {i}" for i in range(250)]
+    assert log.flushes == 3
+
+
+def test_log_writer_flushes_pending_lines_after_max_seconds(results_env):
+    create_job_record(job_id="j5", kind="test", status="queued")
+    log = JobLogWriter("j5", max_lines=1000, max_seconds=0.05)
+    log("quiet job")
+    deadline = time.monotonic() + 5
+    while not _lines("j5") and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert _lines("j5") == ["quiet job"]
+    log.close()
+
+
+def test_log_writer_joins_the_callers_unit_of_work(results_env):
+    create_job_record(job_id="j6", kind="test", status="queued")
+    with JobLogWriter("j6") as log:
+        log("done")
+        with pytest.raises(RuntimeError):
+            with unit_of_work() as s:
+                log.flush(session=s)
+                update_job_status("j6", "succeeded", session=s)
+                raise RuntimeError("rolled back")
+    assert _lines("j6") == [] and get_job_record("j6").status == "queued"
+
+
+def test_log_writer_sustains_tens_of_thousands_of_lines_per_second(results_env):
+    create_job_record(job_id="j7", kind="test", status="queued")
+    t0 = time.perf_counter()
+    with JobLogWriter("j7", max_lines=1000) as log:
+        for i in range(20_000):
+            log(f"batch {i} encrypted")
+    assert time.perf_counter() - t0 < 2.0
+    assert len(_lines("j7")) == 20_000
+
+
+def _seed_jobs(n):
+    base = dt.datetime(2024, 1, 1, tzinfo=dt.UTC)
+    with unit_of_work() as s:
+        for i in range(n):
+            s.add(
+                JobRecord(
+                    id=f"job{i:03d}",
+                    kind="ridge" if i % 3 == 0 else "make_all_ga",
+                    status="failed" if i % 2 else "succeeded",
+                    # pairs share a timestamp so the id tiebreak matters
+                    created_at=base + dt.timedelta(seconds=i // 2),
+                    updated_at=base,
+                )
+            )
+
+
+def test_keyset_pages_cover_every_job_once_in_order(results_env):
+    _seed_jobs(25)
+    seen, cursor = [], None
+    while True:
+        page = list_jobs_page(limit=7, cursor=cursor, count="none")
+        seen += [r.id for r in page.items]
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert seen == [f"job{i:03d}" for i in reversed(range(25))]
+
+
+def test_keyset_pages_filter_by_status_and_kind(results_env):
+    _seed_jobs(30)
+    page = list_jobs_page(limit=3, status="failed", kind="ridge", count="exact")
+    assert [r.id for r in page.items] == ["job027", "job021", "job015"]
+    assert page.total == 5
+    rest = list_jobs_page(limit=3, cursor=page.next_cursor, status="failed", kind="ridge")
+    assert [r.id for r in rest.items] == ["job009", "job003"] and rest.next_cursor is None
+
+
+def test_cached_count_is_reused_until_its_ttl(results_env, monkeypatch):
+    monkeypatch.setattr(db, "_count_cache", {})
+    _seed_jobs(4)
+    assert count_jobs() == 4
+    create_job_record(job_id="late", kind="test", status="queued")
+    assert count_jobs() == 4
+    assert count_jobs(cached=False) == 5
+    monkeypatch.setenv("JOBS_COUNT_TTL_S", "0")
+    assert list_jobs_page(count="cached").total == 5
+
+
+def test_invalid_cursor_is_rejected(results_env):
+    with pytest.raises(ValueError):
+        list_jobs_page(cursor="not-a-cursor")
+
+
+def test_precomputed_sha256_skips_rehashing(results_env, monkeypatch):
+    create_job_record(job_id="j1", kind="test", status="running")
+    f = results_env / "a.csv"
+    f.write_text("x\n")
+    monkeypatch.setattr(db, "sha256_file", lambda p: pytest.fail("re-hashed"))
+    record_artifact(job_id="j1", kind="table", name="a.csv", path=str(f), url=None, meta={"sha256": "abc"})
+    assert list_artifacts("j1")[0].meta["sha256"] == "abc"
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from src.infra import events
+from src.infra.db import (
+    JobLogWriter,
+    append_job_log,
+    create_job_record,
+    record_artifact,
+    unit_of_work,
+    update_job_status,
+)
+
+
+async def _drain(queue, n, timeout=2.0):
+    return [await asyncio.wait_for(queue.get(), timeout) for _ in range(n)]
+
+
+async def test_in_process_broadcast_reaches_subscribers_from_threads(monkeypatch):
+    monkeypatch.delenv("USE_RQ", raising=False)
+    async with events.subscribe("j1") as q1, events.subscribe("j1") as q2:
+        await asyncio.to_thread(events.publish, "j1", events.STATUS, {"status": "running"})
+        events.publish("other", events.STATUS, {"status": "running"})
+        for q in (q1, q2):
+            (ev,) = await _drain(q, 1)
+            assert ev == {"event": "status", "job_id": "j1", "data": {"status": "running"}}
+            assert q.empty()
+    assert events._local.subscribers("j1") == 0
+
+
+async def test_db_helpers_publish_only_after_commit(results_env, monkeypatch):
+    monkeypatch.delenv("USE_RQ", raising=False)
+    create_job_record(job_id="j2", kind="test", status="queued")
+    async with events.subscribe("j2") as q:
+        with pytest.raises(RuntimeError):
+            with unit_of_work() as s:
+                update_job_status("j2", "running", session=s)
+                raise RuntimeError("rolled back")
+        with unit_of_work() as s:
+            update_job_status("j2", "running", session=s)
+            append_job_log("j2", "hello", session=s)
+            assert q.empty()  # not yet committed
+        with JobLogWriter("j2") as log:
+            log("a")
+            log("b")
+        record_artifact(job_id="j2", kind="text", name="x.txt", path=None, url=None)
+        got = await _drain(q, 4)
+    assert [e["event"] for e in got] == ["status", "log", "log", "artifact"]
+    assert got[0]["data"]["status"] == "running"
+    assert [ln["line"] for ln in got[2]["data"]["lines"]] == ["a", "b"]
+    assert got[3]["data"]["name"] == "x.txt"
+
+
+async def test_redis_pubsub_carries_events_between_processes(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    monkeypatch.setenv("USE_RQ", "1")
+    monkeypatch.setattr(events, "_sync_redis", fakeredis.FakeRedis(server=server))
+    monkeypatch.setattr(events, "_subscriber_client", lambda: fakeredis.aioredis.FakeRedis(server=server))
+
+    async with events.subscribe("j3") as q:
+        events.publish("j3", events.LOG, {"lines": [{"created_at": "t", "line": "from a worker"}]})
+        (ev,) = await _drain(q, 1)
+    assert ev["event"] == "log" and ev["data"]["lines"][0]["line"] == "from a worker"
+
+
+async def test_publish_falls_back_to_this_process_when_redis_is_down(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    server.connected = False
+    monkeypatch.setenv("USE_RQ", "0")
+    async with events.subscribe("j4") as q:
+        monkeypatch.setenv("USE_RQ", "1")
+        monkeypatch.setattr(events, "_sync_redis", fakeredis.FakeRedis(server=server))
+        events.publish("j4", events.STATUS, {"status": "running"})
+        (ev,) = await _drain(q, 1)
+        monkeypatch.setenv("USE_RQ", "0")
+    assert ev["data"]["status"] == "running"
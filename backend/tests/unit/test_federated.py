@@ -0,0 +1,69 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pytest
+
+from src.he_core.multiparty.federated import FederatedCoordinator, SimulatedStores
+from src.he_core.utils import CKKSParams, pack_blobs, unpack_blobs
+
+SMALL = CKKSParams(poly_modulus_degree=8192)
+
+
+@dataclass(frozen=True)
+class FlakyStores(SimulatedStores):
+    """Stores whose id is a multiple of 7 drop out."""
+
+    def __call__(self, store_id, w):
+        if store_id % 7 == 0:
+            raise ConnectionError(f"store {store_id} went away")
+        return super().__call__(store_id, w)
+
+
+def _weighted_mean(stores, ids, w):
+    ups, ns = zip(*(stores(i, w) for i in ids))
+    return np.average(np.stack(ups), axis=0, weights=ns), sum(ns)
+
+
+def test_blob_framing_roundtrip():
+    blobs = [b"", b"abc", bytes(range(256))]
+    assert unpack_blobs(pack_blobs(*blobs)) == blobs
+
+
+def test_round_aggregates_weighted_mean_of_client_updates():
+    stores = SimulatedStores(seed=3)
+    w = np.full(8, 0.1)
+    with FederatedCoordinator(8, "mock", SMALL, workers=2, client_fn=stores) as coord:
+        rep = coord.run_round(range(40), w)
+    expected, n = _weighted_mean(stores, range(40), w)
+    assert rep.clients == 40 and rep.samples == n and not rep.failed
+    assert np.allclose(rep.update, expected)
+    assert rep.seconds >= rep.first_arrival > 0
+    assert rep.as_dict()["client_p95"] >= rep.as_dict()["client_p50"]
+
+
+def test_dropped_clients_are_excluded_from_the_round():
+    stores = FlakyStores(seed=1)
+    with FederatedCoordinator(4, "mock", SMALL, workers=2, client_fn=stores) as coord:
+        rep = coord.run_round(range(15), np.zeros(4))
+    assert rep.failed == [0, 7, 14]
+    expected, _ = _weighted_mean(stores, [i for i in range(15) if i % 7], np.zeros(4))
+    assert np.allclose(rep.update, expected)
+
+
+def test_training_rounds_converge_towards_true_weights():
+    stores = SimulatedStores(seed=0)
+    with FederatedCoordinator(4, "mock", SMALL, workers=2, client_fn=stores) as coord:
+        w, reports = coord.train(range(30), rounds=6, lr=0.5)
+    assert len(reports) == 6
+    assert np.max(np.abs(w - stores.true_weights(4))) < 0.05
+
+
+def test_tenseal_public_keys_encrypt_for_the_key_holder():
+    pytest.importorskip("tenseal")
+    from src.he_core.backends import get_backend
+
+    owner = get_backend("tenseal", SMALL)
+    client = get_backend("tenseal", SMALL, public_keys=owner.public_keys())
+    assert not client.context.is_private()
+    blob = client.serialize(client.encrypt_vector(np.arange(5.0)))
+    assert np.allclose(owner.decrypt_vector(owner.deserialize(blob))[:5], np.arange(5.0), atol=1e-3)
@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+from src.he_core.backends.mock_backend import MockBackend
+from src.he_core.utils import CKKSParams, block_width, pack_rows, unpack_rows
+
+SMALL = CKKSParams(poly_modulus_degree=8192)
+
+
+def test_pack_roundtrip_pads_to_power_of_two_blocks():
+    x = np.arange(30, dtype=float).reshape(5, 6)
+    packed = pack_rows(x, slots=32)
+    assert block_width(6) == 8
+    assert packed.shape == (2, 32)  # 4 rows per ciphertext
+    assert np.array_equal(packed[0, 8:14], x[1])
+    assert np.array_equal(unpack_rows(packed, 5, 6), x)
+
+
+def test_pack_rejects_rows_wider_than_slots():
+    with pytest.raises(ValueError):
+        pack_rows(np.ones((1, 40)), slots=32)
+
+
+def test_mock_backend_roundtrip_and_ops():
+    be = MockBackend(SMALL)
+    x = np.random.default_rng(0).normal(size=(40, 256))
+    batch = be.encrypt(x)
+    assert len(batch) == 3  # 16 rows per 4096-slot ciphertext
+    assert np.allclose(be.decrypt(batch), x)
+
+    ct = be.add(batch.ciphertexts[0], batch.ciphertexts[0])
+    assert np.allclose(be.decrypt_vector(ct)[:256], 2 * x[0])
+    ct = be.multiply_plain(batch.ciphertexts[0], np.full(256, 0.5))
+    assert np.allclose(be.decrypt_vector(ct)[:256], 0.5 * x[0])
+    assert be.decrypt_vector(be.sum(batch.ciphertexts[0]))[0] == pytest.approx(x[:16].sum())
+
+
+def test_tenseal_backend_matches_mock():
+    pytest.importorskip("tenseal")
+    from src.he_core.backends.tenseal_backend import TenSEALBackend
+
+    be = TenSEALBackend(SMALL)
+    assert be.context is TenSEALBackend(SMALL).context  # one context per params
+    x = np.random.default_rng(1).normal(size=(20, 256))
+    batch = be.encrypt(x)
+    assert len(batch) == 2
+    assert np.allclose(be.decrypt(batch), x, atol=1e-4)
+    total = be.decrypt_vector(be.sum(batch.ciphertexts[0]))[0]
+    assert total == pytest.approx(x[:16].sum(), abs=1e-3)
+    # no rotate() stub: the capability flag is the contract
+    assert not be.supports_rotation and not hasattr(be, "rotate")
+
+
+def test_mock_rotate_is_left_rotation():
+    be = MockBackend(SMALL)
+    ct = be.encrypt_vector(np.arange(4.0))
+    assert np.array_equal(be.rotate(ct, 1)[:3], [1.0, 2.0, 3.0])
+
+
+def test_registry_lookup():
+    from src.he_core.backends import available_backends, get_backend, registered_backends
+
+    assert {"mock", "tenseal", "openfhe"} <= set(registered_backends())
+    assert "mock" in available_backends()
+    assert "mock" not in available_backends(native_only=True)
+    assert get_backend("mock", SMALL).slots == 4096
+    with pytest.raises(ValueError):
+        get_backend("nope")
+
+
+def test_calibrate_picks_fastest(monkeypatch):
+    import time
+
+    from src.he_core import backends
+    from src.he_core.backends import calibration
+
+    class SlowMock(MockBackend):
+        name = "slow"
+
+        def encrypt(self, x):
+            time.sleep(0.02)
+            return super().encrypt(x)
+
+    monkeypatch.setitem(backends._REGISTRY, "slow", (SlowMock, lambda: True))
+    monkeypatch.setattr(calibration, "_timings", {})
+    assert calibration.calibrate(64, 8, candidates=["slow", "mock"]) == "mock"
+    assert set(calibration.calibration_table()[(64, 8, calibration.DEFAULT_PARAMS)]) == {"slow", "mock"}
+    assert calibration.resolve_backend_name("slow", 64, 8) == "slow"
+
+
+def test_auto_never_falls_back_to_mock(monkeypatch):
+    from src.he_core.backends import calibration
+
+    monkeypatch.setattr(calibration, "available_backends", lambda native_only=False: [])
+    with pytest.raises(RuntimeError, match="none is installed"):
+        calibration.resolve_backend_name("auto", 64, 8)
+    assert calibration.resolve_backend_name("mock", 64, 8) == "mock"
+
+
+def test_openfhe_backend_matches_mock():
+    pytest.importorskip("openfhe")
+    from src.he_core.backends.openfhe_backend import OpenFHEBackend
+
+    be = OpenFHEBackend(SMALL)
+    x = np.random.default_rng(2).normal(size=(4, 256))
+    batch = be.encrypt(x)
+    assert np.allclose(be.decrypt(batch), x, atol=1e-3)
+    rotated = be.decrypt_vector(be.rotate(batch.ciphertexts[0], 1))
+    assert np.allclose(rotated[:255], x[0, 1:], atol=1e-3)
@@ -0,0 +1,108 @@
+import asyncio
+import time
+
+import pytest
+
+from src.aggregator import jobs_runtime
+from src.infra.db import create_job_record, get_job_record
+
+
+def _slow_job(job_id, seconds):
+    from src.infra.db import update_job_status
+
+    update_job_status(job_id, "running")
+    time.sleep(seconds)
+    update_job_status(job_id, "succeeded")
+
+
+def _broken_job(job_id):
+    raise RuntimeError("boom")
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.delenv("USE_RQ", raising=False)
+    monkeypatch.setenv("JOB_WORKERS", "4")
+    jobs_runtime.shutdown_executor(wait=True)
+    yield
+    jobs_runtime.shutdown_executor(wait=True)
+
+
+def test_dispatch_runs_jobs_concurrently(results_env, pool):
+    ids = [f"job{i}" for i in range(4)]
+    for job_id in ids:
+        create_job_record(job_id=job_id, kind="test", status="queued")
+
+    t0 = time.perf_counter()
+    futures = [jobs_runtime.dispatch(job_id, _slow_job, 0.3) for job_id in ids]
+    assert time.perf_counter() - t0 < 0.1  # submission does not block
+
+    for f in futures:
+        assert f is not None
+        f.result(timeout=5)
+    # four 0.3s jobs on four workers finish well under the serial 1.2s
+    assert time.perf_counter() - t0 < 1.0
+    assert all(get_job_record(j).status == "succeeded" for j in ids)
+
+
+def test_dispatch_marks_failed_job(results_env, pool):
+    create_job_record(job_id="bad", kind="test", status="queued")
+    fut = jobs_runtime.dispatch("bad", _broken_job)
+    assert fut is not None
+    with pytest.raises(RuntimeError):
+        fut.result(timeout=5)
+    assert get_job_record("bad").status == "failed"
+
+
+def test_rq_attempts_stay_queued_until_the_last_one_fails(results_env):
+    fakeredis = pytest.importorskip("fakeredis")
+    from rq import Queue, Retry, SimpleWorker
+
+    from src.infra.db import list_job_logs
+
+    redis = fakeredis.FakeRedis()
+    create_job_record(job_id="bad", kind="test", status="queued")
+    q = Queue("default", connection=redis)
+    job = q.enqueue(jobs_runtime.run_guarded, "bad", _broken_job, job_id="bad", retry=Retry(max=2))
+    SimpleWorker([q], connection=redis).work(burst=True)
+
+    logs = [log.line for log in list_job_logs("bad")]
+    assert [m for m in logs if m.startswith("retrying")] == ["retrying; attempts left: 2", "retrying; attempts left: 1"]
+    assert sum(m.startswith("error") for m in logs) == 3
+    assert get_job_record("bad").status == "failed"
+    assert job.get_status(refresh=True) == "failed"
+
+
+def test_start_make_all_ga_returns_before_job_runs(results_env, pool, monkeypatch):
+    monkeypatch.setattr(jobs_runtime, "run_make_all_ga", lambda job_id, *a: _slow_job(job_id, 0.5))
+    t0 = time.perf_counter()
+    job = asyncio.run(jobs_runtime.start_make_all_ga("demo.csv", 256, None))
+    assert time.perf_counter() - t0 < 0.2
+    assert get_job_record(job.id).status in ("queued", "running")
+
+
+def test_job_cache_expires_and_evicts_least_recently_used(monkeypatch):
+    cache = jobs_runtime.JobCache(max_entries=2)
+    now = time.time()
+    cache.put("a", "job-a", now + 60)
+    cache.put("b", "job-b", now + 60)
+    assert cache.get("a") == "job-a"  # a is now the most recent
+    cache.put("c", "job-c", now + 60)
+    assert cache.get("b") is None and len(cache) == 2
+
+    cache.put("old", "job-old", now - 1)
+    assert cache.get("old") is None
+
+
+def test_concurrent_duplicate_submissions_share_one_job(results_env, pool, monkeypatch):
+    monkeypatch.setattr(jobs_runtime, "run_make_all_ga", lambda job_id, *a: _slow_job(job_id, 0.2))
+    monkeypatch.setattr(jobs_runtime, "job_cache", jobs_runtime.JobCache())
+
+    async def submit_many():
+        return await asyncio.gather(
+            *(asyncio.to_thread(asyncio.run, jobs_runtime.start_make_all_ga("demo.csv", 64, None)) for _ in range(8))
+        )
+
+    jobs = asyncio.run(submit_many())
+    assert len({j.id for j in jobs}) == 1
+    assert sum(not j.reused for j in jobs) == 1
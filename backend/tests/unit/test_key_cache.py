@@ -0,0 +1,72 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from src.he_core.utils import CKKSParams, KeyCache, key_cache, params_hash, reset_key_cache
+
+
+def _raw(b: bytes) -> bytes:
+    return b
+
+
+def test_params_hash_is_stable_and_distinguishes_parameter_sets():
+    assert params_hash(CKKSParams()) == params_hash(CKKSParams())
+    assert params_hash(CKKSParams()) != params_hash(CKKSParams(poly_modulus_degree=16384))
+
+
+def test_memory_tier_evicts_least_recently_used_within_budget():
+    cache = KeyCache(budget_bytes=250)
+    for k in "abc":
+        cache.get_or_create("ns", k, lambda k=k: k.encode() * 100, _raw, _raw)
+    assert cache.nbytes == 200  # "a" was evicted to make room for "c"
+    cache.get_or_create("ns", "b", lambda: pytest.fail("b should be cached"), _raw, _raw)
+    assert cache.hits == {"memory": 1, "disk": 0, "miss": 3}
+
+
+def test_disk_tier_is_shared_between_cache_instances(tmp_path):
+    KeyCache(1 << 20, tmp_path).get_or_create("ns", "k", lambda: b"keys", _raw, _raw)
+    other = KeyCache(1 << 20, tmp_path)
+    assert other.get_or_create("ns", "k", lambda: pytest.fail("rebuilt"), _raw, _raw) == b"keys"
+    assert other.hits["disk"] == 1
+    assert (tmp_path / "ns" / "k.bin").stat().st_mode & 0o777 == 0o600
+
+
+def test_concurrent_callers_build_an_entry_once():
+    cache = KeyCache(1 << 20)
+    calls = []
+
+    def build():
+        calls.append(1)
+        time.sleep(0.05)
+        return b"x"
+
+    threads = [
+        threading.Thread(target=cache.get_or_create, args=("ns", "k", build, _raw, _raw)) for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+
+
+def test_tenseal_keys_survive_a_fresh_process_cache(results_env, monkeypatch):
+    pytest.importorskip("tenseal")
+    from src.he_core.backends.tenseal_backend import TenSEALBackend
+
+    monkeypatch.setenv("HE_KEY_CACHE_DISK", "1")
+    reset_key_cache()
+
+    params = CKKSParams(poly_modulus_degree=8192)
+    be = TenSEALBackend(params)
+    blob = be.serialize(be.sum(be.encrypt_vector(np.arange(4.0))))
+    assert key_cache().hits["miss"] == 1
+    assert (results_env / "cache" / "keys" / "tenseal" / f"{params_hash(params)}.bin").is_file()
+
+    reset_key_cache()  # as in a newly started worker
+    fresh = TenSEALBackend(params)
+    assert key_cache().hits == {"memory": 0, "disk": 1, "miss": 0}
+    assert fresh.context.has_galois_keys()
+    assert fresh.decrypt_vector(fresh.deserialize(blob))[0] == pytest.approx(6.0, abs=1e-3)
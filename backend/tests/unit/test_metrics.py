@@ -0,0 +1,106 @@
+import asyncio
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+from httpx import ASGITransport, AsyncClient
+from prometheus_client import REGISTRY
+
+from src.he_core.backends import get_backend
+
+BACKEND_ROOT = Path(__file__).resolve().parents[2]
+
+
+def _value(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_backend_primitives_are_counted():
+    be = get_backend("mock")
+    ops = ("encryption", "rotation", "rotation_estimate", "relinearization_estimate")
+    before = {op: _value("he_operations_total", backend="mock", op=op) for op in ops}
+    nbytes = _value("he_serialized_bytes_total", backend="mock")
+
+    batch = be.encrypt(np.ones((3 * be.slots // 4, 4)))  # 3 ciphertexts
+    ct = batch.ciphertexts[0]
+    be.rotate(ct, 4)
+    be.sum(ct)
+    be.polyval(ct, [0.5, 0.25, 0.0, -0.02])  # degree 3: x^2, x^3
+    blob = be.serialize(ct)
+
+    assert _value("he_operations_total", backend="mock", op="encryption") - before["encryption"] == 3
+    # rotate() is counted as called; sum() and polyval() are estimated
+    assert _value("he_operations_total", backend="mock", op="rotation") - before["rotation"] == 1
+    assert _value("he_operations_total", backend="mock", op="rotation_estimate") - before["rotation_estimate"] == int(np.log2(be.slots))
+    assert _value("he_operations_total", backend="mock", op="relinearization_estimate") - before["relinearization_estimate"] == 2
+    assert _value("he_serialized_bytes_total", backend="mock") - nbytes == len(blob)
+    assert _value("he_operation_duration_seconds_count", backend="mock", call="encrypt") >= 1
+
+
+async def test_metrics_endpoint_reports_routes_stages_and_queue_depth(results_env, monkeypatch):
+    monkeypatch.setenv("API_KEY", "devkey")
+    from src.aggregator.api import create_app
+
+    app = create_app()
+    headers = {"X-API-Key": "devkey"}
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        r = await ac.post("/api/v1/jobs/make-all-ga", headers=headers, json={"ga_csv": "demo.csv", "d": 8, "backend": "mock"})
+        job_id = r.json()["id"]
+        for _ in range(100):
+            r = await ac.get(f"/api/v1/jobs/{job_id}", headers=headers)
+            if r.json()["status"] in ("succeeded", "failed"):
+                break
+            await asyncio.sleep(0.05)
+        assert r.json()["status"] == "succeeded"
+
+        r = await ac.get("/metrics")  # scraped without the API key
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    text = r.text
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/v1/jobs/{job_id}",status="200"}' in text
+    assert 'he_job_stage_duration_seconds_count{kind="make-all-ga",stage="load"}' in text
+    assert 'he_job_duration_seconds_count{kind="make-all-ga",status="succeeded"}' in text
+    assert 'he_job_queue_depth{queue="inprocess"} 0.0' in text
+    assert "he_job_queue_depth_up 1.0" in text
+
+
+def test_unreadable_queue_depths_export_up_zero():
+    from redis.exceptions import ConnectionError as RedisConnectionError
+
+    from src.infra.metrics import render
+
+    def _down():
+        raise RedisConnectionError("no server")
+
+    text = render(_down)[0].decode()
+    assert "he_job_queue_depth_up 0.0" in text and "he_job_queue_depth{" not in text
+
+
+_ENCRYPT = """
+import numpy as np
+from src.he_core.backends import get_backend
+be = get_backend("mock")
+be.encrypt(np.ones((2 * be.slots, 1)))
+"""
+
+_RENDER = """
+from src.infra.metrics import render
+print(render()[0].decode())
+"""
+
+
+def test_samples_from_several_processes_are_merged(tmp_path):
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+
+    def run(code):
+        return subprocess.run(
+            [sys.executable, "-c", code], cwd=BACKEND_ROOT, env=env, check=True, capture_output=True, text=True
+        ).stdout
+
+    run(_ENCRYPT)
+    run(_ENCRYPT)
+    out = run(_RENDER)
+    # each worker process encrypted 2 ciphertexts
+    assert 'he_operations_total{backend="mock",op="encryption"} 4.0' in out
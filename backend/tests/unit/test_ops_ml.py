@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.he_core.backends.mock_backend import MockBackend
+from src.he_core.ops_ml import EncryptedGramAccumulator, encrypted_ridge, ridge_solve
+from src.vectorizers.common import iter_xy_batches
+
+
+def _data(n=100, d=12, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, d))
+    return X, X @ rng.normal(size=d) + 0.01 * rng.normal(size=n)
+
+
+def test_gram_accumulator_recovers_statistics():
+    X, y = _data()
+    acc = EncryptedGramAccumulator(MockBackend(), d=12)
+    for i in range(0, 100, 7):
+        acc.add_batch(X[i : i + 7], y[i : i + 7])
+    xtx, xty = acc.decrypt()
+    assert np.allclose(xtx, X.T @ X)
+    assert np.allclose(xty, X.T @ y)
+    assert acc.rows == 100 and acc.contributions == 15
+
+
+@pytest.mark.parametrize("bs", [1, 8, 32])
+def test_encrypted_ridge_matches_plaintext(bs):
+    X, y = _data()
+    res = encrypted_ridge(MockBackend(), ((X[i : i + bs], y[i : i + bs]) for i in range(0, 100, bs)), 12, lam=0.5, batch_size=bs)
+    assert np.allclose(res.coef, ridge_solve(X.T @ X, X.T @ y, 0.5))
+    assert res.ciphertexts == -(-100 // bs)  # 90 packed values fit one ciphertext
+    assert {"pack", "encrypt", "accumulate", "decrypt", "solve", "total"} <= set(res.timings)
+
+
+def test_iter_xy_batches_rebatches_across_chunks(tmp_path):
+    X, y = _data(n=50, d=3)
+    pd.DataFrame(np.column_stack([X, y]), columns=["a", "b", "c", "y"]).to_csv(tmp_path / "d.csv", index=False)
+    batches = list(iter_xy_batches(tmp_path / "d.csv", "y", batch_size=8, chunk_rows=7))
+    assert [len(b[1]) for b in batches] == [8] * 6 + [2]
+    assert np.allclose(np.vstack([b[0] for b in batches]), X)
+    assert np.allclose(np.concatenate([b[1] for b in batches]), y)
+
+
+def test_sigmoid_poly_and_depth():
+    from src.he_core.ops_ml import logistic_depth, sigmoid_poly
+
+    t = np.linspace(-4, 4, 101)
+    assert np.abs(np.polynomial.polynomial.polyval(t, sigmoid_poly(3, 4.0)) - 1 / (1 + np.exp(-t))).max() < 0.03
+    assert [logistic_depth(k) for k in (1, 3, 5, 7)] == [2, 3, 4, 4]
+    with pytest.raises(ValueError):
+        sigmoid_poly(2)
+
+
+def test_params_for_depth_picks_smallest_secure_ring():
+    from src.he_core.utils import params_for_depth
+
+    assert params_for_depth(2).poly_modulus_degree == 8192  # 60+40+40+60 = 200 <= 218
+    assert params_for_depth(3).poly_modulus_degree == 16384
+    assert params_for_depth(3).coeff_mod_bit_sizes == (60, 40, 40, 40, 60)
+
+
+def test_logistic_scorer_batches_customers_per_ciphertext():
+    from src.he_core.ops_ml import EncryptedLogisticScorer, sigmoid_poly
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(5000, 6)) * 0.3
+    w, b = rng.normal(size=6), 0.2
+    scorer = EncryptedLogisticScorer(MockBackend(), w, b, degree=5, bound=4.0)
+    scores = scorer.score_all(X, batch_size=4096)
+    expected = np.polynomial.polynomial.polyval(X @ w + b, sigmoid_poly(5, 4.0))
+    assert np.allclose(scores, expected)
+    assert {"encrypt", "dot", "sigmoid", "decrypt"} == set(scorer.timer.as_dict())
+    with pytest.raises(ValueError):
+        scorer.encrypt_batch(np.zeros((5000, 6)))
+
+
+def test_tenseal_logistic_scoring_within_depth_budget():
+    pytest.importorskip("tenseal")
+    from src.he_core.backends.tenseal_backend import TenSEALBackend
+    from src.he_core.ops_ml import EncryptedLogisticScorer, logistic_depth
+    from src.he_core.utils import params_for_depth
+
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(300, 4)) * 0.3
+    w = rng.normal(size=4)
+    be = TenSEALBackend(params_for_depth(logistic_depth(3)))
+    plain = EncryptedLogisticScorer(MockBackend(be.params), w, 0.1, degree=3).score_all(X, 300)
+    enc = EncryptedLogisticScorer(be, w, 0.1, degree=3).score_all(X, 300)
+    assert np.allclose(enc, plain, atol=1e-3)
@@ -0,0 +1,163 @@
+import pytest
+
+from src.aggregator.pipeline import CHECKPOINT, Pipeline, Stage
+from src.infra.db import create_job_record, get_job_record, list_artifacts, list_job_logs
+
+
+def _toy(calls, fail_at=None):
+    def load(ctx):
+        calls.append("load")
+        return {"n": ctx.args["n"]}
+
+    def double(ctx):
+        calls.append("double")
+        out = ctx.output(ctx.job_dir / "double.txt")
+        out.write_text(str(ctx.state["n"] * 2))
+        return {"double": str(out)}
+
+    def render(ctx):
+        calls.append("render")
+        if fail_at == "render":
+            raise RuntimeError("worker died")
+        value = int(open(ctx.state["double"]).read()) + 1
+        ctx.artifact(kind="text", name="result", path=None, url=None, meta={"value": value})
+        return {"value": value}
+
+    def extra(ctx):
+        calls.append("extra")
+
+    return Pipeline(
+        "toy",
+        [
+            Stage("load", load),
+            Stage("double", double),
+            Stage("extra", extra, when=lambda st: st["n"] > 100),
+            Stage("render", render),
+        ],
+    )
+
+
+def test_failed_run_resumes_after_last_checkpoint(results_env):
+    create_job_record(job_id="j", kind="toy", status="queued")
+    calls = []
+    with pytest.raises(RuntimeError):
+        _toy(calls, fail_at="render").run("j", n=20)
+    assert calls == ["load", "double", "render"]
+    assert [a.name for a in list_artifacts("j") if a.kind == CHECKPOINT] == ["load", "double", "extra"]
+
+    calls.clear()
+    _toy(calls).run("j", n=20)
+    assert calls == ["render"]
+    assert get_job_record("j").status == "succeeded"
+    (result,) = [a for a in list_artifacts("j") if a.name == "result"]
+    assert result.meta["value"] == 41
+    assert any(e.line.startswith("resume after load, double, extra") for e in list_job_logs("j"))
+
+
+def test_missing_or_truncated_output_reruns_from_that_stage(results_env):
+    create_job_record(job_id="j", kind="toy", status="queued")
+    calls = []
+    with pytest.raises(RuntimeError):
+        _toy(calls, fail_at="render").run("j", n=5)
+    (results_env / "j" / "double.txt").write_text("1")  # size changed
+
+    calls.clear()
+    _toy(calls).run("j", n=5)
+    assert calls == ["double", "render"]
+
+
+def test_stage_names_must_be_unique():
+    with pytest.raises(ValueError):
+        Pipeline("x", [Stage("a", lambda ctx: None), Stage("a", lambda ctx: None)])
+
+
+def test_profiled_run_records_profile_artifacts(results_env):
+    import json
+    import pstats
+
+    create_job_record(job_id="j", kind="toy", status="queued")
+    _toy([]).run("j", profile=True, n=20)
+
+    arts = {a.name: a for a in list_artifacts("j") if a.kind == "profile"}
+    assert set(arts) == {"profile.pstats", "profile.collapsed", "allocations.json"}
+    stats = pstats.Stats(arts["profile.pstats"].path)
+    assert any(func == "double" for _, _, func in stats.stats)
+    assert arts["profile.pstats"].meta["top"]
+    for line in open(arts["profile.collapsed"].path):
+        stack, n = line.rsplit(" ", 1)
+        assert int(n) > 0 and stack
+    allocs = json.loads(open(arts["allocations.json"].path).read())
+    assert allocs["peak_traced_bytes"] > 0
+
+
+def test_profile_is_recorded_before_the_job_succeeds(results_env, monkeypatch):
+    from src.aggregator import pipeline
+
+    seen = {}
+    update = pipeline.update_job_status
+
+    def spy(job_id, status, **kw):
+        seen[status] = {a.name for a in list_artifacts(job_id) if a.kind == "profile"}
+        return update(job_id, status, **kw)
+
+    monkeypatch.setattr(pipeline, "update_job_status", spy)
+    create_job_record(job_id="j", kind="toy", status="queued")
+    _toy([]).run("j", profile=True, n=20)
+    assert "profile.pstats" in seen["succeeded"]
+
+
+def test_concurrent_profiled_runs_share_cprofile_and_clean_up(results_env, monkeypatch):
+    import threading
+    import tracemalloc
+
+    from src.aggregator import profiling
+
+    create_job_record(job_id="a", kind="toy", status="queued")
+    create_job_record(job_id="b", kind="toy", status="queued")
+    with profiling.profiled("a", results_env / "a"):
+        # cProfile is busy: the inner run is sampled only
+        with profiling.profiled("b", results_env / "b"):
+            sum(range(1000))
+    names = lambda job: {a.name for a in list_artifacts(job) if a.kind == "profile"}  # noqa: E731
+    assert names("a") == {"profile.pstats", "profile.collapsed", "allocations.json"}
+    assert names("b") == {"profile.collapsed", "allocations.json"}
+    assert not tracemalloc.is_tracing()
+
+    # a failing start leaves nothing running
+    def broken(self):
+        raise RuntimeError("no thread")
+
+    monkeypatch.setattr(profiling.StackSampler, "start", broken)
+    with pytest.raises(RuntimeError), profiling.profiled("a", results_env / "a"):
+        pass
+    assert not tracemalloc.is_tracing()
+    assert not profiling._cprofile_lock.locked()
+    assert not [t for t in threading.enumerate() if t.name == "he-profile-sampler"]
+
+
+def test_artifacts_are_hashed_before_the_checkpoint_transaction(results_env, monkeypatch):
+    import hashlib
+
+    from src.infra import db
+
+    def write(ctx):
+        out = ctx.job_dir / "out.bin"
+        out.write_bytes(b"payload")
+        ctx.artifact(kind="blob", name="out.bin", path=str(out), url=None)
+
+    # record_artifact, which runs inside the unit of work, must find it hashed
+    monkeypatch.setattr(db, "sha256_file", lambda p: pytest.fail("hashed inside the transaction"))
+    create_job_record(job_id="j", kind="toy", status="queued")
+    Pipeline("toy", [Stage("write", write)]).run("j")
+    (art,) = [a for a in list_artifacts("j") if a.kind == "blob"]
+    assert art.meta["sha256"] == hashlib.sha256(b"payload").hexdigest()
+
+
+def test_unprofiled_run_does_not_load_the_profiler(results_env, monkeypatch):
+    import sys
+
+    monkeypatch.setitem(sys.modules, "src.aggregator.profiling", None)  # any import now fails
+    create_job_record(job_id="j", kind="toy", status="queued")
+    _toy([]).run("j", n=20)
+    assert get_job_record("j").status == "succeeded"
+    assert not [a for a in list_artifacts("j") if a.kind == "profile"]
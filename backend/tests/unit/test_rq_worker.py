@@ -0,0 +1,118 @@
+import os
+import threading
+import time
+from collections import Counter
+
+import fakeredis
+import pytest
+from redis import Redis
+from redis.exceptions import ConnectionError as RedisConnectionError
+from rq import Queue, SimpleWorker
+
+from src.aggregator import rq_worker
+from src.aggregator.queue import parse_queues
+
+needs_fork = pytest.mark.skipif(not hasattr(os, "fork"), reason="fakeredis workers are forked")
+
+
+def _record_pid(path, seconds):
+    time.sleep(seconds)
+    with open(path, "a") as f:
+        f.write(f"{os.getpid()}\n")
+
+
+def _crash_once(marker, out):
+    # the first attempt kills its worker; the replacement sees the marker and finishes
+    if not os.path.exists(marker):
+        open(marker, "w").close()
+        os._exit(1)
+    with open(out, "w") as f:
+        f.write("done")
+
+
+@pytest.fixture
+def fake_connect():
+    server = fakeredis.FakeServer()
+    return lambda: fakeredis.FakeRedis(server=server)
+
+
+@pytest.fixture
+def redis_url():
+    # spreading one queue over processes needs a shared server; the database
+    # named by TEST_REDIS_URL is flushed after each test, so it must be set explicitly
+    url = os.environ.get("TEST_REDIS_URL")
+    if not url:
+        pytest.skip("set TEST_REDIS_URL to a redis database the tests may flush")
+    try:
+        Redis.from_url(url, socket_connect_timeout=0.5).ping()
+    except RedisConnectionError:
+        pytest.skip(f"no redis server at {url}")
+    yield url
+    Redis.from_url(url).flushdb()
+
+
+def test_parse_queues_reads_weights():
+    assert parse_queues("high:4, default ,low:1") == [("high", 4), ("default", 1), ("low", 1)]
+    assert parse_queues("") == [("default", 1)]
+    with pytest.raises(ValueError):
+        parse_queues("high:0")
+
+
+def test_weighted_worker_puts_heavier_queues_first_more_often():
+    redis = fakeredis.FakeRedis()
+    queues = [Queue(n, connection=redis) for n in ("high", "low")]
+    worker = rq_worker.WeightedWorker(queues, connection=redis, weights={"high": 3, "low": 1})
+    first = Counter()
+    for _ in range(4000):
+        worker.reorder_queues(queues[0])
+        first[worker._ordered_queues[0].name] += 1
+    # P(high first) = 3 / (3 + 1)
+    assert 0.70 < first["high"] / 4000 < 0.80
+
+
+def test_supervisor_spreads_jobs_over_worker_processes(redis_url, tmp_path):
+    out = tmp_path / "pids.txt"
+    q = Queue("default", connection=Redis.from_url(redis_url))
+    jobs = [q.enqueue(_record_pid, str(out), 0.3) for _ in range(6)]
+
+    sup = rq_worker.Supervisor(redis_url, [("default", 1)], workers=3, burst=True, poll_s=0.05, scheduler=False)
+    t0 = time.perf_counter()
+    sup.run()
+    assert time.perf_counter() - t0 < 30
+    assert all(j.get_status(refresh=True) == "finished" for j in jobs)
+    assert len(set(out.read_text().split())) > 1
+
+
+@needs_fork
+def test_supervisor_replaces_a_crashed_worker(fake_connect, tmp_path):
+    connect = fake_connect
+    marker, out = tmp_path / "crashed", tmp_path / "out.txt"
+    Queue("default", connection=connect()).enqueue(_crash_once, str(marker), str(out))
+
+    sup = rq_worker.Supervisor(
+        "redis://unused", [("default", 1)], workers=1, burst=True, poll_s=0.05, scheduler=False,
+        connect=connect, worker_class=SimpleWorker,
+    )
+    sup.run()
+    # each forked worker starts from a copy of the queue, so the replacement retries the job
+    assert sup.restarts == 1 and sup.memory_restarts == 0
+    assert out.read_text() == "done"
+
+
+@needs_fork
+def test_supervisor_restarts_workers_over_the_memory_ceiling(fake_connect):
+    # every Python process is over a 1 MB ceiling: each worker is stopped and replaced
+    connect = fake_connect
+    sup = rq_worker.Supervisor(
+        "redis://unused", [("default", 1)], workers=1, max_memory_mb=1, poll_s=0.05, scheduler=False,
+        connect=connect, worker_class=SimpleWorker,
+    )
+    runner = threading.Thread(target=sup.run)
+    runner.start()
+    deadline = time.monotonic() + 30
+    while sup.memory_restarts < 2 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    sup.stop()
+    runner.join(30)
+    assert sup.memory_restarts >= 2
+    assert rq_worker.tree_rss(os.getpid()) > 1024 * 1024
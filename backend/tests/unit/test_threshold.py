@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from src.he_core.aggregation import aggregate, decrypt_aggregate, group_totals
+from src.he_core.multiparty.federated import FederatedCoordinator, SimulatedStores
+from src.he_core.multiparty.threshold_api import (
+    threshold_decrypt,
+    threshold_decrypt_aggregates,
+    threshold_keygen,
+)
+from src.he_core.utils import CKKSParams
+
+SMALL = CKKSParams(poly_modulus_degree=8192)
+
+
+def test_keygen_validates_scheme_and_party_count():
+    with pytest.raises(ValueError):
+        threshold_keygen("mock", 1)
+    with pytest.raises(ValueError):
+        threshold_keygen("tenseal", 3)
+
+
+@pytest.mark.parametrize("batch_size", [1, 7, 64])
+def test_threshold_decrypt_recovers_every_ciphertext(batch_size):
+    tb = threshold_keygen("mock", 4, SMALL)
+    x = np.random.default_rng(0).normal(size=(50, tb.be.slots))
+    cts = [tb.be.encrypt_vector(row) for row in x]
+    assert np.allclose(threshold_decrypt(tb, cts, batch_size=batch_size, workers=3), x)
+    assert threshold_decrypt(tb, []).shape == (0, tb.be.slots)
+
+
+def test_partials_reveal_nothing_until_all_parties_combine():
+    tb = threshold_keygen("mock", 3, SMALL)
+    ct = tb.be.encrypt_vector(np.arange(8.0))
+    partials = [tb.partial_decrypt(p, [ct]) for p in range(3)]
+    assert not np.allclose(partials[0][0][:8], np.arange(8.0), atol=1.0)
+    assert not np.allclose(sum(p[0] for p in partials[:2])[:8], np.arange(8.0), atol=1.0)
+    with pytest.raises(ValueError):
+        tb.combine(partials[:2])
+    assert np.allclose(tb.combine(partials)[0][:8], np.arange(8.0))
+
+
+def test_threshold_decrypt_aggregates_matches_single_key_path():
+    tb = threshold_keygen("mock", 3, SMALL)
+    rng = np.random.default_rng(1)
+    x = rng.normal(size=(300, 12))
+    groups = rng.integers(0, 5, size=300)
+    aggs = group_totals(tb.be, tb.be.encrypt(x), groups)
+    got = threshold_decrypt_aggregates(tb, list(aggs.values()), batch_size=2)
+    for (label, agg), vec in zip(aggs.items(), got):
+        assert np.allclose(vec, decrypt_aggregate(tb.be, agg))
+        assert np.allclose(vec, x[groups == label].sum(axis=0))
+    total = aggregate(tb.be, tb.be.encrypt(x))
+    assert np.allclose(threshold_decrypt_aggregates(tb, [total])[0], x.sum(axis=0))
+
+
+def test_federated_round_with_threshold_decryption():
+    stores = SimulatedStores(seed=2)
+    with FederatedCoordinator(6, "mock", SMALL, workers=2, client_fn=stores, parties=3) as coord:
+        rep = coord.run_round(range(12), np.zeros(6))
+    ups, ns = zip(*(stores(i, np.zeros(6)) for i in range(12)))
+    assert np.allclose(rep.update, np.average(np.stack(ups), axis=0, weights=ns))
@@ -0,0 +1,79 @@
+import pytest
+
+from src.he_core.backends import available_backends, tuning
+from src.he_core.utils import MAX_COEFF_BITS_128, CKKSParams
+
+
+def test_candidates_are_secure_and_cheapest_first():
+    cands = tuning.candidates(depth=2, d=1024, max_abs=1000.0)
+    rings = [c.poly_modulus_degree for c in cands]
+    # 4096 fits 1024-wide rows but not (40, 20, 20, 40): 120 > 109 bits
+    assert rings == sorted(rings) and min(rings) == 8192
+    assert min(c.poly_modulus_degree for c in tuning.candidates(depth=2, d=1024)) == 4096
+    for c in cands:
+        assert sum(c.coeff_mod_bit_sizes) <= MAX_COEFF_BITS_128[c.poly_modulus_degree]
+        assert len(c.coeff_mod_bit_sizes) == 2 + 2
+        assert max(c.coeff_mod_bit_sizes) <= 60
+        # first prime holds |x| <= 1000 (10 bits) above the scale
+        assert c.coeff_mod_bit_sizes[0] >= c.global_scale_bits + 10
+    assert all(c.poly_modulus_degree >= 8192 for c in tuning.candidates(depth=0, d=4096))
+
+
+def _fake_measure(calls=None):
+    # deterministic stand-in: cost grows with the ring and the scale, and
+    # larger rings lose a little precision
+    def measure(backend, params, depth, d, max_abs=1.0, repeats=3):
+        if calls is not None:
+            calls.append(params)
+        n, scale = params.poly_modulus_degree, params.global_scale_bits
+        return tuning.Measurement(params, seconds_per_row=n / 4096 + scale / 1000, precision_bits=scale - 2 * n / 4096)
+
+    return measure
+
+
+def test_mock_measurement_is_exact(results_env):
+    m = tuning.measure("mock", CKKSParams(poly_modulus_degree=4096, coeff_mod_bit_sizes=(30, 20, 30), global_scale_bits=20), 1, 200)
+    assert m.precision_bits == 64.0
+    assert m.seconds_per_row > 0
+
+
+def test_table_tunes_once_then_serves_from_memory_and_disk(results_env, monkeypatch):
+    tuning.clear_table()
+    calls = []
+    monkeypatch.setattr(tuning, "measure", _fake_measure(calls))
+    t = tuning.tuned(1, 12, 200, backend="mock")
+    assert t.params == CKKSParams(poly_modulus_degree=4096, coeff_mod_bit_sizes=(30, 20, 30), global_scale_bits=20)
+    assert t.width == 256
+    n = len(calls)
+
+    # same block width, same entry
+    assert tuning.tuned_params(1, 12, 256, backend="mock") == t.params
+    assert len(calls) == n
+    tuning.clear_table()
+    assert tuning.tuned(1, 12, 256, backend="mock").params == t.params
+    assert len(calls) == n
+    assert (results_env / "cache" / "params" / "mock-1-12-256-0.json").is_file()
+    assert [e.params for e in tuning.parameter_table()] == [t.params]
+    tuning.clear_table(disk=True)
+
+
+def test_tune_picks_cheapest_setting_that_meets_precision(monkeypatch):
+    monkeypatch.setattr(tuning, "measure", _fake_measure())
+    t = tuning.tune(0, 24, 16, backend="mock")
+    assert t.params == CKKSParams(poly_modulus_degree=4096, coeff_mod_bit_sizes=(40, 40), global_scale_bits=30)
+    # 4096 passes at scale 30; 8192's shortest chain is already dearer, so the search stops
+    assert [m.params.poly_modulus_degree for m in t.tried] == [4096, 4096, 8192]
+
+    with pytest.raises(ValueError, match="no 128-bit-secure setting"):
+        tuning.tune(0, 24, 16, max_abs=2.0**45, backend="mock")
+
+
+@pytest.mark.skipif("tenseal" not in available_backends(), reason="tenseal not installed")
+def test_tenseal_tuning_meets_precision(results_env):
+    tuning.clear_table()
+    t = tuning.tune(1, 10, 16, backend="tenseal", repeats=1)
+    assert t.best.precision_bits >= 10
+    assert sum(t.params.coeff_mod_bit_sizes) <= MAX_COEFF_BITS_128[t.params.poly_modulus_degree]
+    # re-measuring the pick reproduces the precision it was chosen for
+    again = tuning.measure("tenseal", t.params, 1, 16, repeats=1)
+    assert again.precision_bits >= 10
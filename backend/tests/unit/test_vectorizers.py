@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.vectorizers.common import hash_buckets
+from src.vectorizers.uci_online_retail import vectorize
+
+
+def _uci_csv(path, n=1000, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(
+        {
+            "InvoiceNo": rng.integers(500000, 600000, n).astype(str),
+            "StockCode": rng.choice([f"SKU{i}" for i in range(50)], n),
+            "Description": "ITEM",
+            "Quantity": rng.integers(-2, 10, n),
+            "InvoiceDate": "2011-12-01 08:26",
+            "UnitPrice": rng.uniform(0.5, 20, n).round(2),
+            "CustomerID": rng.choice([17850.0, 13047.0, 12583.0, np.nan], n),
+            "Country": "United Kingdom",
+        }
+    )
+    df.to_csv(path, index=False)
+    return df
+
+
+def test_hash_buckets_are_deterministic_and_in_range():
+    b = hash_buckets(np.array(["a", "b", "a", "zz"]), 16)
+    assert b[0] == b[2]
+    assert ((b >= 0) & (b < 16)).all()
+    assert np.array_equal(b, hash_buckets(pd.Series(["a", "b", "a", "zz"]), 16))
+
+
+@pytest.mark.parametrize("by", ["customer", "product"])
+def test_uci_vectorize_matches_in_memory_groupby(tmp_path, by):
+    df = _uci_csv(tmp_path / "retail.csv")
+    res = vectorize(tmp_path / "retail.csv", tmp_path / "out.npy", d=32, by=by, chunk_rows=97)
+
+    df = df.dropna(subset=["CustomerID"])
+    df["customer_id"] = df["CustomerID"].astype(int).astype(str)
+    key, feat = ("customer_id", "StockCode") if by == "customer" else ("StockCode", "customer_id")
+    df["bucket"] = hash_buckets(df[feat].to_numpy(), 32)
+    df["amount"] = df["Quantity"] * df["UnitPrice"]
+    expected = df.pivot_table(index=key, columns="bucket", values="amount", aggfunc="sum", fill_value=0)
+
+    got = np.load(res.path, mmap_mode="r")
+    keys = np.load(res.keys_path)
+    assert res.lines == len(df)
+    assert list(keys) == sorted(expected.index)
+    for i, k in enumerate(keys):
+        row = np.zeros(32)
+        row[expected.columns.to_numpy()] = expected.loc[k].to_numpy()
+        assert np.allclose(got[i], row, atol=1e-3)
+
+
+def _ga_csv(path, n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(
+        {
+            "event_name": "purchase",
+            "user_pseudo_id": rng.choice([f"u{i}" for i in range(30)], n),
+            "item_id": rng.choice([f"SKU{i}" for i in range(20)], n),
+            "item_revenue": rng.uniform(1, 50, n).round(2),
+        }
+    )
+    df.to_csv(path, index=False)
+    return df
+
+
+def test_ga_vectorize_hash_mode(tmp_path):
+    from src.vectorizers.ga import vectorize as ga_vectorize
+
+    df = _ga_csv(tmp_path / "ga.csv")
+    res = ga_vectorize(tmp_path / "ga.csv", tmp_path / "v.npy", d=16, chunk_rows=64)
+    got = np.load(res.path)
+    assert res.mode == "hash" and res.n_rows == df["user_pseudo_id"].nunique()
+    assert np.allclose(got.sum(), df["item_revenue"].sum(), rtol=1e-5)
+    keys = list(np.load(res.keys_path))
+    u0 = df[df["user_pseudo_id"] == keys[0]]
+    expected = np.bincount(hash_buckets(u0["item_id"].to_numpy(), 16), weights=u0["item_revenue"], minlength=16)
+    assert np.allclose(got[0], expected, atol=1e-3)
+
+
+def test_ga_vectorize_catalog_mode_caches_index(tmp_path):
+    from src.vectorizers import ga
+
+    df = _ga_csv(tmp_path / "ga.csv")
+    pd.DataFrame({"item_id": [f"SKU{i}" for i in range(10)], "item_category": ["a", "b"] * 5}).to_csv(
+        tmp_path / "cat.csv", index=False
+    )
+    cache = tmp_path / "cache"
+    res = ga.vectorize(tmp_path / "ga.csv", tmp_path / "v.npy", d=4, catalog_csv=tmp_path / "cat.csv", cache_dir=cache)
+    assert res.mode == "catalog"
+    assert res.unmapped == int((~df["item_id"].isin([f"SKU{i}" for i in range(10)])).sum())
+    assert res.lines == len(df) and res.mapped == len(df) - res.unmapped and res.incomplete == 0
+    assert len(list((cache / "catalogs").glob("*_d4.npz"))) == 1
+
+    got = np.load(res.path)
+    assert np.allclose(got[:, 2:], 0)  # two categories -> buckets 0 and 1 only
+    known = df[df["item_id"].isin([f"SKU{i}" for i in range(0, 10, 2)])]
+    assert np.isclose(got[:, 0].sum(), known["item_revenue"].sum(), rtol=1e-5)
+
+    index = ga.catalog_index(tmp_path / "cat.csv", 4, cache)
+    assert list(index.lookup(np.array(["SKU3", "nope"]))) == [1, -1]
+
+
+def test_ga_vectorize_counts_rows_read_and_dropped(tmp_path):
+    from src.vectorizers.ga import vectorize as ga_vectorize
+
+    df = _ga_csv(tmp_path / "ga.csv", n=100)
+    df.loc[:4, "user_pseudo_id"] = None
+    df.loc[5:6, "item_id"] = None
+    df.to_csv(tmp_path / "ga.csv", index=False)
+    res = ga_vectorize(tmp_path / "ga.csv", tmp_path / "v.npy", d=8, chunk_rows=16)
+    assert (res.lines, res.mapped, res.incomplete, res.unmapped) == (100, 93, 7, 0)
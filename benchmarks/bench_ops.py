@@ -1,2 +1,297 @@
-def time_stub():
-    pass
+"""
+asv benchmarks: HE primitives, vectorisers and the make-all-ga job API.
+
+    cd benchmarks
+    asv run --python=same --quick          # smoke run in the current env
+    asv continuous --python=same main HEAD # flag regressions against main
+
+Backends that are not installed are skipped (NotImplementedError in setup).
+Everything runs against a scratch RESULTS_DIR, never the repo's results/.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# asv copies the `src` package of the commit under test into its environment
+# (asv.conf.json install_command); run by hand, use this checkout's backend
+try:
+    import src  # noqa: F401
+except ImportError:
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from src.he_core.aggregation import aggregate, rotation_steps  # noqa: E402
+from src.he_core.backends import available_backends, get_backend  # noqa: E402
+from src.he_core.utils import block_width  # noqa: E402
+
+BACKENDS = ["mock", "tenseal", "openfhe"]
+API_KEY = "bench"
+
+
+def _use_backend(name: str):
+    if name not in available_backends():
+        raise NotImplementedError(f"{name} is not installed")
+    return get_backend(name)
+
+
+def _scratch_results() -> Path:
+    results = Path(tempfile.mkdtemp(prefix="he-bench-"))
+    os.environ["RESULTS_DIR"] = str(results)
+    os.environ["DB_URL"] = f"sqlite:///{results}/he.sqlite"
+    return results
+
+
+def _ga_csv(path: Path, n: int, users: int, items: int, seed: int = 0) -> Path:
+    rng = np.random.default_rng(seed)
+    pd.DataFrame(
+        {
+            "event_name": "purchase",
+            "user_pseudo_id": rng.integers(0, users, n).astype(str),
+            "item_id": np.char.add("SKU", rng.integers(0, items, n).astype(str)),
+            "item_revenue": rng.uniform(1, 50, n).round(2),
+        }
+    ).to_csv(path, index=False)
+    return path
+
+
+def _uci_csv(path: Path, n: int, customers: int, items: int, seed: int = 0) -> Path:
+    rng = np.random.default_rng(seed)
+    pd.DataFrame(
+        {
+            "InvoiceNo": rng.integers(500000, 600000, n).astype(str),
+            "StockCode": np.char.add("SKU", rng.integers(0, items, n).astype(str)),
+            "Description": "ITEM",
+            "Quantity": rng.integers(-2, 10, n),
+            "InvoiceDate": "2011-12-01 08:26",
+            "UnitPrice": rng.uniform(0.5, 20, n).round(2),
+            "CustomerID": rng.integers(12000, 12000 + customers, n).astype(float),
+            "Country": "United Kingdom",
+        }
+    ).to_csv(path, index=False)
+    return path
+
+
+# -------------------------
+# HE primitives
+# -------------------------
+class HEOps:
+    """
+    One op over every ciphertext of an encrypted (batch, d) matrix: the
+    batch's row count sets how many ciphertexts there are, d how many rows
+    share one (slots // block_width(d)).
+    """
+
+    params = (BACKENDS, [16, 256, 1024], [1, 64, 512])
+    param_names = ["backend", "d", "batch"]
+    timeout = 600
+
+    def setup(self, backend, d, batch):
+        self.results = _scratch_results()
+        self.he = _use_backend(backend)
+        rng = np.random.default_rng(0)
+        self.x = rng.uniform(0, 100, (batch, d))
+        self.enc = self.he.encrypt(self.x)
+        self.cts = self.enc.ciphertexts
+        self.mask = rng.uniform(0, 1, self.he.slots)
+
+    def teardown(self, backend, d, batch):
+        shutil.rmtree(self.results, ignore_errors=True)
+
+    def time_encrypt(self, backend, d, batch):
+        self.he.encrypt(self.x)
+
+    def time_add(self, backend, d, batch):
+        acc = self.cts[0]
+        for ct in self.cts:
+            acc = self.he.add(acc, ct)
+
+    def time_multiply_plain(self, backend, d, batch):
+        for ct in self.cts:
+            self.he.multiply_plain(ct, self.mask)
+
+    def time_rotate(self, backend, d, batch):
+        if not self.he.supports_rotation:
+            raise NotImplementedError(f"{backend} has no rotate()")
+        step = block_width(d)
+        for ct in self.cts:
+            self.he.rotate(ct, step)
+
+    def time_sum(self, backend, d, batch):
+        for ct in self.cts:
+            self.he.sum(ct)
+
+    def time_aggregate(self, backend, d, batch):
+        aggregate(self.he, self.enc)
+
+    def peakmem_encrypt(self, backend, d, batch):
+        self.he.encrypt(self.x)
+
+    def peakmem_aggregate(self, backend, d, batch):
+        aggregate(self.he, self.enc)
+
+    def track_ciphertext_bytes(self, backend, d, batch):
+        return sum(len(self.he.serialize(ct)) for ct in self.cts)
+
+    track_ciphertext_bytes.unit = "bytes"
+
+
+class RotateAndSum:
+    """The log2(slots / width) rotations aggregate() folds row blocks with."""
+
+    params = (BACKENDS, [16, 256, 1024])
+    param_names = ["backend", "d"]
+    timeout = 300
+
+    def setup(self, backend, d):
+        self.results = _scratch_results()
+        self.he = _use_backend(backend)
+        if not self.he.supports_rotation:
+            raise NotImplementedError(f"{backend} has no rotate()")
+        self.steps = rotation_steps(self.he.slots, block_width(d))
+        ensure = getattr(self.he, "ensure_rotation_keys", None)
+        if ensure is not None and self.steps:
+            ensure(self.steps)
+        self.ct = self.he.encrypt_vector(np.random.default_rng(0).uniform(0, 1, self.he.slots))
+
+    def teardown(self, backend, d):
+        shutil.rmtree(self.results, ignore_errors=True)
+
+    def time_rotate_and_sum(self, backend, d):
+        ct = self.ct
+        for s in self.steps:
+            ct = self.he.add(ct, self.he.rotate(ct, s))
+
+
+# -------------------------
+# Vectorisers
+# -------------------------
+class Vectorizers:
+    """Streaming two-pass vectorisers on synthetic GA and UCI exports."""
+
+    params = ([20_000, 200_000], [64, 256])
+    param_names = ["rows", "d"]
+    timeout = 600
+
+    def setup_cache(self):
+        # asv runs this once, in a scratch directory it keeps for the run
+        data = Path("vectorizer-data").resolve()
+        data.mkdir(exist_ok=True)
+        for rows in self.params[0]:
+            _ga_csv(data / f"ga_{rows}.csv", rows, users=max(10, rows // 20), items=2_000)
+            _uci_csv(data / f"uci_{rows}.csv", rows, customers=max(10, rows // 20), items=2_000)
+        return str(data)
+
+    def setup(self, data, rows, d):
+        self.data = Path(data)
+        self.out = Path(tempfile.mkdtemp(prefix="he-bench-out-"))
+
+    def teardown(self, data, rows, d):
+        shutil.rmtree(self.out, ignore_errors=True)
+
+    def _ga(self, rows, d):
+        from src.vectorizers.ga import vectorize
+
+        vectorize(self.data / f"ga_{rows}.csv", self.out / "ga.npy", d=d)
+
+    def _uci(self, rows, d):
+        from src.vectorizers.uci_online_retail import vectorize
+
+        vectorize(self.data / f"uci_{rows}.csv", self.out / "uci.npy", d=d)
+
+    def time_ga(self, data, rows, d):
+        self._ga(rows, d)
+
+    def time_uci(self, data, rows, d):
+        self._uci(rows, d)
+
+    def peakmem_ga(self, data, rows, d):
+        self._ga(rows, d)
+
+    def track_ga_rows_per_s(self, data, rows, d):
+        t0 = time.perf_counter()
+        self._ga(rows, d)
+        return rows / (time.perf_counter() - t0)
+
+    track_ga_rows_per_s.unit = "rows/s"
+
+    def track_uci_rows_per_s(self, data, rows, d):
+        t0 = time.perf_counter()
+        self._uci(rows, d)
+        return rows / (time.perf_counter() - t0)
+
+    track_uci_rows_per_s.unit = "rows/s"
+
+
+# -------------------------
+# Job API, end to end
+# -------------------------
+class MakeAllGAJob:
+    """
+    POST /api/v1/jobs/make-all-ga through the ASGI app, then poll until the
+    job succeeds. With number = 1 setup runs before every sample, so "cold"
+    always starts from an empty RESULTS_DIR (no memoized vectors or totals)
+    while "warm" repeats a request that setup has already computed once.
+    """
+
+    params = (["mock", "tenseal"], ["cold", "warm"])
+    param_names = ["backend", "cache"]
+    number = 1
+    repeat = (3, 10, 60.0)
+    timeout = 600
+
+    def setup(self, backend, cache):
+        if backend not in available_backends():
+            raise NotImplementedError(f"{backend} is not installed")
+        from src.infra import db
+
+        self.results = _scratch_results()
+        os.environ["API_KEY"] = API_KEY
+        os.environ["JOB_CACHE_TTL_S"] = "0"  # measure the job, not request reuse
+        db._engine = None
+        (self.results / "uploads" / "ga_csv").mkdir(parents=True)
+        _ga_csv(self.results / "uploads" / "ga_csv" / "export.csv", 20_000, users=1_000, items=500)
+
+        from src.aggregator.api import create_app
+
+        self.app = create_app()
+        self.body = {"ga_csv": "export.csv", "d": 64, "backend": backend, "batch_size": 256}
+        if cache == "warm":
+            self._run()
+
+    def teardown(self, backend, cache):
+        from src.aggregator.jobs_runtime import shutdown_executor
+
+        shutdown_executor(wait=True)
+        shutil.rmtree(self.results, ignore_errors=True)
+
+    def _run(self) -> None:
+        from httpx import ASGITransport, AsyncClient
+
+        headers = {"X-API-Key": API_KEY}
+
+        async def go() -> None:
+            async with AsyncClient(transport=ASGITransport(app=self.app), base_url="http://bench") as ac:
+                r = await ac.post("/api/v1/jobs/make-all-ga", headers=headers, json=self.body)
+                r.raise_for_status()
+                job_id = r.json()["id"]
+                while True:
+                    r = await ac.get(f"/api/v1/jobs/{job_id}", headers=headers)
+                    status = r.json()["status"]
+                    if status == "succeeded":
+                        return
+                    if status == "failed":
+                        raise RuntimeError(f"job {job_id} failed")
+                    await asyncio.sleep(0.01)
+
+        asyncio.run(go())
+
+    def time_make_all_ga(self, backend, cache):
+        self._run()
@@ -1 +1,40 @@
-print('stub: ga loader')
+"""
+Vectorise a GA item-level export into per-user vectors of width d, by feature
+hashing or through a catalog lookup table (cached by catalog checksum).
+
+    python scripts/vectorizers/ga_sample.py export.csv --d 256 [--catalog catalog.csv]
+"""
+import argparse
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT / "backend"))
+
+from src.vectorizers.ga import vectorize  # noqa: E402
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("ga_csv", type=Path)
+    ap.add_argument("--d", type=int, default=256)
+    ap.add_argument("--catalog", type=Path, default=None, help="catalog CSV (item_id[,item_category|bucket])")
+    ap.add_argument("--chunk-rows", type=int, default=100_000)
+    ap.add_argument("--out", type=Path, default=None)
+    ap.add_argument("--cache-dir", type=Path, default=ROOT / "data" / "interim")
+    args = ap.parse_args()
+
+    out = args.out or ROOT / "data" / "processed" / f"{args.ga_csv.stem}_d{args.d}.npy"
+    res = vectorize(
+        args.ga_csv,
+        out,
+        d=args.d,
+        catalog_csv=args.catalog,
+        cache_dir=args.cache_dir,
+        chunk_rows=args.chunk_rows,
+    )
+    print(f"{res.lines} lines -> {res.n_rows} x {res.d} ({res.mode}, unmapped={res.unmapped}) at {res.path}")
+
+
+if __name__ == "__main__":
+    main()
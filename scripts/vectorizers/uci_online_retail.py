@@ -1 +1,32 @@
-print('stub: uci loader')
+"""
+Vectorise the UCI Online Retail dataset into per-customer (or per-product)
+feature vectors of width d, streaming the raw file in fixed-size chunks.
+
+    python scripts/vectorizers/uci_online_retail.py data/raw/online_retail.csv --d 256
+"""
+import argparse
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT / "backend"))
+
+from src.vectorizers.uci_online_retail import vectorize  # noqa: E402
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("src", type=Path, help="raw .csv or .xlsx export")
+    ap.add_argument("--d", type=int, default=256)
+    ap.add_argument("--by", choices=["customer", "product"], default="customer")
+    ap.add_argument("--chunk-rows", type=int, default=100_000)
+    ap.add_argument("--out", type=Path, default=None, help=".npy or .parquet (default: data/processed/)")
+    args = ap.parse_args()
+
+    out = args.out or ROOT / "data" / "processed" / f"uci_online_retail_{args.by}_d{args.d}.npy"
+    res = vectorize(args.src, out, d=args.d, by=args.by, chunk_rows=args.chunk_rows)
+    print(f"{res.lines} lines -> {res.n_rows} x {res.d} at {res.path} (keys: {res.keys_path})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,67 @@
-export {}
+import { ENV } from './env'
+
+export type JobEvent =
+  | { event: 'status'; data: { status: string; updated_at: string } }
+  | { event: 'log'; data: { lines: { created_at: string; line: string }[] } }
+  | {
+      event: 'artifact'
+      data: {
+        kind: string
+        name: string
+        path: string | null
+        url: string | null
+        created_at: string
+        meta: Record<string, unknown> | null
+      }
+    }
+
+// Parse one "event: ...\ndata: ..." block; comments (": keepalive") yield null
+function parseBlock(block: string): JobEvent | null {
+  let event = ''
+  let data = ''
+  for (const line of block.split('\n')) {
+    if (line.startsWith('event: ')) event = line.slice(7)
+    else if (line.startsWith('data: ')) data += line.slice(6)
+  }
+  return event && data ? ({ event, data: JSON.parse(data) } as JobEvent) : null
+}
+
+/**
+ * Follow GET /api/v1/jobs/{id}/events until the job reaches a terminal
+ * status. Uses fetch streaming rather than EventSource so the X-API-Key
+ * header can be sent. Returns a function that stops watching.
+ */
+export function watchJob(
+  jobId: string,
+  onEvent: (e: JobEvent) => void,
+  opts: { apiKey?: string; onError?: (err: unknown) => void } = {},
+): () => void {
+  const ctrl = new AbortController()
+  const headers: Record<string, string> = { Accept: 'text/event-stream' }
+  if (opts.apiKey) headers['X-API-Key'] = opts.apiKey
+
+  ;(async () => {
+    const res = await fetch(`${ENV.API_BASE}/api/v1/jobs/${encodeURIComponent(jobId)}/events`, {
+      headers,
+      signal: ctrl.signal,
+    })
+    if (!res.ok || !res.body) throw new Error(`job events: HTTP ${res.status}`)
+    const reader = res.body.pipeThrough(new TextDecoderStream()).getReader()
+    let buf = ''
+    for (;;) {
+      const { value, done } = await reader.read()
+      if (done) break
+      buf += value
+      let end: number
+      while ((end = buf.indexOf('\n\n')) >= 0) {
+        const ev = parseBlock(buf.slice(0, end))
+        buf = buf.slice(end + 2)
+        if (ev) onEvent(ev)
+      }
+    }
+  })().catch((err) => {
+    if (!ctrl.signal.aborted) opts.onError?.(err)
+  })
+
+  return () => ctrl.abort()
+}